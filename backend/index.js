@@ -75,6 +75,8 @@ const checkPronunciationIntent = (message) => {
 
 app.post("/followup", async (req, res) => {
     const prevOutput = req.body.prev;
+    // Optional: with a session id the Flask backend keeps the learner's conversation for follow-ups
+    const sessionId = req.body.sessionId;
 
     // Make the call to the Flask Backend
     const followupResponse = await fetch('http://0.0.0.0:8000/api/followup', {
@@ -83,7 +85,8 @@ app.post("/followup", async (req, res) => {
           'Content-Type': 'application/json',
       },
       body: JSON.stringify({
-          prev: prevOutput
+          prev: prevOutput,
+          session_id: sessionId
       })
     });
 
@@ -123,6 +126,7 @@ app.post("/chat", async (req, res) => {
   // Generate a number between 0 and 1 for every call, 
   const FLASK_BACKEND_URL = "http://0.0.0.0:8000"
   const userMessage = req.body.message;
+  const sessionId = req.body.sessionId;   // optional, see /followup
   if (!userMessage) {
     res.send({
       messages: [
@@ -205,7 +209,8 @@ app.post("/chat", async (req, res) => {
       body: JSON.stringify({
           // your data here
           prompt: userMessage,
-          language: "French"    // hardcoded to french for now, but we could make it dynamic if we store the language as state
+          language: "French",    // hardcoded to french for now, but we could make it dynamic if we store the language as state
+          session_id: sessionId
       })
     });
   
@@ -0,0 +1,159 @@
+# articulation.py
+import threading
+
+import numpy as np
+
+from agent.landmarks import UPPER_LIP, LOWER_LIP, MOUTH_LEFT, MOUTH_RIGHT
+
+# Same cutoff analyze_mouth_shape uses: width / height below this counts as a round mouth
+ROUND_RATIO = 2.5
+
+
+class ArticulationAnalyzer:
+    """
+    Mouth metrics over every frame of an utterance instead of a single snapshot. All the per-frame
+    columns live in preallocated arrays that get reused between calls, so analyzing a window is a
+    few vectorized passes with no per-frame Python work. Request threads analyze concurrently, so
+    every thread gets its own set of arrays (like TongueDetector's scratch buffers).
+    """
+
+    def __init__(self, capacity=300):
+        self.capacity = capacity
+        self.local = threading.local()
+
+    def _buffers(self, n):
+        """This thread's columns, (re)allocated to hold at least n frames"""
+        local = self.local
+        if getattr(local, 'capacity', 0) < n:
+            capacity = max(n, self.capacity, 2 * getattr(local, 'capacity', 0))
+            local.capacity = capacity
+            local.upper = np.empty((capacity, len(UPPER_LIP)), dtype=np.float32)
+            local.lower = np.empty((capacity, len(LOWER_LIP)), dtype=np.float32)
+            local.height = np.empty(capacity, dtype=np.float32)
+            local.width = np.empty(capacity, dtype=np.float32)
+            local.openness = np.empty(capacity, dtype=np.float32)
+            local.ratio = np.empty(capacity, dtype=np.float32)
+            local.velocity = np.zeros(capacity, dtype=np.float32)
+            local.dt = np.empty(capacity, dtype=np.float64)
+        return local
+
+    def compute(self, window, timestamps):
+        """
+        Fill the metric columns for a (n, 478, dims) landmark window. Returns views of length n
+        (valid until this thread's next call): openness, width, ratio (width / height) and lip
+        velocity (change in openness per second)
+        """
+        n = len(window)
+        buffers = self._buffers(n)
+
+        upper, lower = buffers.upper[:n], buffers.lower[:n]
+        height, width = buffers.height[:n], buffers.width[:n]
+        openness, ratio, velocity = buffers.openness[:n], buffers.ratio[:n], buffers.velocity[:n]
+
+        ys = window[:, :, 1]
+        np.take(ys, UPPER_LIP, axis=1, out=upper)
+        np.take(ys, LOWER_LIP, axis=1, out=lower)
+        np.subtract(upper, lower, out=upper)
+        np.abs(upper, out=upper)
+        upper.mean(axis=1, out=height)
+
+        np.subtract(window[:, MOUTH_RIGHT, 0], window[:, MOUTH_LEFT, 0], out=width)
+        np.abs(width, out=width)
+        np.maximum(width, 1e-6, out=width)
+        np.maximum(height, 1e-6, out=height)
+
+        np.divide(height, width, out=openness)
+        np.divide(width, height, out=ratio)
+
+        # Frames aren't evenly spaced (the scheduler and motion gate skip some), so use real dt
+        velocity[0] = 0.0
+        if n > 1:
+            dt = buffers.dt[:n - 1]
+            np.subtract(timestamps[1:], timestamps[:-1], out=dt)
+            np.maximum(dt, 1e-3, out=dt)
+            np.subtract(openness[1:], openness[:-1], out=velocity[1:])
+            velocity[1:] /= dt
+
+        return openness, width, ratio, velocity
+
+    def analyze(self, window, timestamps, targets=None, phonemes=None, include_trajectory=True):
+        """
+        Summarize an utterance: peak and steady-state mouth shape, plus (given a LanguageTargets and
+        the phonemes that were said) a per-phoneme score over equal time slices of the window
+        """
+        n = len(window)
+        if n == 0:
+            return None
+        openness, width, ratio, velocity = self.compute(window, timestamps)
+
+        peak = int(np.argmax(openness))
+        # Steady state: the stillest half of the frames, where the lips were holding a shape
+        speed = np.abs(velocity)
+        still = speed <= np.median(speed)
+        steady_openness = float(openness[still].mean())
+        steady_ratio = float(ratio[still].mean())
+
+        result = {
+            'frames': n,
+            'duration': float(timestamps[-1] - timestamps[0]),
+            'peak': {
+                'openness': float(openness[peak]),
+                'time': float(timestamps[peak] - timestamps[0])
+            },
+            'steady_state': {
+                'openness': steady_openness,
+                'roundness': steady_ratio < ROUND_RATIO,
+                'width': float(width[still].mean())
+            },
+            'max_lip_velocity': float(speed.max())
+        }
+
+        if include_trajectory:
+            t = timestamps - timestamps[0]
+            result['trajectory'] = {
+                't': t.round(3).tolist(),
+                'openness': openness.round(4).tolist(),
+                'width': width.round(1).tolist(),
+                'roundness': (ratio < ROUND_RATIO).tolist(),
+                'lip_velocity': velocity.round(4).tolist()
+            }
+
+        if targets is not None and phonemes:
+            result['alignment'] = self.align(openness, ratio, timestamps, targets, phonemes)
+
+        return result
+
+    @staticmethod
+    def align(openness, ratio, timestamps, targets, phonemes):
+        """Split the utterance into equal time slices, one per phoneme, and score each slice"""
+        k = len(phonemes)
+        t = timestamps - timestamps[0]
+        span = max(float(t[-1]), 1e-6)
+        # Slice index for every frame; empty slices borrow the nearest frame
+        slice_of = np.minimum((t / span * k).astype(np.intp), k - 1)
+        counts = np.bincount(slice_of, minlength=k)
+        open_sum = np.bincount(slice_of, weights=openness, minlength=k)
+        round_sum = np.bincount(slice_of, weights=(ratio < ROUND_RATIO), minlength=k)
+
+        empty = counts == 0
+        if empty.any():
+            centers = (np.arange(k) + 0.5) / k * span
+            nearest = np.abs(t[None, :] - centers[:, None]).argmin(axis=1)
+            open_sum[empty] = openness[nearest[empty]]
+            round_sum[empty] = ratio[nearest[empty]] < ROUND_RATIO
+            counts[empty] = 1
+
+        seg_openness = open_sum / counts
+        seg_round = round_sum / counts >= 0.5
+
+        scored = targets.score_batch(
+            list(phonemes),
+            {'openness': seg_openness, 'roundness': seg_round, 'spread': None},
+            {'visible': False}
+        )
+        for i, entry in enumerate(scored):
+            entry['openness'] = float(seg_openness[i])
+            entry['roundness'] = bool(seg_round[i])
+            entry['start'] = float(i * span / k)
+            entry['end'] = float((i + 1) * span / k)
+        return scored
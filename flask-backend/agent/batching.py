@@ -0,0 +1,145 @@
+# batching.py
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import cv2
+import numpy as np
+
+from agent.emotion_summary import EMOTION_LABELS
+
+logger = logging.getLogger(__name__)
+
+# FER pads the face box by this many pixels on each side before cropping
+FACE_OFFSETS = (10, 10)
+
+
+def get_emotion_classifier(detector):
+    """The Keras model inside a fer.FER instance (FER keeps it name-mangled)"""
+    return detector._FER__emotion_classifier
+
+
+def preprocess_face(gray, box, target_size):
+    """
+    Crop one face out of a grayscale frame the way FER does (square box + offsets), resize it
+    to the classifier input and normalize to [-1, 1]. Returns a (h, w, 1) float32 array
+    """
+    x, y, w, h = box
+    # FER.tosquare: grow the short side so the crop is square
+    if w < h:
+        x -= (h - w) // 2
+        w = h
+    elif h < w:
+        y -= (w - h) // 2
+        h = w
+    off_x, off_y = FACE_OFFSETS
+    x1, y1 = max(x - off_x, 0), max(y - off_y, 0)
+    x2, y2 = min(x + w + off_x, gray.shape[1]), min(y + h + off_y, gray.shape[0])
+    face = cv2.resize(gray[y1:y2, x1:x2], (target_size[1], target_size[0]))
+    face = face.astype(np.float32) / 255.0
+    face = (face - 0.5) * 2.0
+    return face[..., np.newaxis]
+
+
+def classify_faces(backend, faces):
+    """
+    One forward pass over a list of preprocessed faces, returns FER-style emotion dicts.
+    backend is anything with predict(batch) -> (n, 7), see agent/emotion_backends.py
+    """
+    if not faces:
+        return []
+    batch = np.stack(faces)
+    predictions = np.asarray(backend.predict(batch))
+    return [
+        {label: round(float(p), 2) for label, p in zip(EMOTION_LABELS, row)}
+        for row in predictions
+    ]
+
+
+class MicroBatcher:
+    """
+    Collects items submitted from many threads and hands them to dispatch() in batches of at most
+    max_batch, waiting at most max_wait_ms after the first item arrives. dispatch(items) returns
+    either a list of results or a Future resolving to one (e.g. from a process pool).
+    submit() returns a Future for that single item's result.
+    """
+
+    def __init__(self, dispatch, max_batch=8, max_wait_ms=5.0, name='micro-batcher'):
+        self.dispatch = dispatch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = queue.Queue()
+        self.is_running = True
+        self.batches = 0
+        self.items = 0
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, item):
+        future = Future()
+        self.queue.put((item, future))
+        return future
+
+    def _collect(self):
+        try:
+            first = self.queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while self.is_running:
+            batch = self._collect()
+            if not batch:
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            futures = [f for _, f in batch]
+            try:
+                result = self.dispatch([item for item, _ in batch])
+            except Exception as e:
+                self._fail(futures, e)
+                continue
+            if isinstance(result, Future):
+                result.add_done_callback(lambda r, fs=futures: self._resolve(fs, r))
+            else:
+                self._deliver(futures, result)
+
+    def _resolve(self, futures, result_future):
+        try:
+            results = result_future.result()
+        except Exception as e:
+            self._fail(futures, e)
+            return
+        self._deliver(futures, results)
+
+    @staticmethod
+    def _deliver(futures, results):
+        for future, result in zip(futures, results):
+            future.set_result(result)
+
+    @staticmethod
+    def _fail(futures, error):
+        logger.error(f"Batch failed: {error}")
+        for future in futures:
+            future.set_exception(error)
+
+    @property
+    def mean_batch_size(self):
+        return self.items / self.batches if self.batches else 0.0
+
+    def stop(self):
+        self.is_running = False
+        self.thread.join(timeout=1.0)
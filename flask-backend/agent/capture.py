@@ -0,0 +1,276 @@
+# capture.py
+import os
+import glob
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from agent.metrics import registry
+
+
+class FrameSource:
+    """Base class for anything that can hand us BGR frames"""
+
+    # Live sources (webcam) pace themselves, replayed ones get throttled to this
+    fps = None
+
+    def open(self):
+        pass
+
+    def read(self):
+        """Return the next frame, or None if nothing is available right now"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    @property
+    def exhausted(self):
+        return False
+
+
+class WebcamSource(FrameSource):
+    """Local camera through cv2.VideoCapture"""
+
+    def __init__(self, device=0):
+        self.device = device
+        self.cap = None
+
+    def open(self):
+        self.cap = cv2.VideoCapture(self.device)
+        if not self.cap.isOpened():
+            raise RuntimeError("Could not open video capture device")
+
+    def read(self):
+        ret, frame = self.cap.read()
+        return frame if ret else None
+
+    def close(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class VideoFileSource(FrameSource):
+    """Replay a recorded video, optionally looping it"""
+
+    def __init__(self, path, loop=True, fps=None):
+        self.path = path
+        self.loop = loop
+        self.fps = fps
+        self.cap = None
+        self._done = False
+
+    def open(self):
+        self.cap = cv2.VideoCapture(self.path)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Could not open video file {self.path}")
+        if self.fps is None:
+            self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    def read(self):
+        ret, frame = self.cap.read()
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        if not ret:
+            self._done = True
+            return None
+        return frame
+
+    def close(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    @property
+    def exhausted(self):
+        return self._done
+
+
+class ImageDirectorySource(FrameSource):
+    """Cycle through the images in a directory (sorted by name)"""
+
+    EXTENSIONS = ('*.jpg', '*.jpeg', '*.png', '*.bmp')
+
+    def __init__(self, directory, loop=True, fps=15.0):
+        self.directory = directory
+        self.loop = loop
+        self.fps = fps
+        self.paths = []
+        self.index = 0
+
+    def open(self):
+        for ext in self.EXTENSIONS:
+            self.paths.extend(glob.glob(os.path.join(self.directory, ext)))
+        self.paths.sort()
+        if not self.paths:
+            raise RuntimeError(f"No images found in {self.directory}")
+
+    def read(self):
+        if self.index >= len(self.paths):
+            if not self.loop:
+                return None
+            self.index = 0
+        frame = cv2.imread(self.paths[self.index])
+        self.index += 1
+        return frame
+
+    @property
+    def exhausted(self):
+        return not self.loop and self.index >= len(self.paths)
+
+
+class SyntheticSource(FrameSource):
+    """Generated frames for running without any camera (CI, servers, benchmarks)"""
+
+    def __init__(self, width=640, height=480, fps=30.0):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.count = 0
+
+    def read(self):
+        frame = np.full((self.height, self.width, 3), 40, dtype=np.uint8)
+        # Moving blob so downstream motion/tracking logic has something to chew on
+        t = self.count / self.fps
+        cx = int(self.width / 2 + self.width / 4 * np.sin(t))
+        cy = self.height // 2
+        cv2.circle(frame, (cx, cy), self.height // 5, (150, 170, 210), -1)
+        cv2.putText(frame, str(self.count), (10, self.height - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+        self.count += 1
+        return frame
+
+
+def make_frame_source(spec=None):
+    """
+    Build a frame source from a spec string, e.g. "webcam:0", "video:lesson.mp4",
+    "images:./frames" or "synthetic". Defaults to the FRAME_SOURCE env var, then webcam 0.
+    """
+    spec = spec or os.getenv('FRAME_SOURCE', 'webcam:0')
+    kind, _, arg = spec.partition(':')
+    kind = kind.strip().lower()
+
+    if kind == 'webcam':
+        return WebcamSource(int(arg) if arg else 0)
+    if kind == 'video':
+        return VideoFileSource(arg)
+    if kind == 'images':
+        return ImageDirectorySource(arg)
+    if kind == 'synthetic':
+        if arg:
+            width, height = (int(v) for v in arg.lower().split('x'))
+            return SyntheticSource(width, height)
+        return SyntheticSource()
+    raise ValueError(f"Unknown frame source: {spec}")
+
+
+class FrameRingBuffer:
+    """
+    Bounded buffer that only keeps the newest frames - old ones get dropped, never queued.
+    dropped counts frames the consumer (wait_newer) never got to see, not just overwrites
+    """
+
+    def __init__(self, capacity=2):
+        self.frames = deque(maxlen=capacity)
+        self.cond = threading.Condition()
+        self.seq = 0
+        self.read_seq = 0       # newest frame handed to the consumer
+        self.skipped = 0        # frames the consumer jumped over
+
+    def put(self, frame):
+        # Buffered frames are shared between threads - anyone who wants to draw makes a copy
+        frame.flags.writeable = False
+        with self.cond:
+            self.seq += 1
+            self.frames.append((self.seq, time.time(), frame))
+            self.cond.notify_all()
+
+    def latest(self):
+        """Most recent (seq, timestamp, frame) without waiting, or None. Doesn't count as consuming it"""
+        with self.cond:
+            return self.frames[-1] if self.frames else None
+
+    def wait_newer(self, seq, timeout=1.0):
+        """Block until a frame newer than seq shows up, return it (or None on timeout)"""
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.seq > seq, timeout=timeout):
+                return None
+            latest = self.frames[-1]
+            if latest[0] > self.read_seq:
+                self.skipped += latest[0] - self.read_seq - 1
+                self.read_seq = latest[0]
+            return latest
+
+    @property
+    def dropped(self):
+        """Frames never consumed: jumped over by the consumer, or already pushed out of the ring behind it"""
+        with self.cond:
+            # Frames newer than read_seq that fell out of the ring won't ever be read either
+            evicted = max(self.seq - len(self.frames) - self.read_seq, 0)
+            return self.skipped + evicted
+
+
+class FrameCapture:
+    """Reads a FrameSource on its own thread and keeps the freshest frames in a ring buffer"""
+
+    def __init__(self, source, capacity=2):
+        self.source = source
+        self.buffer = FrameRingBuffer(capacity)
+        self.read_latency = registry.histogram('cv_stage_latency_seconds', 'Time spent per run of each CV pipeline stage', stage='capture')
+        self.frame_rate = registry.rate('cv_capture_fps', 'Frames per second read from the frame source')
+        self.thread = None
+        self.is_running = False
+        self.read_failures = 0
+
+    def start(self):
+        self.source.open()
+        self.is_running = True
+        self.thread = threading.Thread(target=self._run, name='frame-capture', daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        interval = 1.0 / self.source.fps if self.source.fps else 0
+        next_due = time.time()
+        while self.is_running:
+            with self.read_latency.time():
+                frame = self.source.read()
+            if frame is None:
+                if self.source.exhausted:
+                    break
+                self.read_failures += 1
+                time.sleep(0.005)
+                continue
+            self.buffer.put(frame)
+            self.frame_rate.mark()
+
+            # Replayed sources would otherwise run as fast as the disk allows
+            if interval:
+                next_due += interval
+                delay = next_due - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_due = time.time()
+        self.is_running = False
+
+    def latest(self):
+        return self.buffer.latest()
+
+    def wait_newer(self, seq, timeout=1.0):
+        return self.buffer.wait_newer(seq, timeout)
+
+    @property
+    def dropped(self):
+        return self.buffer.dropped
+
+    def stop(self):
+        self.is_running = False
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)
+        self.source.close()
@@ -0,0 +1,136 @@
+# conversation.py
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token for English/French text), good enough for budgeting"""
+    return len(text) // 4 + 1
+
+
+def estimate_prompt_tokens(system, messages):
+    """estimate_tokens over a system prompt and messages (string or content-block contents)"""
+    texts = [system] if isinstance(system, str) else [block["text"] for block in system or ()]
+    for message in messages:
+        content = message["content"]
+        texts.extend([content] if isinstance(content, str) else [block.get("text", "") for block in content])
+    return sum(estimate_tokens(text) for text in texts)
+
+
+def truncate_tokens(text, max_tokens):
+    """Cut text to about max_tokens, on a word boundary"""
+    max_chars = max_tokens * 4
+    text = " ".join(text.split())
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + " ..."
+
+
+def compact_turn(user, assistant, user_tokens=30, answer_tokens=60):
+    """One line for the running summary: the question and the start of the answer"""
+    first_paragraph = assistant.strip().split("\n\n", 1)[0]
+    return f"- Learner: {truncate_tokens(user, user_tokens)} | Teacher: {truncate_tokens(first_paragraph, answer_tokens)}"
+
+
+class Conversation:
+    def __init__(self):
+        self.turns = deque()            # (user, assistant, tokens)
+        self.summary = deque()          # compacted lines for turns that no longer fit
+        self.tokens = 0
+        self.updated = time.time()
+
+    def summary_text(self):
+        if not self.summary:
+            return None
+        return "Earlier in this conversation (condensed):\n" + "\n".join(self.summary)
+
+
+class ConversationStore:
+    """
+    Each learner's conversation with the teacher, kept server-side so follow-ups see the original
+    question and earlier turns without the client sending anything back. Turns are kept verbatim
+    while they fit max_tokens; beyond that the oldest ones are folded into a short running summary
+    (itself capped at summary_tokens), but the most recent keep_recent turns always stay verbatim.
+    Sessions idle for ttl seconds are dropped, and at most max_sessions are kept (LRU).
+    """
+
+    def __init__(self, max_tokens=1500, keep_recent=2, summary_tokens=300, ttl=3600, max_sessions=1000):
+        self.max_tokens = max_tokens
+        self.keep_recent = keep_recent
+        self.summary_tokens = summary_tokens
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()   # session_id -> Conversation
+        self.lock = threading.Lock()
+        self.compacted = 0
+
+    def add_turn(self, session_id, user, assistant):
+        with self.lock:
+            self._expire()
+            conversation = self.sessions.pop(session_id, None) or Conversation()
+            self.sessions[session_id] = conversation
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+
+            tokens = estimate_tokens(user) + estimate_tokens(assistant)
+            conversation.turns.append((user, assistant, tokens))
+            conversation.tokens += tokens
+            conversation.updated = time.time()
+            self._compact(conversation)
+
+    def _compact(self, conversation):
+        while conversation.tokens > self.max_tokens and len(conversation.turns) > self.keep_recent:
+            user, assistant, tokens = conversation.turns.popleft()
+            conversation.tokens -= tokens
+            conversation.summary.append(compact_turn(user, assistant))
+            self.compacted += 1
+        while sum(estimate_tokens(line) for line in conversation.summary) > self.summary_tokens:
+            conversation.summary.popleft()
+
+    def last_answer(self, session_id):
+        with self.lock:
+            conversation = self.sessions.get(session_id)
+            if conversation is None or not conversation.turns:
+                return None
+            return conversation.turns[-1][1]
+
+    def context(self, session_id, prev_response=None):
+        """
+        (summary, messages) for continuing session_id's conversation, or None if there is none, or if
+        prev_response is given and isn't the last answer we have (the client is asking about
+        something else, so the history doesn't apply). summary is None until turns got compacted
+        """
+        with self.lock:
+            self._expire()
+            conversation = self.sessions.get(session_id)
+            if conversation is None or not conversation.turns:
+                return None
+            if prev_response and conversation.turns[-1][1].strip() != prev_response.strip():
+                return None
+            messages = []
+            for user, assistant, _ in conversation.turns:
+                messages.append({"role": "user", "content": user})
+                messages.append({"role": "assistant", "content": assistant})
+            return conversation.summary_text(), messages
+
+    def clear(self, session_id):
+        with self.lock:
+            self.sessions.pop(session_id, None)
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        while self.sessions:
+            session_id, conversation = next(iter(self.sessions.items()))
+            if conversation.updated >= cutoff:
+                break
+            del self.sessions[session_id]
+
+    def stats(self):
+        with self.lock:
+            return {
+                'sessions': len(self.sessions),
+                'turns': sum(len(c.turns) for c in self.sessions.values()),
+                'tokens': sum(c.tokens for c in self.sessions.values()),
+                'compacted_turns': self.compacted
+            }
@@ -0,0 +1,322 @@
+# cv_engine.py
+"""
+The CV loop as its own process, for running the API under a multi-worker WSGI server:
+
+    export CV_ENGINE_AUTHKEY=...                           # shared secret, required by both sides
+    python -m agent.cv_engine                              # camera, FER, FaceMesh
+    APP_MODE=api gunicorn -w 4 -b 0.0.0.0:8000 wsgi:app    # API workers
+
+The engine publishes frames, landmarks and emotion summaries into shared memory
+(agent/shared_state.py), which the API workers read without any IPC round trip. Commands that
+need the engine's state (start_monitoring, utterances, stats) go over a small authenticated
+multiprocessing.connection channel.
+"""
+import logging
+import os
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+
+from agent.emotion_monitor import PronunciationAnalysis, LanguagePronunciationGuide
+from agent.scheduler import InferenceScheduler
+from agent.shared_state import SharedState, DEFAULT_NAME, parse_size
+from agent.snapshot import SnapshotPublisher
+from agent.tongue import TongueDetector
+
+logger = logging.getLogger(__name__)
+
+# Engine methods the API workers may call
+REMOTE_METHODS = ('start_monitoring', 'get_dominant_emotion', 'pipeline_stats',
+                  'start_utterance', 'end_utterance', 'calibrate_neutral_position')
+
+
+def engine_address():
+    host, _, port = os.getenv('CV_ENGINE_ADDRESS', 'localhost:6001').rpartition(':')
+    return host or 'localhost', int(port)
+
+
+def engine_authkey():
+    """
+    Shared secret for the control channel. multiprocessing.connection unpickles what it receives,
+    so there is deliberately no default - anyone with the key can run code in the engine
+    """
+    key = os.getenv('CV_ENGINE_AUTHKEY')
+    if not key:
+        raise RuntimeError("CV_ENGINE_AUTHKEY must be set (same value for the engine and the API workers)")
+    return key.encode()
+
+
+class SharedSnapshotPublisher(SnapshotPublisher):
+    """Publishes in-process as before and mirrors every snapshot into shared memory"""
+
+    def __init__(self, shared):
+        super().__init__()
+        self.shared = shared
+
+    def publish(self, frame, landmarks, timestamp=None):
+        self.shared.publish(frame, landmarks, timestamp)
+        return super().publish(frame, landmarks, timestamp)
+
+
+class EngineServer:
+    """Answers (method, args, kwargs) calls from the API workers, one thread per connection"""
+
+    def __init__(self, service, address, authkey, overrides=None):
+        self.service = service
+        # method name -> callable used instead of the service's own method
+        self.overrides = overrides or {}
+        self.listener = Listener(address, authkey=authkey)
+        self.thread = threading.Thread(target=self._accept, name='cv-engine-server', daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _accept(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                return
+            except Exception as e:
+                # Wrong authkey and the like - keep serving everyone else
+                logger.warning(f"Rejected engine connection: {e}")
+                continue
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        with conn:
+            while True:
+                try:
+                    method, args, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    if method not in REMOTE_METHODS:
+                        raise ValueError(f"Unknown engine method: {method}")
+                    handler = self.overrides.get(method) or getattr(self.service, method)
+                    conn.send(('ok', handler(*args, **kwargs)))
+                except Exception as e:
+                    conn.send(('error', str(e)))
+
+    def close(self):
+        self.listener.close()
+
+
+def run_engine():
+    """Run the CV service in this process and publish everything into shared memory"""
+    from agent.emotion_monitor import EmotionMonitorService
+
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper())
+    shared = SharedState(os.getenv('CV_SHM_NAME', DEFAULT_NAME), create=True,
+                         max_size=parse_size(os.getenv('CV_SHM_MAX_SIZE')))
+    authkey = engine_authkey()
+    service = EmotionMonitorService(preview=os.getenv('PREVIEW_MODE', 'headless'))
+    service.snapshots = SharedSnapshotPublisher(shared)
+
+    windows_closed = 0
+    window_id = 0
+    # The summary area has a single-writer seqlock, and both the inference thread and the control
+    # channel write it. Holding this also keeps a sample from the old window landing after a restart
+    summary_lock = threading.Lock()
+
+    def publish_summary(session_id, event):
+        with summary_lock:
+            shared.publish_summary({
+                'event': event,
+                'window': window_id,
+                'session_id': session_id,
+                # Read under the lock rather than taken from the listener, so it is never older
+                # than the window it is published for
+                'summary': service.get_dominant_emotion(),
+                'is_monitoring': service.is_monitoring,
+                'windows_closed': windows_closed
+            })
+
+    def on_window_end(session_id, summary):
+        nonlocal windows_closed
+        windows_closed += 1
+        publish_summary(session_id, 'window_end')
+
+    def start_monitoring(duration):
+        nonlocal window_id
+        with summary_lock:
+            started = service.start_monitoring(duration)
+            window_id += 1
+        # Clears the previous window's result for the readers (summary is None until the first sample)
+        publish_summary(service.session_id, 'window_start')
+        return started
+
+    service.emotion_listeners.append(lambda session_id, summary: publish_summary(session_id, 'sample'))
+    service.window_end_listeners.append(on_window_end)
+
+    # Heartbeat so workers can tell a live engine from a segment left by a dead one
+    def heartbeat():
+        while service.is_running:
+            shared.beat()
+            time.sleep(0.5)
+    threading.Thread(target=heartbeat, name='cv-engine-heartbeat', daemon=True).start()
+
+    server = EngineServer(service, engine_address(), authkey, {'start_monitoring': start_monitoring}).start()
+    logger.info(f"CV engine running (pid {os.getpid()}, shared memory '{shared.name}', control {engine_address()})")
+    try:
+        service.run_video_display()
+    finally:
+        server.close()
+        service.stop()
+        shared.close()
+
+
+class _SharedSnapshots:
+    """snapshots.read() for PronunciationAnalysis, straight out of shared memory"""
+
+    def __init__(self, remote):
+        self.remote = remote
+        self.local = threading.local()
+
+    def read(self):
+        shared = self.remote.shared()
+        snapshot = shared.read() if shared is not None else None
+        # Remembered per request thread so the caller can check it afterwards
+        self.local.last = (shared, snapshot)
+        return snapshot
+
+    def last(self):
+        return getattr(self.local, 'last', (None, None))
+
+
+class RemoteEmotionService(PronunciationAnalysis):
+    """
+    What app.py uses as the emotion service in APP_MODE=api. Frames, landmarks and the current
+    emotion summary come from shared memory; pronunciation checks run here on zero-copy views of
+    the latest frame. Everything else is forwarded to the engine process.
+    """
+
+    def __init__(self, name=None, address=None, authkey=None):
+        self.name = name or os.getenv('CV_SHM_NAME', DEFAULT_NAME)
+        self.address = address or engine_address()
+        self.authkey = authkey or engine_authkey()
+        self._shared = None
+        self.shared_lock = threading.Lock()
+
+        # What PronunciationAnalysis needs
+        self.snapshots = _SharedSnapshots(self)
+        self.scheduler = InferenceScheduler()
+        self.tongue_detector = TongueDetector()
+        self.pronunciation_guide = LanguagePronunciationGuide('french')
+
+        self.session_id = 'default'
+        self.emotion_listeners = []
+        self.window_end_listeners = []
+        self.preview_mode = 'headless'
+        self.preview = None
+        self.is_running = True
+
+        # Turns engine summaries into local listener calls (confusion events, speculation)
+        self.watcher = threading.Thread(target=self._watch_summaries, name='cv-summary-watcher', daemon=True)
+        self.watcher.start()
+
+    def shared(self):
+        """The engine's segment, (re)attached if needed. None while no engine is running"""
+        with self.shared_lock:
+            if self._shared is not None:
+                if self._shared.alive():
+                    return self._shared
+                # Engine died or restarted with a fresh segment
+                self._shared.close()
+                self._shared = None
+            try:
+                shared = SharedState(self.name)
+            except FileNotFoundError:
+                return None
+            if not shared.alive():
+                shared.close()
+                return None
+            self._shared = shared
+            return shared
+
+    def call(self, method, *args, **kwargs):
+        try:
+            with Client(self.address, authkey=self.authkey) as conn:
+                conn.send((method, args, kwargs))
+                status, result = conn.recv()
+        except (ConnectionError, OSError, EOFError) as e:
+            raise ConnectionError(f"CV engine is not reachable at {self.address}: {e}")
+        if status != 'ok':
+            raise RuntimeError(result)
+        return result
+
+    def current_mouth_state(self):
+        # The views point into a slot the engine may reuse two publishes later, so make sure
+        # it didn't while we were reading it
+        for _ in range(3):
+            state = super().current_mouth_state()
+            shared, snapshot = self.snapshots.last()
+            if snapshot is None or shared.is_current(snapshot):
+                return state
+        return None
+
+    def start_monitoring(self, duration):
+        return self.call('start_monitoring', duration)
+
+    def get_dominant_emotion(self, seconds=None):
+        if seconds:
+            return self.call('get_dominant_emotion', seconds)
+        shared = self.shared()
+        latest = shared.read_summary() if shared is not None else None
+        # None right after start_monitoring until the new window has a sample, like the local service
+        return latest[1]['summary'] if latest else None
+
+    def pipeline_stats(self):
+        return dict(self.call('pipeline_stats'), engine='remote')
+
+    def start_utterance(self):
+        return self.call('start_utterance')
+
+    def end_utterance(self, phonemes=None, language=None, include_trajectory=True):
+        return self.call('end_utterance', phonemes=phonemes, language=language, include_trajectory=include_trajectory)
+
+    def calibrate_neutral_position(self):
+        return self.call('calibrate_neutral_position')
+
+    def warm_up(self):
+        # Models live in the engine process
+        return 0.0
+
+    def _watch_summaries(self, interval=0.05):
+        last_seq = None
+        windows_closed = None
+        while self.is_running:
+            time.sleep(interval)
+            shared = self.shared()
+            latest = shared.read_summary() if shared is not None else None
+            if latest is None or latest[0] == last_seq:
+                continue
+            last_seq, data = latest
+            if windows_closed is None:
+                # Just attached - don't replay whatever happened before
+                windows_closed = data['windows_closed']
+                continue
+            listeners = self.emotion_listeners
+            if data['windows_closed'] != windows_closed:
+                windows_closed = data['windows_closed']
+                listeners = self.window_end_listeners
+            if data['summary'] is None:
+                # A window just started (or ended without samples), nothing to report
+                continue
+            for listener in listeners:
+                try:
+                    listener(data['session_id'], data['summary'])
+                except Exception as e:
+                    logger.error(f"Emotion listener failed: {e}")
+
+    def stop(self):
+        self.is_running = False
+        with self.shared_lock:
+            if self._shared is not None:
+                self._shared.close()
+                self._shared = None
+
+
+if __name__ == '__main__':
+    run_engine()
@@ -0,0 +1,132 @@
+# emotion_aggregator.py
+import math
+import threading
+import time
+
+import numpy as np
+
+from agent.emotion_summary import EMOTION_LABELS
+
+NUM_EMOTIONS = len(EMOTION_LABELS)
+
+
+class EmotionAggregator:
+    """
+    Keeps FER's full 7-class distribution for every sample in a fixed NumPy ring, plus running
+    cumulative sums, so summaries are O(1) to update and windowed queries never rescan samples:
+
+    - since start_window() (the start_monitoring window): running sums, reset on each window
+    - the last N seconds: difference of two cumulative sums, found with a binary search
+    - an exponentially weighted mean with a time-based half-life
+
+    The summary for the current window is recomputed on every add and cached, so readers
+    (the /api/monitor/result poll, confusion checks) just pick it up.
+    """
+
+    def __init__(self, capacity=600, half_life=1.5):
+        self.capacity = capacity
+        self.half_life = half_life
+        # Doubled ring (slot i and i + capacity) so the last n entries are one contiguous view
+        self.timestamps = np.zeros(2 * capacity, dtype=np.float64)
+        self.probs = np.zeros((2 * capacity, NUM_EMOTIONS), dtype=np.float32)
+        # Cumulative sums after each sample: probabilities, argmax-only scores and argmax hits
+        self.cum = np.zeros((2 * capacity, 3, NUM_EMOTIONS), dtype=np.float64)
+        self.totals = np.zeros((3, NUM_EMOTIONS), dtype=np.float64)
+        self.count = 0
+
+        self.window = np.zeros((3, NUM_EMOTIONS), dtype=np.float64)
+        self.window_samples = 0
+        self.window_start = 0.0
+        self.window_duration = 0.0
+
+        self.ewma = np.zeros(NUM_EMOTIONS, dtype=np.float64)
+        self.last_time = None
+        self.summary = None
+        self.lock = threading.Lock()
+        self._row = np.zeros((3, NUM_EMOTIONS), dtype=np.float64)
+
+    def start_window(self, duration, now=None):
+        with self.lock:
+            self.window.fill(0.0)
+            self.window_samples = 0
+            self.window_start = time.time() if now is None else now
+            self.window_duration = duration
+            self.summary = None
+
+    def add(self, emotions, timestamp=None):
+        """Add one FER result ({'angry': 0.01, ...} or a vector in EMOTION_LABELS order)"""
+        timestamp = time.time() if timestamp is None else timestamp
+        if isinstance(emotions, dict):
+            vector = np.array([emotions.get(label, 0.0) for label in EMOTION_LABELS], dtype=np.float64)
+        else:
+            vector = np.asarray(emotions, dtype=np.float64)
+
+        with self.lock:
+            # One row per kind of sum: full distribution, the old argmax (emotion, score), argmax hit
+            top = int(vector.argmax())
+            row = self._row
+            row[0] = vector
+            row[1].fill(0.0)
+            row[1, top] = vector[top]
+            row[2].fill(0.0)
+            row[2, top] = 1.0
+
+            i = self.count % self.capacity
+            self.totals += row
+            for slot in (i, i + self.capacity):
+                self.timestamps[slot] = timestamp
+                self.probs[slot] = vector
+                self.cum[slot] = self.totals
+            self.count += 1
+
+            if self.last_time is None:
+                self.ewma[:] = vector
+            else:
+                dt = max(timestamp - self.last_time, 0.0)
+                alpha = 1.0 - math.exp(-dt * math.log(2) / self.half_life)
+                self.ewma += alpha * (vector - self.ewma)
+            self.last_time = timestamp
+
+            self.window += row
+            self.window_samples += 1
+            self.summary = self._summarize(self.window, self.window_samples, self.window_duration)
+
+    def latest_summary(self):
+        """Precomputed summary of the current window (None before the first sample)"""
+        return self.summary
+
+    def last_seconds(self, seconds, now=None):
+        """Summary of the samples from the last `seconds` seconds, without rescanning them"""
+        now = time.time() if now is None else now
+        with self.lock:
+            n = min(self.count, self.capacity)
+            if n == 0:
+                return None
+            end = (self.count - 1) % self.capacity + self.capacity + 1
+            ts = self.timestamps[end - n:end]
+            first = int(np.searchsorted(ts, now - seconds, side='left'))
+            if first >= n:
+                return None
+            # Sum over [first, n) = cum[last] - cum[first - 1]. The oldest slot has no predecessor
+            # left in the ring, so a window reaching back that far loses exactly that one sample
+            first = max(first, 1) if n == self.capacity else first
+            cum = self.cum[end - n:end]
+            sums = cum[-1] - (cum[first - 1] if first > 0 else 0.0)
+            return self._summarize(sums, n - first, seconds)
+
+    def _summarize(self, sums, samples, duration):
+        if samples <= 0:
+            return None
+        probs, argmax_scores, hits = sums
+        dominant = int(argmax_scores.argmax())
+        return {
+            'emotion': EMOTION_LABELS[dominant],
+            'score': float(argmax_scores[dominant] / samples),
+            # Share of samples where the dominant emotion actually won
+            'confidence': float(hits[dominant] / samples),
+            'counts': {EMOTION_LABELS[k]: float(v) for k, v in enumerate(argmax_scores) if v > 0},
+            'probabilities': {label: round(float(p / samples), 4) for label, p in zip(EMOTION_LABELS, probs)},
+            'ewma': {label: round(float(p), 4) for label, p in zip(EMOTION_LABELS, self.ewma)},
+            'samples': int(samples),
+            'samples_per_second': float(samples / duration) if duration else 0.0
+        }
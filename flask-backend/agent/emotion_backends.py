@@ -0,0 +1,310 @@
+# emotion_backends.py
+"""
+Runtimes for FER's emotion classifier. EMOTION_BACKEND picks one:
+
+    keras                  FER's Keras model on full TensorFlow (default, same as before)
+    tflite:<path>          a TFLite export (float or int8), via tflite-runtime or tf.lite
+    onnx:<path>            an ONNX export (float or int8), via onnxruntime
+
+Exports and checks against the Keras reference on a folder of face crops:
+
+    python -m agent.emotion_backends export --format tflite --int8 --faces fixtures/ --output models/fer_int8.tflite
+    python -m agent.emotion_backends validate --backend tflite:models/fer_int8.tflite --faces fixtures/
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from agent.batching import classify_faces, get_emotion_classifier, preprocess_face
+
+logger = logging.getLogger(__name__)
+
+# Validation passes when the candidate picks the same top emotion this often...
+MIN_AGREEMENT = 0.95
+# ...and its probabilities are this close to the reference on average
+MAX_MEAN_ABS_DIFF = 0.05
+
+
+class KerasBackend:
+    """The model inside fer.FER, as FER runs it"""
+
+    name = 'keras'
+
+    def __init__(self, model):
+        self.model = model
+        self.input_size = tuple(model.input_shape[1:3])
+
+    def predict(self, batch):
+        return np.asarray(self.model.predict_on_batch(batch))
+
+
+class TFLiteBackend:
+    """A TFLite export. int8 models get their inputs quantized and outputs dequantized here"""
+
+    name = 'tflite'
+
+    def __init__(self, path=None, num_threads=None, interpreter=None):
+        """path to a .tflite file, or an interpreter that is already built (e.g. from model_content)"""
+        if interpreter is None:
+            try:
+                from tflite_runtime.interpreter import Interpreter
+            except ImportError:
+                # Full TensorFlow ships the same interpreter
+                from tensorflow.lite import Interpreter
+            interpreter = Interpreter(model_path=path, num_threads=num_threads)
+        self.interpreter = interpreter
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.input_size = tuple(int(v) for v in self.input['shape'][1:3])
+        self.batch_size = int(self.input['shape'][0])
+        # The interpreter keeps per-call state, so one call at a time
+        self.lock = threading.Lock()
+
+    def predict(self, batch):
+        with self.lock:
+            if len(batch) != self.batch_size:
+                self.interpreter.resize_tensor_input(self.input['index'], [len(batch), *self.input_size, 1])
+                self.interpreter.allocate_tensors()
+                self.batch_size = len(batch)
+
+            scale, zero_point = self.input['quantization']
+            if self.input['dtype'] != np.float32 and scale:
+                info = np.iinfo(self.input['dtype'])
+                batch = np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(self.input['dtype'])
+            self.interpreter.set_tensor(self.input['index'], batch)
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self.output['index'])
+
+            scale, zero_point = self.output['quantization']
+            if self.output['dtype'] != np.float32 and scale:
+                output = (output.astype(np.float32) - zero_point) * scale
+            return output
+
+
+class OnnxBackend:
+    """An ONNX export on onnxruntime's CPU provider"""
+
+    name = 'onnx'
+
+    def __init__(self, path, num_threads=None):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_size = tuple(int(v) for v in model_input.shape[1:3])
+
+    def predict(self, batch):
+        return self.session.run(None, {self.input_name: batch.astype(np.float32, copy=False)})[0]
+
+
+def load_backend(spec, num_threads=None):
+    """Backend for a 'tflite:<path>' or 'onnx:<path>' spec ('keras' needs a FER instance, see make_detector)"""
+    kind, _, path = spec.partition(':')
+    kind = kind.strip().lower()
+    num_threads = num_threads or int(os.getenv('EMOTION_BACKEND_THREADS', 0)) or None
+    if kind == 'tflite':
+        return TFLiteBackend(path, num_threads)
+    if kind == 'onnx':
+        return OnnxBackend(path, num_threads)
+    raise ValueError(f"Unknown emotion backend: {spec}")
+
+
+class EmotionDetector:
+    """
+    Drop-in for fer.FER's detect_emotions on top of any backend. Without face_rectangles it
+    falls back to OpenCV's Haar cascade instead of MTCNN, so nothing here needs TensorFlow
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.cascade = None
+
+    def find_faces(self, gray):
+        if self.cascade is None:
+            if not hasattr(cv2, 'CascadeClassifier'):
+                # OpenCV 5 moved the Haar cascades out of the main package
+                logger.warning("No cv2.CascadeClassifier - frames without a FaceMesh box get no emotions")
+                self.cascade = False
+            else:
+                self.cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        if self.cascade is False:
+            return []
+        faces = self.cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(40, 40))
+        # Largest face first, like the single learner in front of the camera
+        return sorted((tuple(int(v) for v in f) for f in faces), key=lambda b: b[2] * b[3], reverse=True)
+
+    def detect_emotions(self, frame, face_rectangles=None):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        boxes = face_rectangles if face_rectangles is not None else self.find_faces(gray)
+        if not boxes:
+            return []
+        faces = [preprocess_face(gray, box, self.backend.input_size) for box in boxes]
+        return [
+            {'box': list(box), 'emotions': emotions}
+            for box, emotions in zip(boxes, classify_faces(self.backend, faces))
+        ]
+
+
+def make_detector(spec=None):
+    """
+    (detector, backend) for EMOTION_BACKEND (or spec). The detector has FER's detect_emotions
+    interface, the backend classifies preprocessed face batches directly
+    """
+    spec = spec or os.getenv('EMOTION_BACKEND', 'keras')
+    if spec.strip().lower() == 'keras':
+        from fer import FER
+        detector = FER(mtcnn=True)
+        return detector, KerasBackend(get_emotion_classifier(detector))
+    backend = load_backend(spec)
+    return EmotionDetector(backend), backend
+
+
+#=============================================================
+# Export and validation
+
+def load_faces(directory, input_size, limit=None):
+    """Every image in directory as a preprocessed face (whole image = face box), e.g. FER-2013 style crops"""
+    paths = sorted(p for ext in ('*.png', '*.jpg', '*.jpeg', '*.bmp')
+                   for p in glob.glob(os.path.join(directory, ext)))[:limit]
+    faces = []
+    for path in paths:
+        gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if gray is not None:
+            faces.append(preprocess_face(gray, (0, 0, gray.shape[1], gray.shape[0]), input_size))
+    if not faces:
+        raise ValueError(f"No face images found in {directory}")
+    return np.stack(faces)
+
+
+def keras_reference():
+    from fer import FER
+    return KerasBackend(get_emotion_classifier(FER(mtcnn=False)))
+
+
+def export_tflite(model, path, int8=False, calibration_faces=None):
+    """Convert the Keras classifier to TFLite, optionally fully int8 (calibrated on calibration_faces)"""
+    import tensorflow as tf
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if int8:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = lambda: ([face[np.newaxis]] for face in calibration_faces)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    with open(path, 'wb') as f:
+        f.write(converter.convert())
+
+
+def export_onnx(model, path, int8=False, calibration_faces=None):
+    """Convert the Keras classifier to ONNX (needs tf2onnx), optionally statically int8-quantized"""
+    import tensorflow as tf
+    import tf2onnx
+
+    h, w = model.input_shape[1:3]
+    signature = (tf.TensorSpec((None, h, w, 1), tf.float32, name='input'),)
+    float_path = path + '.float.onnx' if int8 else path
+    tf2onnx.convert.from_keras(model, input_signature=signature, output_path=float_path)
+    if not int8:
+        return
+
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    class FaceReader(CalibrationDataReader):
+        def __init__(self):
+            self.faces = iter(calibration_faces)
+
+        def get_next(self):
+            face = next(self.faces, None)
+            return None if face is None else {'input': face[np.newaxis]}
+
+    quantize_static(float_path, path, FaceReader(), quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QInt8, weight_type=QuantType.QInt8)
+    os.remove(float_path)
+
+
+def validate(candidate, reference, faces, batch_size=1, repeats=3):
+    """
+    Compare a backend against the reference on the same faces: top-1 agreement, probability error
+    and per-face latency of both
+    """
+    def run(backend):
+        outputs = []
+        times = []
+        for _ in range(repeats):
+            outputs = []
+            start = time.perf_counter()
+            for i in range(0, len(faces), batch_size):
+                outputs.append(backend.predict(faces[i:i + batch_size]))
+            times.append((time.perf_counter() - start) / len(faces) * 1000)
+        return np.concatenate(outputs).astype(np.float32), min(times)
+
+    # One untimed call each so lazy allocation doesn't count
+    candidate.predict(faces[:batch_size])
+    reference.predict(faces[:batch_size])
+    expected, reference_ms = run(reference)
+    actual, candidate_ms = run(candidate)
+
+    diff = np.abs(actual - expected)
+    agreement = float((actual.argmax(axis=1) == expected.argmax(axis=1)).mean())
+    report = {
+        'faces': int(len(faces)),
+        'top1_agreement': round(agreement, 4),
+        'mean_abs_diff': round(float(diff.mean()), 5),
+        'max_abs_diff': round(float(diff.max()), 5),
+        'reference_ms_per_face': round(reference_ms, 3),
+        'candidate_ms_per_face': round(candidate_ms, 3),
+    }
+    report['passed'] = agreement >= MIN_AGREEMENT and report['mean_abs_diff'] <= MAX_MEAN_ABS_DIFF
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export = commands.add_parser('export', help='Export the FER classifier')
+    export.add_argument('--format', choices=['tflite', 'onnx'], required=True)
+    export.add_argument('--output', required=True)
+    export.add_argument('--int8', action='store_true', help='Full int8 quantization (needs --faces for calibration)')
+    export.add_argument('--faces', help='Folder of face crops for calibration and the check afterwards')
+    export.add_argument('--calibration-size', type=int, default=300)
+
+    check = commands.add_parser('validate', help='Compare a backend against the Keras reference')
+    check.add_argument('--backend', required=True, help='e.g. tflite:models/fer_int8.tflite')
+    check.add_argument('--faces', required=True)
+    check.add_argument('--batch-size', type=int, default=1)
+
+    args = parser.parse_args()
+    reference = keras_reference()
+
+    if args.command == 'export':
+        if args.int8 and not args.faces:
+            parser.error('--int8 needs --faces for calibration')
+        faces = load_faces(args.faces, reference.input_size) if args.faces else None
+        calibration = faces[:args.calibration_size] if faces is not None else None
+        exporter = export_tflite if args.format == 'tflite' else export_onnx
+        exporter(reference.model, args.output, args.int8, calibration)
+        print(f"Wrote {args.output} ({os.path.getsize(args.output) / 1024:.0f} KB)")
+        if faces is not None:
+            print(json.dumps(validate(load_backend(f'{args.format}:{args.output}'), reference, faces), indent=2))
+        return
+
+    faces = load_faces(args.faces, reference.input_size)
+    report = validate(load_backend(args.backend), reference, faces, args.batch_size)
+    print(json.dumps(report, indent=2))
+    raise SystemExit(0 if report['passed'] else 1)
+
+
+if __name__ == '__main__':
+    main()
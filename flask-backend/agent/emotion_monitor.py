@@ -1,358 +1,477 @@
 # emotion_monitor.py
 import cv2
-from fer import FER
-from collections import deque
+import logging
+import os
+import threading
 import time
-import mediapipe as mp
 
 import numpy as np
 
+from agent.capture import FrameCapture, make_frame_source
+from agent.landmarks import LandmarkStore, FaceTrack, UPPER_LIP, LOWER_LIP
+from agent.scheduler import InferenceScheduler
+from agent.motion import MotionGate, scale_frame
+from agent.emotion_aggregator import EmotionAggregator
+from agent.snapshot import SnapshotPublisher
+from agent.pronunciation import get_registry
+from agent.articulation import ArticulationAnalyzer
+from agent.tongue import TongueDetector
+from agent.preview import PreviewRenderer, PREVIEW_MODES
+from agent.metrics import registry
 
-class EmotionMonitorService:
+logger = logging.getLogger(__name__)
+
+
+class PronunciationAnalysis:
+    """
+    Mouth/tongue analysis on the latest published snapshot. Shared by EmotionMonitorService and
+    the shared-memory client in agent/cv_engine.py; expects self.snapshots, self.scheduler,
+    self.tongue_detector and self.pronunciation_guide
+    """
+
+    def analyze_mouth_shape(self, landmarks):
+        """Analyze mouth shape for pronunciation feedback (landmarks is a (478, dims) array)"""
+        # Calculate mouth metrics
+        mouth_height = float(np.abs(landmarks[UPPER_LIP, 1] - landmarks[LOWER_LIP, 1]).mean())
+        mouth_width = float(abs(landmarks[308, 0] - landmarks[78, 0]))
+        
+        # Analyze mouth shape
+        shape_analysis = {
+            # Ratio of height to width. Degenerate fits (corners or lips on the same spot) are clamped
+            # like in agent/articulation.py, so the result stays finite and valid JSON
+            'openness': mouth_height / max(mouth_width, 1e-6),
+            'roundness': mouth_width / max(mouth_height, 1e-6) < 2.5,  # True if mouth is relatively round
+            'spread': mouth_width > self.neutral_mouth_width * 1.2 if hasattr(self, 'neutral_mouth_width') else None
+        }
+        
+        # Map to pronunciation feedback
+        feedback = None
+        if shape_analysis['openness'] < 0.2:
+            feedback = "Try opening your mouth more"
+        elif shape_analysis['roundness']:
+            feedback = "Good round shape for vowel sounds"
+        elif shape_analysis['spread']:
+            feedback = "Good spread position for 'ee' sounds"
+            
+        return {
+            'metrics': shape_analysis,
+            'feedback': feedback
+        }
+
+    #============
+    # Tongue Position 
+    def detect_tongue_position(self, frame, landmarks):
+        """Basic tongue position detection for pronunciation feedback (ROI-only, see agent/tongue.py)"""
+        return self.tongue_detector.detect(frame, landmarks)
+    
+    def current_mouth_state(self):
+        """Mouth metrics and tongue position from the latest snapshot, or None if there is no face"""
+        # Landmarks and pixels from the same frame, published by the video loop. This runs on
+        # the Flask thread, so it must never touch the camera or the FaceMesh graph directly
+        snapshot = self.snapshots.read()
+        if snapshot is None or snapshot.landmarks is None:
+            logger.debug("No face in the latest snapshot")
+            return None
+            
+        # Analyze mouth shape on the snapshot's landmarks
+        landmarks = snapshot.landmarks
+        mouth_analysis = self.analyze_mouth_shape(landmarks)
+
+        logger.debug(f"Mouth analysis: {mouth_analysis}")
+        
+        # Tongue analysis on the exact frame those landmarks came from
+        with self.scheduler.timed('tongue'):
+            tongue_position = self.detect_tongue_position(snapshot.frame, landmarks)
+        return mouth_analysis, tongue_position
+
+    def analyze_pronunciation(self, phoneme, language=None):
+        """Analyze pronunciation for a specific phoneme"""
+        logger.debug(f"Analyzing pronunciation of {phoneme}")
+
+        state = self.current_mouth_state()
+        if state is None:
+            return None
+        mouth_analysis, tongue_position = state
+        
+        # Get language-specific feedback
+        guide = LanguagePronunciationGuide(language) if language else self.pronunciation_guide
+        feedback = guide.get_feedback(
+            phoneme,
+            mouth_analysis['metrics'],
+            tongue_position
+        )
+        
+        return {
+            'feedback': feedback,
+            'mouth_metrics': mouth_analysis['metrics'],
+            'tongue_position': tongue_position
+        }
+
+    def analyze_pronunciation_batch(self, phonemes, language=None):
+        """Score a list of phonemes (a word or phrase) against the current mouth shape in one pass"""
+        state = self.current_mouth_state()
+        if state is None:
+            return None
+        mouth_analysis, tongue_position = state
+
+        guide = LanguagePronunciationGuide(language) if language else self.pronunciation_guide
+        return {
+            'phonemes': guide.score_phonemes(phonemes, mouth_analysis['metrics'], tongue_position),
+            'mouth_metrics': mouth_analysis['metrics'],
+            'tongue_position': tongue_position
+        }
+
+
+class EmotionMonitorService(PronunciationAnalysis):
     _instance = None
     
-    def __new__(cls):
+    def __new__(cls, *args, **kwargs):
         if cls._instance is None:
             cls._instance = super(EmotionMonitorService, cls).__new__(cls)
             cls._instance._initialized = False
         return cls._instance
     
-    def __init__(self):
+    def __init__(self, source=None, cascade=True, stage_budgets=None, inference_width=640, motion_gate=True, preview=None):
         if self._initialized:
             return
             
-        self.emotion_detector = FER(mtcnn=True)
-        self.cap = cv2.VideoCapture(0)
+        # FER (TensorFlow) and FaceMesh are loaded on first use, see the properties below.
+        # MTCNN is only used when the FaceMesh track is lost (or cascade is off).
+        # EMOTION_BACKEND swaps FER's Keras classifier for a TFLite/ONNX export (agent/emotion_backends.py)
+        self._emotion_detector = None
+        self.emotion_backend = None
+        self._face_mesh = None
+        self.model_lock = threading.Lock()
+        self.cascade = cascade
+        self.face_track = FaceTrack()
+        self.mtcnn_calls = 0
+        self.cascade_calls = 0
+
+        # Frames come from a capture thread so inference always works on the freshest one.
+        # source can be a FrameSource or a spec string like "video:lesson.mp4" (see make_frame_source)
+        if source is None or isinstance(source, str):
+            source = make_frame_source(source)
+        self.capture = FrameCapture(source)
+        self.last_frame_seq = 0
         self.is_running = True
         self.is_monitoring = False
-        self.emotion_buffer = deque(maxlen=10)
-        self.landmark_buffer = deque(maxlen=10)  # Store recent landmark data
+        # Full FER distributions with O(1) running/decayed summaries (see agent/emotion_aggregator.py)
+        self.emotion_buffer = EmotionAggregator()
+        # Recent landmark data in pixel coords, ~10 seconds of history at 30 fps
+        self.landmark_buffer = LandmarkStore(capacity=300)
 
         self.monitoring_duration = 0
         self.monitoring_start = 0
-        
-        # Initialize MediaPipe Face Mesh
-        self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
-            max_num_faces=1,
-            refine_landmarks=True,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
-        self.mp_drawing = mp.solutions.drawing_utils
-        self.mp_drawing_styles = mp.solutions.drawing_styles
-        self.drawing_spec = self.mp_drawing.DrawingSpec(thickness=1, circle_radius=1)
+
+        # Per-stage rates, e.g. stage_budgets={'fer': StageBudget(0, 10, 80)} (see agent/scheduler.py)
+        self.scheduler = InferenceScheduler(stage_budgets)
+        self.last_landmarks = None
+        self.last_emotion = None
+        self.last_emotion_probs = None
+        self.tongue_detector = TongueDetector()
+
+        # Utterance window marked by the client, analyzed over the landmark history
+        self.articulation = ArticulationAnalyzer(capacity=self.landmark_buffer.capacity)
+        self.utterance_start = None
+
+        # Latest frame + matching landmarks for the HTTP handlers (see analyze_pronunciation)
+        self.snapshots = SnapshotPublisher()
+
+        # Called as listener(session_id, summary) whenever a new emotion sample lands
+        self.session_id = 'default'
+        self.emotion_listeners = []
+        # ...and window_end_listeners(session_id, summary) when a monitoring window closes
+        self.window_end_listeners = []
+
+        # Models run on a copy at most inference_width wide (None = full resolution), and
+        # nearly identical frames reuse the previous results instead of running them at all
+        self.inference_width = inference_width
+        self.motion_gate = MotionGate() if motion_gate else None
+
+        # Exposed through /api/metrics (agent/metrics.py)
+        self.frame_rate = registry.rate('cv_processed_fps', 'Frames per second the inference loop got through')
+        registry.register_collector(self.collect_metrics)
+
+        # Overlays are drawn off the inference loop from the snapshots: 'window' (local dev),
+        # 'mjpeg' (served at /api/monitor/preview.mjpg) or 'headless' (no drawing at all)
+        self.preview_mode = (preview or os.getenv('PREVIEW_MODE', 'window')).lower()
+        if self.preview_mode not in PREVIEW_MODES:
+            raise ValueError(f"Unknown preview mode: {self.preview_mode} (expected one of {', '.join(PREVIEW_MODES)})")
+        self.preview = None
+        if self.preview_mode != 'headless':
+            self.preview = PreviewRenderer(self)
 
         # Hardcoding the language pronunciation guide to french for now 
         self.pronunciation_guide = LanguagePronunciationGuide('french')
         
-        if not self.cap.isOpened():
-            raise RuntimeError("Could not open video capture device")
+        self.capture.start()
         
         self._initialized = True
 
-    def process_landmarks(self, frame):
-        """Process facial landmarks using MediaPipe"""
+    @property
+    def emotion_detector(self):
+        if self._emotion_detector is None:
+            with self.model_lock:
+                if self._emotion_detector is None:
+                    # The default Keras backend pulls in TensorFlow, which is most of our startup time
+                    from agent.emotion_backends import make_detector
+                    self._emotion_detector, self.emotion_backend = make_detector()
+                    logger.info(f"Emotion classifier backend: {self.emotion_backend.name}")
+        return self._emotion_detector
+
+    @property
+    def face_mesh(self):
+        if self._face_mesh is None:
+            with self.model_lock:
+                if self._face_mesh is None:
+                    import mediapipe as mp
+                    self._face_mesh = mp.solutions.face_mesh.FaceMesh(
+                        max_num_faces=1,
+                        refine_landmarks=True,
+                        min_detection_confidence=0.5,
+                        min_tracking_confidence=0.5
+                    )
+        return self._face_mesh
+
+    def warm_up(self):
+        """Load both models and run one dummy inference so the first real frame isn't the slow one"""
+        start = time.perf_counter()
+        frame = np.zeros((240, 320, 3), dtype=np.uint8)
+        self.emotion_detector.detect_emotions(frame, face_rectangles=[(100, 60, 120, 120)])
+        self.face_mesh.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        elapsed = time.perf_counter() - start
+        logger.info(f"CV models warmed up in {elapsed * 1000:.0f} ms")
+        return elapsed
+
+    def process_landmarks(self, frame, full_shape=None):
+        """
+        Process facial landmarks using MediaPipe. frame may be a downscaled copy, landmarks
+        are always stored in the coordinates of full_shape (the original frame)
+        """
+        full_shape = frame.shape if full_shape is None else full_shape
         frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         results = self.face_mesh.process(frame_rgb)
         
         if results.multi_face_landmarks:
             face_landmarks = results.multi_face_landmarks[0]  # Get first face
             
-            # Store landmark positions
-            landmark_positions = []
-            for landmark in face_landmarks.landmark:
-                h, w, _ = frame.shape
-                x, y = int(landmark.x * w), int(landmark.y * h)
-                landmark_positions.append((x, y))
-            
-            self.landmark_buffer.append(landmark_positions)
-            
-            # Draw landmarks on frame for face
-            self.mp_drawing.draw_landmarks(
-                image=frame,
-                landmark_list=face_landmarks,
-                connections=self.mp_face_mesh.FACEMESH_TESSELATION,
-                landmark_drawing_spec=None,
-                connection_drawing_spec=self.mp_drawing_styles.get_default_face_mesh_tesselation_style()
-            )
-
-            # Draw landmarks on frame for lips
-            self.mp_drawing.draw_landmarks(
-                image=frame,
-                landmark_list=face_landmarks,
-                connections=self.mp_face_mesh.FACEMESH_LIPS,
-                landmark_drawing_spec=None,
-                connection_drawing_spec=self.mp_drawing.DrawingSpec(
-                    color=(0, 0, 255), thickness=2)
-            )
-            
+            # Store landmark positions (one vectorized conversion, result is a view into the store).
+            # MediaPipe landmarks are normalized, so mapping back to the full frame is free
+            h, w = full_shape[:2]
+            landmark_positions = self.landmark_buffer.append_normalized(face_landmarks.landmark, w, h)
+            self.face_track.update(landmark_positions, full_shape)
             return landmark_positions
+
+        self.face_track.update(None, full_shape)
         return None
 
+    def detect_emotions(self, frame, scale=1.0):
+        """
+        Run FER on the frame, reusing the FaceMesh face box instead of MTCNN when we have one.
+        scale is how much frame was shrunk relative to the full frame the track lives in
+        """
+        box = self.face_track.current() if self.cascade else None
+        if box is not None:
+            self.cascade_calls += 1
+            if scale != 1.0:
+                box = tuple(int(v * scale) for v in box)
+            return self.emotion_detector.detect_emotions(frame, face_rectangles=[box])
+        self.mtcnn_calls += 1
+        return self.emotion_detector.detect_emotions(frame)
+
     def run_video_display(self):
-        """Main video loop - runs in main thread"""
-        cv2.namedWindow('Emotion Monitor', cv2.WINDOW_NORMAL)
-        
+        """
+        Main entry point - call from the main thread. In 'window' mode the inference loop moves to a
+        worker thread and the main thread only shows the preview; otherwise it runs the loop itself
+        """
+        if self.preview_mode == 'window':
+            worker = threading.Thread(target=self.run_inference_loop, name='inference', daemon=True)
+            worker.start()
+            try:
+                self.preview.run_window()
+            finally:
+                self.is_running = False
+                worker.join(timeout=2.0)
+            return
+
+        if self.preview is not None:
+            self.preview.start()
+        self.run_inference_loop()
+
+    def run_inference_loop(self):
+        """Inference on the freshest frame. Each stage runs at the rate the scheduler allows, nothing is drawn here"""
         while self.is_running:
-            ret, frame = self.cap.read()
-            if not ret:
+            latest = self.capture.wait_newer(self.last_frame_seq, timeout=1.0)
+            if latest is None:
+                if not self.capture.is_running:
+                    break
                 continue
+            # The buffered frame is shared with the HTTP handlers, so it is never drawn on
+            self.last_frame_seq, _, raw_frame = latest
+
+            self.process_frame(raw_frame, latest[1])
+
+    def process_frame(self, raw_frame, captured_at, now=None):
+        """One pass of the inference loop over raw_frame. now is the scheduler's clock (defaults to time.time())"""
+        now = time.time() if now is None else now
+        self.frame_rate.mark(now)
+        scheduler = self.scheduler
+        scheduler.set_active(self.is_monitoring)
 
-            # Process emotions at the same time
-            if self.is_monitoring:
-                emotions = self.emotion_detector.detect_emotions(frame)
-                if emotions:
-                    emotion_dict = emotions[0]['emotions']
-                    dominant = max(emotion_dict.items(), key=lambda x: x[1])
-                    self.emotion_buffer.append(dominant)
-                    cv2.putText(frame, f"Emotion: {dominant[0]}", 
-                              (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 
-                              1, (0, 255, 0), 2)
-                
-                # Process landmarks
-                landmarks = self.process_landmarks(frame)
-                if landmarks:
-                    # You can add additional visualization or processing here
-                    cv2.putText(frame, "Landmarks detected", 
-                              (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 
-                              1, (0, 255, 0), 2)
-                    
-                if time.time() - self.monitoring_start >= self.monitoring_duration:
-                    self.is_monitoring = False
+        gate = self.motion_gate
+        small_frame, scale = scale_frame(raw_frame, self.inference_width)
+
+        # Landmarks first so FER can reuse the face box FaceMesh just found. While an utterance
+        # is open every frame gets landmarks (no rate limit, no motion gate) for end_utterance
+        if self.utterance_start is not None or scheduler.due('facemesh', now):
+            if self.utterance_start is not None or gate is None or gate.check_frame(small_frame, now):
+                with scheduler.timed('facemesh', now):
+                    self.last_landmarks = self.process_landmarks(small_frame, raw_frame.shape)
+                self.snapshots.publish(raw_frame, self.last_landmarks, captured_at)
             else:
-                cv2.putText(frame, "Ready", (10, 30), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                # Still process landmarks when not monitoring emotions
-                self.process_landmarks(frame)
+                # Frame barely changed - keep the landmarks, and don't ask again until the next interval
+                scheduler.reuse('facemesh', now)
 
-            cv2.imshow('Emotion Monitor', frame)
-            
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                self.is_running = False
-                break
+        # Process emotions only inside a monitoring window
+        if self.is_monitoring:
+            if scheduler.due('fer', now):
+                if gate is None or self.last_emotion is None or gate.check_landmarks(self.last_landmarks, now):
+                    with scheduler.timed('fer', now):
+                        emotions = self.detect_emotions(small_frame, scale)
+                    if emotions:
+                        self.last_emotion_probs = emotions[0]['emotions']
+                        self.last_emotion = max(self.last_emotion_probs.items(), key=lambda x: x[1])
+                        self.emotion_buffer.add(self.last_emotion_probs, now)
+                        self._notify(self.emotion_listeners)
+                else:
+                    # Face hasn't moved - the previous result counts as this interval's sample
+                    scheduler.reuse('fer', now)
+                    self.emotion_buffer.add(self.last_emotion_probs, now)
+                    self._notify(self.emotion_listeners)
+
+            if now - self.monitoring_start >= self.monitoring_duration:
+                self.is_monitoring = False
+                self._notify(self.window_end_listeners)
+
+    def _notify(self, listeners):
+        if not listeners:
+            return
+        summary = self.get_dominant_emotion()
+        for listener in listeners:
+            try:
+                listener(self.session_id, summary)
+            except Exception as e:
+                logger.error(f"Emotion listener failed: {e}")
+
+    def pipeline_stats(self):
+        """Counters for how much work the pipeline did (and skipped)"""
+        return {
+            'stages': self.scheduler.stats(),
+            'motion_gate': self.motion_gate.stats() if self.motion_gate is not None else None,
+            'fer_face_source': {'cascade': self.cascade_calls, 'mtcnn': self.mtcnn_calls},
+            'emotion_backend': self.emotion_backend.name if self.emotion_backend is not None else None,
+            'dropped_frames': self.capture.dropped,
+            'fps': {'capture': round(self.capture.frame_rate.per_second(), 1), 'processed': round(self.frame_rate.per_second(), 1)},
+            'latency': registry.summary(),
+            'preview': dict(self.preview.stats(), mode=self.preview_mode) if self.preview is not None else {'mode': 'headless'}
+        }
+
+    def collect_metrics(self):
+        """Counters owned by other objects, read at scrape time"""
+        samples = [
+            ('cv_frames_dropped_total', 'counter', 'Frames the capture thread overwrote before inference saw them', {}, self.capture.dropped),
+            ('cv_capture_read_failures_total', 'counter', 'Frame source reads that returned nothing', {}, self.capture.read_failures),
+            ('cv_fer_face_source_total', 'counter', 'FER runs by where the face box came from', {'source': 'cascade'}, self.cascade_calls),
+            ('cv_fer_face_source_total', 'counter', 'FER runs by where the face box came from', {'source': 'mtcnn'}, self.mtcnn_calls),
+            ('cv_monitoring', 'gauge', '1 while a monitoring window is open', {}, int(self.is_monitoring)),
+        ]
+        for name, state in self.scheduler.stats().items():
+            samples.append(('cv_stage_runs_total', 'counter', 'Runs per CV pipeline stage', {'stage': name}, state['runs']))
+            samples.append(('cv_stage_skips_total', 'counter', 'Frames a stage was skipped by the scheduler', {'stage': name}, state['skips']))
+            samples.append(('cv_stage_target_hz', 'gauge', 'Current scheduler target rate per stage', {'stage': name}, state['target_hz']))
+        if self.motion_gate is not None:
+            for stage, counts in self.motion_gate.stats().items():
+                samples.append(('cv_motion_gate_reused_total', 'counter', 'Stage results reused because the frame did not change', {'stage': stage}, counts['reused']))
+        return samples
 
     def start_monitoring(self, duration: float) -> bool:
-        self.emotion_buffer.clear()
+        self.emotion_buffer.start_window(duration)
+        self.last_emotion = None
+        self.last_emotion_probs = None
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
         self.monitoring_duration = duration
         self.monitoring_start = time.time()
         self.is_monitoring = True
         return True
 
-    def get_dominant_emotion(self):
-        if not self.emotion_buffer:
-            return None
-
-        emotion_counts = {}
-        for emotion, score in self.emotion_buffer:
-            emotion_counts[emotion] = emotion_counts.get(emotion, 0) + score
-
-        print(emotion_counts)
-
-        dominant = max(emotion_counts.items(), key=lambda x: x[1])
-        return {
-            'emotion': dominant[0],
-            'score': dominant[1] / len(self.emotion_buffer),
-            'confidence': len(self.emotion_buffer) / self.monitoring_duration,
-            'counts': emotion_counts
-        }
+    def get_dominant_emotion(self, seconds=None):
+        """
+        Summary of the current monitoring window (precomputed on every new sample),
+        or of just the last `seconds` seconds of samples
+        """
+        if seconds:
+            return self.emotion_buffer.last_seconds(seconds)
+        return self.emotion_buffer.latest_summary()
 
     def stop(self):
         """Stop video processing and release all resources"""
         self.is_running = False
-        if self.cap is not None:
-            self.cap.release()
-        self.face_mesh.close()    
-        cv2.destroyAllWindows()
-
-    def analyze_mouth_shape(self, landmarks):
-        """Analyze mouth shape for pronunciation feedback"""
-        # MediaPipe indices for mouth landmarks
-        UPPER_LIP = [13, 312, 311, 310, 415, 308]
-        LOWER_LIP = [14, 317, 402, 318, 324, 308]
-        
-        # Extract mouth landmarks
-        upper_lip_pts = [landmarks[i] for i in UPPER_LIP]
-        lower_lip_pts = [landmarks[i] for i in LOWER_LIP]
-        
-        # Calculate mouth metrics
-        mouth_height = np.mean([abs(u[1] - l[1]) for u, l in zip(upper_lip_pts, lower_lip_pts)])
-        mouth_width = abs(landmarks[308][0] - landmarks[78][0])
-        
-        # Analyze mouth shape
-        shape_analysis = {
-            'openness': mouth_height / mouth_width,  # Ratio of height to width
-            'roundness': mouth_width / mouth_height < 2.5,  # True if mouth is relatively round
-            'spread': mouth_width > self.neutral_mouth_width * 1.2 if hasattr(self, 'neutral_mouth_width') else None
-        }
-        
-        # Map to pronunciation feedback
-        feedback = None
-        if shape_analysis['openness'] < 0.2:
-            feedback = "Try opening your mouth more"
-        elif shape_analysis['roundness']:
-            feedback = "Good round shape for vowel sounds"
-        elif shape_analysis['spread']:
-            feedback = "Good spread position for 'ee' sounds"
-            
-        return {
-            'metrics': shape_analysis,
-            'feedback': feedback
-        }
+        self.capture.stop()
+        if self.preview is not None:
+            self.preview.stop()
+        if self._face_mesh is not None:
+            self._face_mesh.close()
 
     def calibrate_neutral_position(self):
         """Calibrate neutral mouth position for baseline"""
         if not self.landmark_buffer:
             return False
             
-        # Get average mouth width in neutral position
-        landmarks = self.landmark_buffer[-1]  # Use most recent landmarks
-        self.neutral_mouth_width = abs(landmarks[308][0] - landmarks[78][0])
+        # Get average mouth width in neutral position over the last ~second of frames
+        recent = self.landmark_buffer.window(30)
+        self.neutral_mouth_width = float(np.abs(recent[:, 308, 0] - recent[:, 78, 0]).mean())
         return True
 
-    #============
-    # Tongue Position 
-    def detect_tongue_position(self, frame, landmarks):
-        """Basic tongue position detection for pronunciation feedback"""
-        # MediaPipe indices for inner mouth region
-        INNER_MOUTH = [78, 308, 14, 13]
-        
-        # Create mask for inner mouth region
-        h, w = frame.shape[:2]
-        mask = np.zeros((h, w), dtype=np.uint8)
-        mouth_pts = np.array([landmarks[i] for i in INNER_MOUTH], dtype=np.int32)
-        cv2.fillPoly(mask, [mouth_pts], 255)
-        
-        # Apply mask to frame
-        mouth_region = cv2.bitwise_and(frame, frame, mask=mask)
-        
-        # Convert to HSV and look for pink/red colors (tongue)
-        hsv = cv2.cvtColor(mouth_region, cv2.COLOR_BGR2HSV)
-        lower_pink = np.array([145, 30, 30])
-        upper_pink = np.array([175, 255, 255])
-        tongue_mask = cv2.inRange(hsv, lower_pink, upper_pink)
-        
-        # Calculate tongue position metrics
-        tongue_pixels = cv2.countNonZero(tongue_mask)
-        mouth_area = cv2.contourArea(mouth_pts)
-        
-        if tongue_pixels > 0:
-            # Find tongue contour centroid
-            M = cv2.moments(tongue_mask)
-            if M["m00"] != 0:
-                cx = int(M["m10"] / M["m00"])
-                cy = int(M["m01"] / M["m00"])
-                
-                # Compare with mouth center
-                mouth_center = np.mean(mouth_pts, axis=0)
-                
-                return {
-                    'visible': True,
-                    'position': 'front' if cy < mouth_center[1] else 'back',
-                    'relative_height': (mouth_center[1] - cy) / mouth_area if mouth_area > 0 else 0
-                }
-        
-        return {'visible': False}
-    
-    def analyze_pronunciation(self, phoneme):
-        """Analyze pronunciation for a specific phoneme"""
-        print("Starting analysis yayay")
-
-        print((not self.landmark_buffer))
-        print((not hasattr(self, 'pronunciation_guide')))
+    def start_utterance(self):
+        """Mark the start of an utterance, returns the server timestamp used"""
+        self.utterance_start = time.time()
+        # The inference loop runs FaceMesh on every frame until end_utterance clears this
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+        return self.utterance_start
 
-        # if not self.landmark_buffer or not hasattr(self, 'pronunciation_guide'):
-        if not self.landmark_buffer:
-            print("is this failing?")
+    def end_utterance(self, phonemes=None, language=None, include_trajectory=True):
+        """
+        Analyze every landmark frame since start_utterance: trajectory, peak and steady-state
+        mouth shape, and (if phonemes are given) per-phoneme alignment against the targets
+        """
+        if self.utterance_start is None:
+            return None
+        start, self.utterance_start = self.utterance_start, None
+        window, timestamps = self.landmark_buffer.since(start, time.time())
+        if len(window) == 0:
             return None
-        
-        print("Hello we got in here")
-            
-        # Get latest landmarks and analyze mouth shape
-        landmarks = self.landmark_buffer[-1]
-        mouth_analysis = self.analyze_mouth_shape(landmarks)
 
-        print(mouth_analysis)
-        
-        # Get current frame for tongue analysis
-        ret, frame = self.cap.read()
-        tongue_position = self.detect_tongue_position(frame, landmarks) if ret else {'visible': False}
-        
-        # Get language-specific feedback
-        feedback = self.pronunciation_guide.get_feedback(
-            phoneme,
-            mouth_analysis['metrics'],
-            tongue_position
-        )
-        
-        return {
-            'feedback': feedback,
-            'mouth_metrics': mouth_analysis['metrics'],
-            'tongue_position': tongue_position
-        }
+        targets = get_registry().get(language) if language else self.pronunciation_guide.targets
+        return self.articulation.analyze(window, timestamps, targets, phonemes, include_trajectory)
 
 class LanguagePronunciationGuide:
-    """Language-specific pronunciation configurations and feedback"""
+    """Language-specific pronunciation feedback, backed by the compiled targets in agent/pronunciation.py"""
     
     def __init__(self, language='french'):
         self.language = language.lower()
-        self.pronunciation_configs = {
-            'french': {
-                # French specific mouth shapes and positions - using expected Landmark positions from Mediapipe
-                'rounded_vowels': {
-                    'u': {'openness': 0.15, 'roundness': True, 'spread': False},  # as in 'tu'
-                    'ou': {'openness': 0.2, 'roundness': True, 'spread': False},  # as in 'vous'
-                    'eu': {'openness': 0.25, 'roundness': True, 'spread': False}, # as in 'deux'
-                },
-                'nasal_vowels': {
-                    'an': {'openness': 0.4, 'roundness': False, 'spread': True},  # as in 'dans'
-                    'on': {'openness': 0.3, 'roundness': True, 'spread': False},  # as in 'bon'
-                    'in': {'openness': 0.25, 'roundness': False, 'spread': True}, # as in 'pain'
-                },
-                'tongue_positions': {
-                    'r': {'position': 'back', 'relative_height': 0.6},  # French uvular R
-                    'l': {'position': 'front', 'relative_height': 0.7}, # French L
-                }
-            }
-            # Add other languages here with their specific configs
-        }
-        print("Guide initialized successfully")
+        # Targets are loaded and compiled once per process, so constructing a guide is just a lookup
+        self.targets = get_registry().get(self.language)
 
     def get_feedback(self, phoneme, mouth_metrics, tongue_data):
         """Generate language-specific feedback for a given phoneme"""
-        if self.language not in self.pronunciation_configs:
+        if self.targets is None:
             return "Language not supported for detailed feedback"
-            
-        config = self.pronunciation_configs[self.language]
-        feedback = []
-        
-        # French-specific feedback
-        if self.language == 'french':
-            print("Successfully identified french")
-            # Check rounded vowels
-            if phoneme in config['rounded_vowels']:
-                expected = config['rounded_vowels'][phoneme]
-                if abs(mouth_metrics['openness'] - expected['openness']) > 0.1:
-                    if mouth_metrics['openness'] > expected['openness']:
-                        feedback.append("Fermez un peu plus les lèvres (Close your lips a bit more)")
-                    else:
-                        feedback.append("Ouvrez un peu plus les lèvres (Open your lips a bit more)")
-                
-                if expected['roundness'] and not mouth_metrics['roundness']:
-                    feedback.append("Arrondissez plus les lèvres (Round your lips more)")
-            
-            # Check nasal vowels
-            elif phoneme in config['nasal_vowels']:
-                expected = config['nasal_vowels'][phoneme]
-                if abs(mouth_metrics['openness'] - expected['openness']) > 0.1:
-                    feedback.append("Ajustez l'ouverture pour le son nasal (Adjust opening for nasal sound)")
-                    
-            # Check tongue position for 'r' sound
-            elif phoneme == 'r' and tongue_data['visible']:
-                if tongue_data['position'] != 'back':
-                    feedback.append("Placez la langue plus en arrière pour le 'R' français (Place tongue further back for French 'R')")
-                    
-        return feedback if feedback else ["Très bien! (Very good!)"]
-
-
+        return self.targets.feedback(phoneme, mouth_metrics, tongue_data)
 
+    def score_phonemes(self, phonemes, mouth_metrics, tongue_data):
+        """Score a whole word/phrase worth of phonemes in one vectorized pass"""
+        if self.targets is None:
+            return None
+        return self.targets.score_batch(phonemes, mouth_metrics, tongue_data)
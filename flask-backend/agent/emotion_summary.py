@@ -0,0 +1,34 @@
+# emotion_summary.py
+
+# FER's output classes, in the order of its classifier (FER._get_labels())
+EMOTION_LABELS = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
+
+# Emotions that suggest the learner didn't follow, and the score above which we offer a follow-up.
+# TODO: Can potentially make confusion indicators more sensitive by just treating
+# it as if confusion exists when we see neutral, surprise, and anger all in one buffer or something
+CONFUSION_INDICATORS = {
+    'neutral': 0.7,
+    'surprise': 0.6,
+    'fear': 0.5,
+    'sad': 0.5
+}
+
+
+def needs_followup(emotion_data):
+    """The confusion rule: a confusion-type emotion dominating above its threshold"""
+    if not emotion_data:
+        return False
+    return (
+        emotion_data['emotion'] in CONFUSION_INDICATORS and
+        emotion_data['score'] > CONFUSION_INDICATORS[emotion_data['emotion']]
+    )
+
+
+def confusion_trending(emotion_data, margin=0.8):
+    """Heading towards the confusion rule: a confusion-type emotion within margin of its threshold"""
+    if not emotion_data:
+        return False
+    return (
+        emotion_data['emotion'] in CONFUSION_INDICATORS and
+        emotion_data['score'] > CONFUSION_INDICATORS[emotion_data['emotion']] * margin
+    )
@@ -0,0 +1,81 @@
+# events.py
+import queue
+import threading
+import time
+
+from agent.emotion_summary import needs_followup
+
+
+class EventBroker:
+    """Fan-out of small JSON-able events to whoever is subscribed to a session (one queue each)"""
+
+    def __init__(self, max_queued=32):
+        self.max_queued = max_queued
+        self.subscribers = {}       # session_id -> set of queues
+        self.lock = threading.Lock()
+
+    def subscribe(self, session_id):
+        q = queue.Queue(maxsize=self.max_queued)
+        with self.lock:
+            self.subscribers.setdefault(session_id, set()).add(q)
+        return q
+
+    def unsubscribe(self, session_id, q):
+        with self.lock:
+            subscribers = self.subscribers.get(session_id)
+            if subscribers is not None:
+                subscribers.discard(q)
+                if not subscribers:
+                    del self.subscribers[session_id]
+
+    def publish(self, session_id, event, data):
+        with self.lock:
+            subscribers = list(self.subscribers.get(session_id, ()))
+        for q in subscribers:
+            try:
+                q.put_nowait((event, data))
+            except queue.Full:
+                # A client that stopped reading shouldn't hold anyone else up
+                pass
+
+    def has_subscribers(self, session_id):
+        with self.lock:
+            return bool(self.subscribers.get(session_id))
+
+
+class ConfusionNotifier:
+    """
+    Turns emotion samples into push events: 'confusion' the moment the confusion rule starts
+    firing (once per window, or again after min_interval if it keeps firing), and 'window_end'
+    when a monitoring window closes
+    """
+
+    def __init__(self, broker, min_interval=3.0):
+        self.broker = broker
+        self.min_interval = min_interval
+        self.last_sent = {}     # session_id -> time of the last confusion event this window
+        self.lock = threading.Lock()
+
+    def on_sample(self, session_id, summary):
+        if not needs_followup(summary):
+            return
+        now = time.time()
+        with self.lock:
+            last = self.last_sent.get(session_id)
+            if last is not None and now - last < self.min_interval:
+                return
+            self.last_sent[session_id] = now
+        self.broker.publish(session_id, 'confusion', {
+            'session_id': session_id,
+            'emotion': summary,
+            'needs_followup': True
+        })
+
+    def on_window_end(self, session_id, summary):
+        with self.lock:
+            self.last_sent.pop(session_id, None)
+        self.broker.publish(session_id, 'window_end', {
+            'session_id': session_id,
+            'emotion': summary,
+            'needs_followup': needs_followup(summary)
+        })
@@ -0,0 +1,139 @@
+# landmarks.py
+import threading
+import time
+
+import numpy as np
+
+# FaceMesh with refine_landmarks=True gives 468 face points + 10 iris points
+NUM_LANDMARKS = 478
+
+# MediaPipe indices for mouth landmarks
+UPPER_LIP = [13, 312, 311, 310, 415, 308]
+LOWER_LIP = [14, 317, 402, 318, 324, 308]
+MOUTH_LEFT, MOUTH_RIGHT = 78, 308
+
+
+def landmarks_to_pixels(landmarks, width, height, dims=2, num_landmarks=NUM_LANDMARKS):
+    """MediaPipe normalized landmarks -> float32 (n, dims) pixel array, in one vectorized conversion"""
+    attrs = ('x', 'y', 'z')[:dims]
+    n = min(len(landmarks), num_landmarks)
+    points = np.fromiter(
+        (getattr(lm, a) for lm in landmarks[:n] for a in attrs),
+        dtype=np.float32, count=n * dims
+    ).reshape(n, dims)
+    # MediaPipe z uses roughly the same scale as x
+    points *= np.array((width, height, width)[:dims], dtype=np.float32)
+    return points
+
+
+class LandmarkStore:
+    """
+    Preallocated ring of FaceMesh landmarks in pixel coordinates, shape (capacity, 478, dims).
+
+    Every frame is written twice (at i and i + capacity) so the last n frames are always one
+    contiguous slice - window() and latest() hand out views, nothing gets copied.
+    """
+
+    def __init__(self, capacity=300, dims=2, num_landmarks=NUM_LANDMARKS):
+        self.capacity = capacity
+        self.dims = dims
+        self.num_landmarks = num_landmarks
+        self.data = np.zeros((2 * capacity, num_landmarks, dims), dtype=np.float32)
+        self.timestamps = np.zeros(2 * capacity, dtype=np.float64)
+        self.count = 0      # total frames ever written
+        self.lock = threading.Lock()
+
+    def append_normalized(self, landmarks, width, height, timestamp=None):
+        """Convert MediaPipe normalized landmarks to pixels in one pass and store them"""
+        return self.append(landmarks_to_pixels(landmarks, width, height, self.dims, self.num_landmarks), timestamp)
+
+    def append(self, points, timestamp=None):
+        """Store one frame of (num_landmarks, dims) pixel coordinates, returns a view of it"""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self.lock:
+            i = self.count % self.capacity
+            n = len(points)
+            self.data[i, :n] = points
+            self.data[i + self.capacity, :n] = points
+            self.timestamps[i] = timestamp
+            self.timestamps[i + self.capacity] = timestamp
+            self.count += 1
+            return self.data[i + self.capacity]
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def __bool__(self):
+        return self.count > 0
+
+    def latest(self):
+        """View of the newest frame (num_landmarks, dims), or None if empty"""
+        if not self.count:
+            return None
+        i = (self.count - 1) % self.capacity
+        return self.data[i + self.capacity]
+
+    def window(self, n=None):
+        """View of the last n frames, oldest first, shape (n, num_landmarks, dims)"""
+        n = len(self) if n is None else min(n, len(self))
+        end = (self.count - 1) % self.capacity + self.capacity + 1
+        return self.data[end - n:end]
+
+    def window_timestamps(self, n=None):
+        n = len(self) if n is None else min(n, len(self))
+        end = (self.count - 1) % self.capacity + self.capacity + 1
+        return self.timestamps[end - n:end]
+
+    def since(self, start_time, end_time=None):
+        """
+        Frames (and their timestamps) captured in [start_time, end_time]. Copied under the lock,
+        since the inference loop keeps writing into the ring while the caller analyzes them
+        """
+        with self.lock:
+            ts = self.window_timestamps()
+            first = np.searchsorted(ts, start_time, side='left')
+            last = len(ts) if end_time is None else np.searchsorted(ts, end_time, side='right')
+            return self.window(len(ts))[first:last].copy(), ts[first:last].copy()
+
+    def clear(self):
+        with self.lock:
+            self.count = 0
+
+
+def face_box(points, frame_shape, margin=0.15):
+    """(x, y, w, h) box around a face's landmarks, padded by margin and clipped to the frame"""
+    h, w = frame_shape[:2]
+    x0, y0 = points[:, 0].min(), points[:, 1].min()
+    x1, y1 = points[:, 0].max(), points[:, 1].max()
+    pad_x, pad_y = (x1 - x0) * margin, (y1 - y0) * margin
+    x0, y0 = max(int(x0 - pad_x), 0), max(int(y0 - pad_y), 0)
+    x1, y1 = min(int(x1 + pad_x), w - 1), min(int(y1 + pad_y), h - 1)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return (x0, y0, x1 - x0, y1 - y0)
+
+
+class FaceTrack:
+    """Remembers the last face box from FaceMesh so FER can skip its own face detector"""
+
+    def __init__(self, max_age=5):
+        self.max_age = max_age      # frames a box stays usable after FaceMesh loses the face
+        self.box = None
+        self.age = 0
+
+    def update(self, points, frame_shape):
+        if points is None:
+            self.age += 1
+            if self.age > self.max_age:
+                self.box = None
+        else:
+            self.box = face_box(points, frame_shape)
+            self.age = 0
+        return self.current()
+
+    def current(self):
+        return self.box
+
+    @property
+    def lost(self):
+        return self.box is None
@@ -0,0 +1,318 @@
+# llm_calls.py
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from agent.conversation import estimate_tokens
+from agent.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+
+class LLMBusyError(RuntimeError):
+    """The call couldn't get a slot (queue full, or waited longer than queue_timeout)"""
+
+
+def request_key(request_kwargs):
+    """Identical requests (model, system, messages, sampling settings) get the same key"""
+    raw = json.dumps(request_kwargs, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def estimate_request_tokens(request_kwargs):
+    """Upper bound for the token budget: the prompt plus everything the model is allowed to answer"""
+    prompt = json.dumps([request_kwargs.get('system'), request_kwargs.get('messages')], default=str)
+    return estimate_tokens(prompt) + request_kwargs.get('max_tokens', 0)
+
+
+class TokenBucket:
+    """Tokens-per-minute budget. Calls reserve their estimate up front and get the unused part back"""
+
+    def __init__(self, tokens_per_minute):
+        self.capacity = tokens_per_minute
+        self.rate = tokens_per_minute / 60.0
+        self.tokens = float(tokens_per_minute)
+        self.updated = time.monotonic()
+        self.condition = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount, deadline):
+        # A single call bigger than the whole budget would never fit - let it through on a full bucket
+        amount = min(amount, self.capacity)
+        with self.condition:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(min(remaining, (amount - self.tokens) / self.rate))
+
+    def refund(self, amount):
+        with self.condition:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+            self.condition.notify_all()
+
+
+class _Gate:
+    """At most limit calls at once, later ones wait in FIFO order (at most max_waiting of them)"""
+
+    def __init__(self, limit, max_waiting):
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.active = 0
+        self.waiting = deque()
+        self.condition = threading.Condition()
+
+    def acquire(self, deadline):
+        with self.condition:
+            if self.active < self.limit and not self.waiting:
+                self.active += 1
+                return True
+            if len(self.waiting) >= self.max_waiting:
+                return False
+            ticket = object()
+            self.waiting.append(ticket)
+            try:
+                while not (self.waiting[0] is ticket and self.active < self.limit):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self.condition.wait(remaining)
+                self.active += 1
+                return True
+            finally:
+                self.waiting.remove(ticket)
+                self.condition.notify_all()
+
+    def release(self):
+        with self.condition:
+            self.active -= 1
+            self.condition.notify_all()
+
+
+class SharedStream:
+    """
+    One upstream stream fanned out to every caller that asked for the same thing. Late joiners get
+    the chunks so far replayed, then follow along live. usage is set once the stream is complete
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.usage = None
+        self.waited = 0.0
+        self.condition = threading.Condition()
+
+    def push(self, text):
+        with self.condition:
+            self.chunks.append(text)
+            self.condition.notify_all()
+
+    def finish(self, usage=None, error=None):
+        with self.condition:
+            self.usage = usage
+            self.error = error
+            self.done = True
+            self.condition.notify_all()
+
+    def iterate(self, timeout):
+        position = 0
+        while True:
+            with self.condition:
+                if not self.condition.wait_for(lambda: len(self.chunks) > position or self.done, timeout=timeout):
+                    raise TimeoutError(f"No streamed tokens for {timeout:.0f} s")
+                new = self.chunks[position:]
+                position = len(self.chunks)
+                if not new:
+                    if self.error is not None:
+                        raise self.error
+                    return
+            yield from new
+
+
+class StreamView:
+    """What stream() hands each caller: the shared text_stream, plus whether this caller started it"""
+
+    def __init__(self, shared, leader, timeout):
+        self.shared = shared
+        self.leader = leader
+        self.text_stream = shared.iterate(timeout)
+
+    @property
+    def waited(self):
+        return self.shared.waited
+
+    @property
+    def usage(self):
+        return self.shared.usage
+
+
+class LLMCallManager:
+    """
+    Every outbound messages API call goes through here:
+      - identical calls already in flight are coalesced (single flight): one upstream call, every
+        caller gets its result (blocking) or its chunks (streaming)
+      - at most max_concurrent upstream calls at once, with a FIFO wait queue of at most max_queue
+        callers who give up after queue_timeout seconds (LLMBusyError)
+      - an optional tokens-per-minute budget, reserved per call from its estimated size
+      - a per-request timeout passed down to the SDK
+    get_client returns the (pooled) Anthropic client.
+    """
+
+    def __init__(self, get_client, max_concurrent=8, max_queue=64, queue_timeout=10.0,
+                 tokens_per_minute=0, timeout=30.0):
+        self.get_client = get_client
+        self.gate = _Gate(max_concurrent, max_queue)
+        self.budget = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.queue_timeout = queue_timeout
+        self.timeout = timeout
+
+        self.lock = threading.Lock()
+        self.inflight = {}              # key -> Future (blocking calls)
+        self.streams = {}               # key -> SharedStream
+        self.upstream = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.queue_wait = registry.histogram('llm_queue_wait_seconds', 'Time calls waited for a concurrency slot and token budget')
+
+    #=============================================================
+    # Admission
+
+    def _admit(self, request_kwargs):
+        """Wait for a slot and the token budget. Returns (reserved tokens, seconds waited)"""
+        start = time.monotonic()
+        deadline = start + self.queue_timeout
+        if not self.gate.acquire(deadline):
+            with self.lock:
+                self.rejected += 1
+            raise LLMBusyError("Too many LLM calls waiting, try again shortly")
+        reserved = estimate_request_tokens(request_kwargs) if self.budget is not None else 0
+        if reserved and not self.budget.acquire(reserved, deadline):
+            self.gate.release()
+            with self.lock:
+                self.rejected += 1
+            raise LLMBusyError("LLM token budget exhausted, try again shortly")
+        waited = time.monotonic() - start
+        self.queue_wait.observe(waited)
+        with self.lock:
+            self.upstream += 1
+        return reserved, waited
+
+    def _release(self, reserved, usage):
+        self.gate.release()
+        if reserved:
+            used = (getattr(usage, 'input_tokens', 0) or 0) + (getattr(usage, 'output_tokens', 0) or 0) if usage else reserved
+            self.budget.refund(max(reserved - used, 0))
+
+    #=============================================================
+    # Calls
+
+    def create(self, request_kwargs):
+        """
+        messages.create through the manager. Returns (message, info) where info has 'leader' (this
+        caller made the upstream call) and 'waited' (seconds spent queueing)
+        """
+        key = request_key(request_kwargs)
+        with self.lock:
+            future = self.inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self.inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result(timeout=self.queue_timeout + self.timeout), {'leader': False, 'waited': 0.0}
+
+        try:
+            reserved, waited = self._admit(request_kwargs)
+            usage = None
+            try:
+                message = self.get_client().messages.create(**request_kwargs, timeout=self.timeout)
+                usage = message.usage
+            finally:
+                self._release(reserved, usage)
+            future.set_result(message)
+            return message, {'leader': True, 'waited': waited}
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+
+    def stream(self, request_kwargs):
+        """messages.stream through the manager, as a StreamView to iterate text_stream on"""
+        key = request_key(request_kwargs)
+        with self.lock:
+            shared = self.streams.get(key)
+            leader = shared is None
+            if leader:
+                shared = self.streams[key] = SharedStream()
+            else:
+                self.coalesced += 1
+        if leader:
+            try:
+                reserved, shared.waited = self._admit(request_kwargs)
+            except Exception as e:
+                shared.finish(error=e)
+                with self.lock:
+                    self.streams.pop(key, None)
+                raise
+            # The upstream stream runs on its own thread so it keeps going for the other callers
+            # even if the one who started it disconnects
+            threading.Thread(target=self._pump, args=(key, shared, request_kwargs, reserved),
+                             name='llm-stream', daemon=True).start()
+        return StreamView(shared, leader, self.timeout)
+
+    def _pump(self, key, shared, request_kwargs, reserved):
+        usage = None
+        try:
+            with self.get_client().messages.stream(**request_kwargs, timeout=self.timeout) as stream:
+                for text in stream.text_stream:
+                    if text:
+                        shared.push(text)
+                usage = stream.get_final_message().usage
+            shared.finish(usage)
+        except Exception as e:
+            logger.error(f"LLM stream failed: {e}")
+            shared.finish(error=e)
+        finally:
+            self._release(reserved, usage)
+            with self.lock:
+                self.streams.pop(key, None)
+
+    def stats(self):
+        with self.gate.condition:
+            active, waiting = self.gate.active, len(self.gate.waiting)
+        with self.lock:
+            return {
+                'active': active,
+                'waiting': waiting,
+                'upstream_calls': self.upstream,
+                'coalesced': self.coalesced,
+                'rejected': self.rejected,
+                'budget_tokens': round(self.budget.tokens) if self.budget is not None else None
+            }
+
+    def collect_metrics(self):
+        stats = self.stats()
+        return [
+            ('llm_calls_active', 'gauge', 'Upstream LLM calls in flight', {}, stats['active']),
+            ('llm_calls_waiting', 'gauge', 'LLM calls queued for a concurrency slot', {}, stats['waiting']),
+            ('llm_upstream_calls_total', 'counter', 'Calls actually sent to the API', {}, stats['upstream_calls']),
+            ('llm_coalesced_calls_total', 'counter', 'Calls answered by an identical call already in flight', {}, stats['coalesced']),
+            ('llm_rejected_calls_total', 'counter', 'Calls turned away by the queue limit, queue timeout or token budget', {}, stats['rejected']),
+        ]
@@ -0,0 +1,105 @@
+# llm_stub.py
+"""
+Offline stand-in for the Anthropic client, used when ANTHROPIC_STUB=1 (benchmarks, local dev
+without an API key). Mimics the parts of the SDK we use: messages.create() and messages.stream().
+"""
+import json
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from agent.conversation import estimate_prompt_tokens
+from agent.model_router import MIN_CACHEABLE_TOKENS
+
+STUB_RESPONSE = (
+    "Of course! Here is how you would say that.\n\n"
+    "Bonjour! Comment ça va?\n\n"
+    "The first part means \"Hello\" and the second asks \"How are you?\"."
+)
+
+
+class _StubStream:
+    def __init__(self, text, usage, chunk_size, delay):
+        self.text = text
+        self.usage = usage
+        self.chunk_size = chunk_size
+        self.delay = delay
+
+    @property
+    def text_stream(self):
+        for i in range(0, len(self.text), self.chunk_size):
+            time.sleep(self.delay)
+            yield self.text[i:i + self.chunk_size]
+
+    def get_final_message(self):
+        return _message(self.text, self.usage)
+
+
+class _StubMessages:
+    def __init__(self, client):
+        self.client = client
+
+    def create(self, **kwargs):
+        self.client.calls.append(kwargs)
+        time.sleep(self.client.latency)
+        return _message(self.client.response_text, self.client.usage(kwargs))
+
+    @contextmanager
+    def stream(self, **kwargs):
+        self.client.calls.append(kwargs)
+        time.sleep(self.client.first_token_latency)
+        yield _StubStream(self.client.response_text, self.client.usage(kwargs),
+                          self.client.chunk_size, self.client.chunk_delay)
+
+
+def _message(text, usage):
+    return SimpleNamespace(
+        content=[SimpleNamespace(type='text', text=text)],
+        usage=usage,
+        stop_reason='end_turn'
+    )
+
+
+def _cache_prefix(kwargs):
+    """(prefix, estimated tokens) up to the last cache_control breakpoint, or None without one"""
+    system = kwargs.get('system') or ""
+    messages = kwargs.get('messages', [])
+    for i in range(len(messages) - 1, -1, -1):
+        content = messages[i]["content"]
+        if isinstance(content, list) and any("cache_control" in block for block in content):
+            prefix = messages[:i + 1]
+            return json.dumps([kwargs['model'], system, prefix], sort_keys=True), estimate_prompt_tokens(system, prefix)
+    return None
+
+
+class StubAnthropic:
+    """Returns a canned three-paragraph answer after a configurable delay"""
+
+    def __init__(self, response_text=STUB_RESPONSE, latency=0.05, first_token_latency=0.02,
+                 chunk_size=8, chunk_delay=0.002):
+        self.response_text = response_text
+        self.latency = latency
+        self.first_token_latency = first_token_latency
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.calls = []
+        self.cached_prefixes = set()
+        self.messages = _StubMessages(self)
+
+    def usage(self, kwargs):
+        """
+        Token usage like the API reports it, including prompt caching: a cache_control prefix at least
+        MIN_CACHEABLE_TOKENS long is written on first sight and read back on the next identical one
+        """
+        total = estimate_prompt_tokens(kwargs.get('system') or "", kwargs.get('messages', []))
+        read = written = 0
+        prefix = _cache_prefix(kwargs)
+        if prefix is not None and prefix[1] >= MIN_CACHEABLE_TOKENS.get(kwargs['model'], 1024):
+            key, tokens = prefix
+            if key in self.cached_prefixes:
+                read = tokens
+            else:
+                written = tokens
+                self.cached_prefixes.add(key)
+        return SimpleNamespace(input_tokens=total - read - written, cache_read_input_tokens=read,
+                               cache_creation_input_tokens=written, output_tokens=len(self.response_text) // 4)
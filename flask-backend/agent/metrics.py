@@ -0,0 +1,202 @@
+# metrics.py
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, roughly 25% apart from 0.5 ms up to 60 s. Observing is one bisect
+# plus an increment, and p50/p95/p99 are read back from the bucket counts (within ~12%)
+LATENCY_BUCKETS = tuple(0.0005 * 1.25 ** i for i in range(int(math.log(60 / 0.0005, 1.25)) + 2))
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram. Cheap enough to call on every frame"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)     # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += seconds
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def quantile(self, q):
+        """Estimated q-quantile (linear within the bucket it falls in), None when empty"""
+        with self.lock:
+            counts, total = list(self.counts), self.count
+        if total == 0:
+            return None
+        rank = q * total
+        seen = 0
+        for i, c in enumerate(counts):
+            if c and seen + c >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / c
+            seen += c
+        return self.buckets[-1]
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'mean_ms': round(self.sum / self.count * 1000, 2) if self.count else None,
+            **{f'p{int(q * 100)}_ms': _ms(self.quantile(q)) for q in QUANTILES}
+        }
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+
+class RateMeter:
+    """Events per second, smoothed over the last few seconds (e.g. frames processed)"""
+
+    def __init__(self, half_life=2.0):
+        self.half_life = half_life
+        self.rate = 0.0
+        self.last = None
+        self.total = 0
+
+    def mark(self, now=None):
+        now = time.time() if now is None else now
+        self.total += 1
+        if self.last is not None:
+            dt = max(now - self.last, 1e-6)
+            alpha = 1.0 - math.exp(-dt * math.log(2) / self.half_life)
+            self.rate += alpha * (1.0 / dt - self.rate)
+        self.last = now
+
+    def per_second(self, now=None):
+        if self.last is None:
+            return 0.0
+        now = time.time() if now is None else now
+        # Nothing has happened for a while - don't keep reporting the old rate
+        idle = now - self.last
+        if self.rate > 0 and idle > 1.0 / self.rate:
+            return min(self.rate, 1.0 / idle)
+        return self.rate
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in sorted(labels.items())) + '}'
+
+
+class MetricsRegistry:
+    """
+    Named metrics with labels, rendered in the Prometheus text format. Values owned by other
+    objects (cache stats, dropped frames, ...) are pulled at scrape time through collectors:
+    callables returning (name, type, help, labels, value) tuples
+    """
+
+    def __init__(self):
+        self.metrics = {}       # (name, sorted labels) -> metric
+        self.help = {}          # name -> (type, help)
+        self.collectors = []
+        self.lock = threading.Lock()
+
+    def _get(self, kind, factory, name, help_text, labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            metric = self.metrics.get(key)
+            if metric is None:
+                metric = self.metrics[key] = factory()
+                self.help[name] = (kind, help_text)
+            return metric
+
+    def histogram(self, name, help_text='', **labels):
+        return self._get('summary', Histogram, name, help_text, labels)
+
+    def counter(self, name, help_text='', **labels):
+        return self._get('counter', Counter, name, help_text, labels)
+
+    def rate(self, name, help_text='', **labels):
+        return self._get('gauge', RateMeter, name, help_text, labels)
+
+    def register_collector(self, collector):
+        self.collectors.append(collector)
+
+    def render(self):
+        """Everything in Prometheus text exposition format (version 0.0.4)"""
+        with self.lock:
+            metrics = list(self.metrics.items())
+            help_entries = dict(self.help)
+
+        families = {}
+        for (name, labels), metric in metrics:
+            families.setdefault(name, []).append((dict(labels), metric))
+
+        lines = []
+        for name in sorted(families):
+            kind, help_text = help_entries[name]
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, metric in families[name]:
+                if isinstance(metric, Histogram):
+                    for q in QUANTILES:
+                        value = metric.quantile(q)
+                        lines.append(f'{name}{_labels(dict(labels, quantile=q))} {value if value is not None else "NaN"}')
+                    lines.append(f'{name}_sum{_labels(labels)} {metric.sum}')
+                    lines.append(f'{name}_count{_labels(labels)} {metric.count}')
+                elif isinstance(metric, RateMeter):
+                    lines.append(f'{name}{_labels(labels)} {metric.per_second():.3f}')
+                else:
+                    lines.append(f'{name}{_labels(labels)} {metric.value}')
+
+        collected = {}
+        for collector in list(self.collectors):
+            try:
+                for name, kind, help_text, labels, value in collector():
+                    collected.setdefault(name, (kind, help_text, []))[2].append((labels, value))
+            except Exception:
+                continue
+        for name in sorted(collected):
+            kind, help_text, samples = collected[name]
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in samples:
+                lines.append(f'{name}{_labels(labels)} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """Histogram percentiles as plain JSON-able dicts, e.g. for /api/monitor/stats"""
+        with self.lock:
+            metrics = list(self.metrics.items())
+        return {
+            name + _labels(dict(labels)): metric.snapshot()
+            for (name, labels), metric in metrics
+            if isinstance(metric, Histogram)
+        }
+
+
+# Process-wide registry everything reports into
+registry = MetricsRegistry()
@@ -0,0 +1,162 @@
+# model_router.py
+import re
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+FAST_MODEL = "claude-3-5-haiku-20241022"
+SLOW_MODEL = "claude-3-5-sonnet-20241022"
+MODELS = {'fast': FAST_MODEL, 'slow': SLOW_MODEL}
+# Shortest prefix (tokens) each model will put in its prompt cache - shorter breakpoints are ignored
+MIN_CACHEABLE_TOKENS = {FAST_MODEL: 2048, SLOW_MODEL: 1024}
+
+# "How do I say X", "what is X in French", "translate X" - one phrase, Haiku handles these fine
+PHRASE_LOOKUP = re.compile(
+    r"\b(how (do|would|can|should) (i|you|we) say|what('s| is| does) .{1,60} (in|mean)\b|translat(e|ion) of|translate\b|say .{1,60} in [a-z]+\b)",
+    re.IGNORECASE
+)
+# Asks for a lesson or an explanation rather than a single phrase
+OPEN_ENDED = re.compile(
+    r"\b(teach|explain|lesson|phrases|practi[cs]e|difference|grammar|conversation|prepare|trip|why|examples?)\b",
+    re.IGNORECASE
+)
+SHORT_PROMPT_WORDS = 8
+MAX_LOOKUP_WORDS = 40
+
+
+def prompt_features(prompt):
+    words = len(prompt.split())
+    return {
+        'words': words,
+        'phrase_lookup': bool(PHRASE_LOOKUP.search(prompt)),
+        'open_ended': bool(OPEN_ENDED.search(prompt)),
+    }
+
+
+class LatencyWindow:
+    """Latencies of the last max_samples calls, forgetting anything older than max_age seconds"""
+
+    def __init__(self, max_samples=20, max_age=300.0):
+        self.samples = deque(maxlen=max_samples)   # (timestamp, seconds)
+        self.max_age = max_age
+
+    def add(self, seconds, now=None):
+        self.samples.append((now or time.time(), seconds))
+
+    def values(self, now=None):
+        cutoff = (now or time.time()) - self.max_age
+        while self.samples and self.samples[0][0] < cutoff:
+            self.samples.popleft()
+        return [seconds for _, seconds in self.samples]
+
+    def quantile(self, q, now=None):
+        values = self.values(now)
+        return float(np.quantile(values, q)) if values else None
+
+
+class ModelRouter:
+    """
+    Picks Haiku or Sonnet per LLM call. Phrase lookups and very short prompts go to the fast model,
+    lessons and explanations to the slow one - unless the slow model's recent latency (quantile over
+    a rolling window) is over its SLO, in which case they fall back to the fast model until the slow
+    samples age out of the window. Blocking calls are judged on total time, streams on time to first
+    token.
+    """
+
+    def __init__(self, slo=10.0, ttft_slo=2.0, quantile=0.9, window=20, max_age=300.0, min_samples=5):
+        self.slo = {'blocking': slo, 'stream': ttft_slo}
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.windows = {
+            (model, mode): LatencyWindow(window, max_age)
+            for model in MODELS.values() for mode in self.slo
+        }
+        self.calls = {model: 0 for model in MODELS.values()}
+        self.errors = {model: 0 for model in MODELS.values()}
+        self.routes = {}                # (call, model, reason) -> count
+        self.lock = threading.Lock()
+
+    def preferred(self, prompt, call):
+        """(tier, reason) from the prompt alone"""
+        if call != 'translation':
+            # Follow-ups explain a previous answer in more detail, that's what Sonnet is for
+            return 'slow', 'explanation'
+        features = prompt_features(prompt)
+        if features['open_ended']:
+            return 'slow', 'open_ended'
+        if features['phrase_lookup'] and features['words'] <= MAX_LOOKUP_WORDS:
+            return 'fast', 'phrase_lookup'
+        if features['words'] <= SHORT_PROMPT_WORDS:
+            return 'fast', 'short_prompt'
+        return 'slow', 'long_prompt'
+
+    def over_budget(self, model, mode):
+        """True if model's recent latency quantile for this mode is above its SLO"""
+        with self.lock:
+            values = self.windows[(model, mode)].values()
+        if len(values) < self.min_samples:
+            return False
+        return float(np.quantile(values, self.quantile)) > self.slo[mode]
+
+    def choose(self, prompt, call='translation', mode='blocking', model_type=None):
+        """
+        Model for one call. model_type 'fast'/'slow' skips the prompt heuristics (the latency
+        fallback still applies to 'slow'). Returns (model, reason)
+        """
+        if model_type in MODELS:
+            tier, reason = model_type, 'requested'
+        else:
+            tier, reason = self.preferred(prompt, call)
+        model = MODELS[tier]
+        if model == SLOW_MODEL and self.over_budget(SLOW_MODEL, mode):
+            model, reason = FAST_MODEL, 'slo_fallback'
+        with self.lock:
+            key = (call, model, reason)
+            self.routes[key] = self.routes.get(key, 0) + 1
+        return model, reason
+
+    def record(self, model, seconds, mode='blocking', ok=True):
+        """Observed latency of one call (total time for blocking, time to first token for streams)"""
+        with self.lock:
+            self.calls[model] = self.calls.get(model, 0) + 1
+            if not ok:
+                self.errors[model] = self.errors.get(model, 0) + 1
+            window = self.windows.get((model, mode))
+            if window is not None:
+                window.add(seconds)
+
+    def stats(self):
+        models = {}
+        for model in MODELS.values():
+            latency = {}
+            for mode, slo in self.slo.items():
+                with self.lock:
+                    values = self.windows[(model, mode)].values()
+                latency[mode] = {
+                    'samples': len(values),
+                    'p50_s': round(float(np.quantile(values, 0.5)), 3) if values else None,
+                    'p90_s': round(float(np.quantile(values, 0.9)), 3) if values else None,
+                    'slo_s': slo,
+                    'over_budget': len(values) >= self.min_samples and float(np.quantile(values, self.quantile)) > slo,
+                }
+            models[model] = {'calls': self.calls.get(model, 0), 'errors': self.errors.get(model, 0), 'latency': latency}
+        with self.lock:
+            routes = [{'call': c, 'model': m, 'reason': r, 'count': n} for (c, m, r), n in sorted(self.routes.items())]
+        return {'models': models, 'routes': routes}
+
+    def collect_metrics(self):
+        stats = self.stats()
+        samples = []
+        for model, state in stats['models'].items():
+            for mode, latency in state['latency'].items():
+                if latency['p90_s'] is not None:
+                    samples.append(('llm_route_latency_p90_seconds', 'gauge', 'Recent p90 latency the router sees per model (total for blocking, TTFT for stream)',
+                                    {'model': model, 'mode': mode}, latency['p90_s']))
+                samples.append(('llm_route_over_budget', 'gauge', '1 while the model is over its latency SLO',
+                                {'model': model, 'mode': mode}, int(latency['over_budget'])))
+        for route in stats['routes']:
+            samples.append(('llm_routes_total', 'counter', 'Routing decisions by call, model and reason',
+                            {'call': route['call'], 'model': route['model'], 'reason': route['reason']}, route['count']))
+        return samples
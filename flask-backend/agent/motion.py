@@ -0,0 +1,88 @@
+# motion.py
+import time
+
+import cv2
+import numpy as np
+
+
+def scale_frame(frame, max_width):
+    """Downscaled copy for inference (or the frame itself if it is already small), plus the scale used"""
+    h, w = frame.shape[:2]
+    if not max_width or w <= max_width:
+        return frame, 1.0
+    scale = max_width / w
+    small = cv2.resize(frame, (max_width, int(round(h * scale))), interpolation=cv2.INTER_AREA)
+    return small, scale
+
+
+class _GateCounter:
+    def __init__(self):
+        self.ran = 0
+        self.reused = 0
+        self.last_run = 0.0
+
+
+class MotionGate:
+    """
+    Cheap change detection in front of the models. FaceMesh is skipped when a tiny grayscale
+    thumbnail barely changed, FER is skipped when the landmarks barely moved since its last run.
+    Results are never reused for longer than max_staleness seconds.
+    """
+
+    def __init__(self, frame_threshold=3.0, landmark_threshold=0.015, max_staleness=1.0, thumb_size=(64, 48)):
+        self.frame_threshold = frame_threshold          # mean abs gray level difference (0-255)
+        self.landmark_threshold = landmark_threshold    # mean displacement as a fraction of face width
+        self.max_staleness = max_staleness
+        self.thumb_size = thumb_size
+        self.ref_thumb = None
+        self.ref_points = None
+        self.counters = {'facemesh': _GateCounter(), 'fer': _GateCounter()}
+        self.started = time.time()
+
+    def _should_run(self, stage, moved, now):
+        counter = self.counters[stage]
+        if moved or now - counter.last_run >= self.max_staleness:
+            counter.ran += 1
+            counter.last_run = now
+            return True
+        counter.reused += 1
+        return False
+
+    def check_frame(self, frame, now=None):
+        """True if the frame changed enough since the last FaceMesh run to run it again"""
+        now = time.time() if now is None else now
+        gray = cv2.cvtColor(cv2.resize(frame, self.thumb_size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        moved = self.ref_thumb is None or cv2.absdiff(gray, self.ref_thumb).mean() > self.frame_threshold
+        if self._should_run('facemesh', moved, now):
+            self.ref_thumb = gray
+            return True
+        return False
+
+    def check_landmarks(self, points, now=None):
+        """True if the landmarks moved enough since the last FER run to classify the face again"""
+        now = time.time() if now is None else now
+        moved = True
+        if points is not None and self.ref_points is not None:
+            face_width = max(float(np.ptp(points[:, 0])), 1.0)
+            displacement = np.linalg.norm(points[:, :2] - self.ref_points, axis=1).mean()
+            moved = displacement / face_width > self.landmark_threshold
+        if self._should_run('fer', moved, now):
+            self.ref_points = None if points is None else points[:, :2].copy()
+            return True
+        return False
+
+    def reset(self):
+        """Forget the references so the next frame always runs (e.g. at the start of a monitoring window)"""
+        self.ref_thumb = None
+        self.ref_points = None
+
+    def stats(self):
+        minutes = max((time.time() - self.started) / 60.0, 1e-9)
+        return {
+            stage: {
+                'ran': c.ran,
+                'reused': c.reused,
+                'saved_per_minute': round(c.reused / minutes, 1)
+            }
+            for stage, c in self.counters.items()
+        }
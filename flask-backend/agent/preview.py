@@ -0,0 +1,146 @@
+# preview.py
+import threading
+import time
+
+import cv2
+import numpy as np
+
+PREVIEW_MODES = ('window', 'mjpeg', 'headless')
+WINDOW_NAME = 'Emotion Monitor'
+
+
+def connection_array(connections):
+    """MediaPipe connection set ({(a, b), ...}) as an (E, 2) index array"""
+    return np.array(sorted(connections), dtype=np.intp)
+
+
+class PreviewRenderer:
+    """
+    Draws the mesh/lip overlays and status text from the published snapshots, never from the
+    inference loop. Renders at most at the 'overlay' stage rate of the scheduler, either into
+    an OpenCV window (run_window, main thread) or as JPEGs for an MJPEG stream (start + frames).
+    """
+
+    def __init__(self, service, jpeg_quality=70):
+        self.service = service
+        self.tesselation = None
+        self.lips = None
+        self.jpeg_quality = jpeg_quality
+
+        self.is_running = False
+        self.thread = None
+        self.rendered = 0
+        self.last_version = 0
+
+        # Latest encoded JPEG for the MJPEG stream, rendered only while someone is watching
+        self.condition = threading.Condition()
+        self.jpeg = None
+        self.jpeg_seq = 0
+        self.viewers = 0
+
+    def interval(self):
+        hz = self.service.scheduler.target_hz('overlay')
+        return 1.0 / hz if hz > 0 else 0.5
+
+    def render(self, snapshot):
+        """A copy of the snapshot frame with the overlays drawn on it"""
+        service = self.service
+        frame = snapshot.frame.copy()
+        landmarks = snapshot.landmarks
+        if landmarks is not None:
+            if self.tesselation is None:
+                # Only the connection tables, and only once someone actually looks at a preview
+                import mediapipe as mp
+                self.tesselation = connection_array(mp.solutions.face_mesh.FACEMESH_TESSELATION)
+                self.lips = connection_array(mp.solutions.face_mesh.FACEMESH_LIPS)
+            points = landmarks[:, :2].astype(np.int32)
+            # One polylines call per style instead of a Python loop over ~2500 connections
+            cv2.polylines(frame, points[self.tesselation], False, (192, 192, 192), 1)
+            cv2.polylines(frame, points[self.lips], False, (0, 0, 255), 2)
+
+        if service.is_monitoring:
+            if service.last_emotion is not None:
+                cv2.putText(frame, f"Emotion: {service.last_emotion[0]}",
+                            (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+            if landmarks is not None:
+                cv2.putText(frame, "Landmarks detected",
+                            (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        else:
+            cv2.putText(frame, "Ready", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        return frame
+
+    def _next_frame(self):
+        """Render the latest snapshot if it is new, otherwise None"""
+        snapshot = self.service.snapshots.read()
+        if snapshot is None or snapshot.seq == self.last_version:
+            return None
+        self.last_version = snapshot.seq
+        with self.service.scheduler.timed('overlay'):
+            frame = self.render(snapshot)
+        self.rendered += 1
+        return frame
+
+    def run_window(self):
+        """Show the preview in an OpenCV window. Blocks (GUI calls belong on the main thread) until q or stop"""
+        cv2.namedWindow(WINDOW_NAME, cv2.WINDOW_NORMAL)
+        try:
+            while self.service.is_running:
+                frame = self._next_frame()
+                if frame is not None:
+                    cv2.imshow(WINDOW_NAME, frame)
+                # waitKey doubles as the frame-rate cap
+                if cv2.waitKey(max(int(self.interval() * 1000), 1)) & 0xFF == ord('q'):
+                    self.service.is_running = False
+        finally:
+            cv2.destroyAllWindows()
+
+    def start(self):
+        """Start the MJPEG encoder thread"""
+        if self.thread is not None:
+            return
+        self.is_running = True
+        self.thread = threading.Thread(target=self._run_encoder, name='preview', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.is_running = False
+        with self.condition:
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+
+    def _run_encoder(self):
+        while self.is_running and self.service.is_running:
+            started = time.time()
+            if self.viewers > 0:
+                frame = self._next_frame()
+                if frame is not None:
+                    ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+                    if ok:
+                        with self.condition:
+                            self.jpeg = buffer.tobytes()
+                            self.jpeg_seq += 1
+                            self.condition.notify_all()
+            time.sleep(max(self.interval() - (time.time() - started), 0.005))
+
+    def frames(self):
+        """multipart/x-mixed-replace body for one viewer (boundary 'frame')"""
+        with self.condition:
+            self.viewers += 1
+        seq = 0
+        try:
+            while self.is_running:
+                with self.condition:
+                    self.condition.wait_for(lambda: self.jpeg_seq != seq or not self.is_running, timeout=5.0)
+                    if self.jpeg_seq == seq:
+                        continue
+                    seq, jpeg = self.jpeg_seq, self.jpeg
+                yield (b"--frame\r\nContent-Type: image/jpeg\r\n"
+                       b"Content-Length: " + str(len(jpeg)).encode() + b"\r\n\r\n" + jpeg + b"\r\n")
+        finally:
+            with self.condition:
+                self.viewers -= 1
+
+    def stats(self):
+        return {'rendered': self.rendered, 'viewers': self.viewers}
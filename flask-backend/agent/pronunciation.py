@@ -0,0 +1,154 @@
+# pronunciation.py
+import json
+import os
+import threading
+
+import numpy as np
+
+DEFAULT_TARGETS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'pronunciation_targets.json')
+
+# How far openness can be off before we say something about it
+DEFAULT_TOLERANCE = 0.1
+
+TONGUE_CODES = {None: 0, 'front': 1, 'back': 2}
+
+
+class LanguageTargets:
+    """
+    One language's phoneme targets compiled into parallel NumPy arrays, so scoring any number
+    of phonemes against the current mouth metrics is a handful of vectorized operations
+    """
+
+    def __init__(self, language, config):
+        self.language = language
+        self.messages = config['messages']
+        groups = config['groups']
+        phonemes = config['phonemes']
+
+        self.phonemes = list(phonemes)
+        self.index = {p: i for i, p in enumerate(self.phonemes)}
+        n = len(self.phonemes)
+
+        self.openness = np.full(n, np.nan, dtype=np.float32)
+        self.tolerance = np.full(n, DEFAULT_TOLERANCE, dtype=np.float32)
+        self.expect_round = np.zeros(n, dtype=bool)
+        self.expect_spread = np.zeros(n, dtype=bool)
+        self.check_round = np.zeros(n, dtype=bool)
+        self.check_spread = np.zeros(n, dtype=bool)
+        self.tongue = np.zeros(n, dtype=np.int8)
+        # Message keys per phoneme for each kind of mistake (None = don't comment on it)
+        self.too_open = [None] * n
+        self.too_closed = [None] * n
+        self.not_round = [None] * n
+        self.not_spread = [None] * n
+        self.wrong_tongue = [None] * n
+
+        for i, (phoneme, target) in enumerate(phonemes.items()):
+            group = groups.get(target.get('group'), {})
+            if 'openness' in target:
+                self.openness[i] = target['openness']
+            self.tolerance[i] = target.get('tolerance', DEFAULT_TOLERANCE)
+            self.expect_round[i] = target.get('roundness', False)
+            self.expect_spread[i] = target.get('spread', False)
+            self.check_round[i] = self.expect_round[i] and 'not_round' in group
+            self.check_spread[i] = self.expect_spread[i] and 'not_spread' in group
+            self.tongue[i] = TONGUE_CODES[target.get('tongue')]
+            self.too_open[i] = group.get('too_open')
+            self.too_closed[i] = group.get('too_closed')
+            self.not_round[i] = group.get('not_round')
+            self.not_spread[i] = group.get('not_spread')
+            self.wrong_tongue[i] = target.get('message')
+
+    def score_batch(self, phonemes, mouth_metrics, tongue_data):
+        """
+        Score every phoneme in the list against one set of mouth metrics. Returns a list of
+        {'phoneme', 'known', 'score', 'feedback'} in the same order. The metric values may also
+        be arrays with one entry per phoneme (e.g. per-segment metrics of an utterance)
+        """
+        idx = np.array([self.index.get(p, -1) for p in phonemes], dtype=np.intp)
+        known = idx >= 0
+        safe = np.where(known, idx, 0)
+
+        # Openness: signed error against the target, only where the phoneme has one
+        targets = self.openness[safe]
+        tolerance = self.tolerance[safe]
+        has_open = known & ~np.isnan(targets)
+        error = np.where(has_open, mouth_metrics['openness'] - targets, 0.0)
+        open_off = np.abs(error) > tolerance
+
+        # Roundness: only checked for phonemes whose group cares about it
+        round_off = known & self.check_round[safe] & ~np.asarray(mouth_metrics['roundness'], dtype=bool)
+        # Spread needs a calibrated neutral width, so it is None (and skipped) until then
+        spread_off = np.zeros(len(idx), dtype=bool)
+        if mouth_metrics.get('spread') is not None:
+            spread_off = known & self.check_spread[safe] & ~np.asarray(mouth_metrics['spread'], dtype=bool)
+
+        # Tongue: only when the tongue is actually visible
+        wanted = self.tongue[safe]
+        tongue_off = np.zeros(len(idx), dtype=bool)
+        if tongue_data.get('visible'):
+            seen = TONGUE_CODES.get(tongue_data.get('position'), 0)
+            tongue_off = known & (wanted > 0) & (wanted != seen)
+
+        # 1.0 = spot on, falls off linearly to 0 at twice the tolerance, minus penalties for shape/tongue
+        score = np.where(has_open, 1.0 - np.clip(np.abs(error) / (2 * tolerance), 0.0, 1.0), 1.0)
+        score -= 0.5 * round_off + 0.5 * spread_off + 0.5 * tongue_off
+        score = np.clip(score, 0.0, 1.0)
+
+        results = []
+        for k, phoneme in enumerate(phonemes):
+            if not known[k]:
+                results.append({'phoneme': phoneme, 'known': False, 'score': None, 'feedback': []})
+                continue
+            i = idx[k]
+            feedback = []
+            if open_off[k]:
+                key = self.too_open[i] if error[k] > 0 else self.too_closed[i]
+                if key:
+                    feedback.append(self.messages[key])
+            if round_off[k] and self.not_round[i]:
+                feedback.append(self.messages[self.not_round[i]])
+            if spread_off[k] and self.not_spread[i]:
+                feedback.append(self.messages[self.not_spread[i]])
+            if tongue_off[k] and self.wrong_tongue[i]:
+                feedback.append(self.messages[self.wrong_tongue[i]])
+            results.append({
+                'phoneme': phoneme,
+                'known': True,
+                'score': round(float(score[k]), 3),
+                'feedback': feedback or [self.messages['good']]
+            })
+        return results
+
+    def feedback(self, phoneme, mouth_metrics, tongue_data):
+        """Feedback messages for a single phoneme"""
+        result = self.score_batch([phoneme], mouth_metrics, tongue_data)[0]
+        return result['feedback'] if result['known'] else [self.messages['good']]
+
+
+class PronunciationRegistry:
+    """All languages' targets, loaded and compiled once. Looking a language up is a dict access"""
+
+    def __init__(self, path=DEFAULT_TARGETS_PATH):
+        with open(path, encoding='utf-8') as f:
+            configs = json.load(f)
+        self.languages = {lang.lower(): LanguageTargets(lang.lower(), config) for lang, config in configs.items()}
+
+    def get(self, language):
+        return self.languages.get(language.lower())
+
+    def supported(self):
+        return sorted(self.languages)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Process-wide registry, loaded on first use"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = PronunciationRegistry(os.getenv('PRONUNCIATION_TARGETS', DEFAULT_TARGETS_PATH))
+        return _registry
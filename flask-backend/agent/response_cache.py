@@ -0,0 +1,107 @@
+# response_cache.py
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
+
+def normalize_prompt(prompt):
+    """Collapse case, whitespace and trailing punctuation so trivially different asks share an entry"""
+    prompt = re.sub(r"\s+", " ", prompt.strip().lower())
+    return prompt.rstrip("?!. ")
+
+
+def text_content(text):
+    """
+    Wrap cached text so callers can keep doing response[0].text like with a real API response.
+    cached=True tells them it wasn't generated just now
+    """
+    return [SimpleNamespace(type='text', text=text, cached=True)]
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache for LLM answers, with an optional SQLite file so entries survive restarts.
+    Memory is checked first, then disk (a disk hit gets promoted back into memory).
+    """
+
+    def __init__(self, max_entries=512, ttl=24 * 3600, path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()    # key -> (expires_at, text)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+        if path:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self.db.execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+            self.db.commit()
+
+    @staticmethod
+    def make_key(prompt, language, system):
+        raw = json.dumps([normalize_prompt(prompt), language.lower(), system])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self.entries[key]
+
+            if self.db is not None:
+                row = self.db.execute(
+                    "SELECT value, expires_at FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row is not None:
+                    self._remember(key, row[0], row[1])
+                    self.hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, key, text):
+        expires_at = time.time() + self.ttl
+        with self.lock:
+            self._remember(key, text, expires_at)
+            if self.db is not None:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, text, expires_at)
+                )
+                self.db.commit()
+
+    def _remember(self, key, text, expires_at):
+        self.entries[key] = (expires_at, text)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            if self.db is not None:
+                self.db.execute("DELETE FROM responses")
+                self.db.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
@@ -0,0 +1,137 @@
+# scheduler.py
+import threading
+import time
+from contextlib import contextmanager
+
+from agent.metrics import registry
+
+
+class StageBudget:
+    """Target rates for one pipeline stage. A rate of 0 means the stage only runs on request"""
+
+    def __init__(self, idle_hz, active_hz, budget_ms):
+        self.idle_hz = idle_hz          # rate outside a start_monitoring window
+        self.active_hz = active_hz      # rate while monitoring
+        self.budget_ms = budget_ms      # latency we are willing to spend per run
+
+
+# Emotion at 5 Hz while monitoring, landmarks at 15 Hz, tongue only when someone asks for it
+DEFAULT_BUDGETS = {
+    'fer': StageBudget(idle_hz=0, active_hz=5, budget_ms=80),
+    'facemesh': StageBudget(idle_hz=5, active_hz=15, budget_ms=40),
+    'tongue': StageBudget(idle_hz=0, active_hz=0, budget_ms=10),
+    'overlay': StageBudget(idle_hz=10, active_hz=15, budget_ms=10),
+}
+
+
+class _StageState:
+    def __init__(self, budget):
+        self.budget = budget
+        self.last_run = 0.0
+        self.latency_ms = None      # EWMA of observed latency
+        self.load_factor = 1.0      # < 1 when we are shedding load
+        self.requested = False
+        self.runs = 0
+        self.reused = 0
+        self.skips = 0
+
+
+class InferenceScheduler:
+    """
+    Decides which stages run on a given frame. Each stage runs at its idle or active rate,
+    and a stage whose latency goes over budget gets its rate scaled down until it recovers.
+    """
+
+    SHED_FACTOR = 0.8       # multiply the rate by this when over budget
+    RECOVER_FACTOR = 1.05   # ...and creep back up by this when comfortably under it
+    MIN_LOAD_FACTOR = 0.1
+    SMOOTHING = 0.2
+    TOLERANCE = 0.002       # seconds; frames that land a hair early still count as due
+
+    def __init__(self, budgets=None):
+        budgets = dict(DEFAULT_BUDGETS, **(budgets or {}))
+        self.stages = {name: _StageState(b) for name, b in budgets.items()}
+        self.latency = {
+            name: registry.histogram('cv_stage_latency_seconds', 'Time spent per run of each CV pipeline stage', stage=name)
+            for name in self.stages
+        }
+        self.active = False
+        self.lock = threading.Lock()
+
+    def set_active(self, active):
+        self.active = active
+
+    def request(self, stage):
+        """Force a stage to run on the next frame regardless of its rate"""
+        with self.lock:
+            self.stages[stage].requested = True
+
+    def target_hz(self, stage):
+        state = self.stages[stage]
+        hz = state.budget.active_hz if self.active else state.budget.idle_hz
+        return hz * state.load_factor
+
+    def due(self, stage, now=None):
+        now = time.time() if now is None else now
+        with self.lock:
+            state = self.stages[stage]
+            if state.requested:
+                state.requested = False
+                return True
+            hz = self.target_hz(stage)
+            if hz > 0 and now - state.last_run >= 1.0 / hz - self.TOLERANCE:
+                return True
+            state.skips += 1
+            return False
+
+    def record(self, stage, elapsed_ms, now=None):
+        now = time.time() if now is None else now
+        self.latency[stage].observe(elapsed_ms / 1000.0)
+        with self.lock:
+            state = self.stages[stage]
+            state.last_run = now
+            state.runs += 1
+            if state.latency_ms is None:
+                state.latency_ms = elapsed_ms
+            else:
+                state.latency_ms += self.SMOOTHING * (elapsed_ms - state.latency_ms)
+
+            # Shed load when over budget, recover slowly once there is headroom again
+            if state.latency_ms > state.budget.budget_ms:
+                state.load_factor = max(state.load_factor * self.SHED_FACTOR, self.MIN_LOAD_FACTOR)
+            elif state.latency_ms < 0.7 * state.budget.budget_ms:
+                state.load_factor = min(state.load_factor * self.RECOVER_FACTOR, 1.0)
+
+    def reuse(self, stage, now=None):
+        """
+        The stage's previous result was reused instead of running it (motion gate). Counts towards
+        the stage's rate like a run, so the reuse happens at most once per interval too
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            state = self.stages[stage]
+            state.last_run = now
+            state.reused += 1
+
+    @contextmanager
+    def timed(self, stage, now=None):
+        """Time a run of stage. now is when the frame was picked up (defaults to when the run ends)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, (time.perf_counter() - start) * 1000, now)
+
+    def stats(self):
+        with self.lock:
+            return {
+                name: {
+                    'target_hz': round(self.target_hz(name), 2),
+                    'latency_ms': round(state.latency_ms, 2) if state.latency_ms is not None else None,
+                    'load_factor': round(state.load_factor, 2),
+                    'runs': state.runs,
+                    'reused': state.reused,
+                    'skips': state.skips
+                }
+                for name, state in self.stages.items()
+            }
@@ -0,0 +1,268 @@
+# sessions.py
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from agent.landmarks import LandmarkStore
+from agent.emotion_aggregator import EmotionAggregator
+from agent.batching import MicroBatcher
+
+logger = logging.getLogger(__name__)
+
+
+#=============================================================
+# Worker process side - every worker loads FER and FaceMesh exactly once
+
+_worker_models = {}
+
+
+def _init_worker(inference_width):
+    """Pool initializer: load the models once per process"""
+    # Imported here so the Flask process never pays for TensorFlow just to host the pool
+    # (with a TFLite/ONNX EMOTION_BACKEND the workers don't load TensorFlow at all)
+    from agent.emotion_backends import make_detector
+    import mediapipe as mp
+
+    _worker_models['fer'], _worker_models['emotion_backend'] = make_detector()
+    # Frames from many sessions interleave on one worker, so there is no track to follow
+    _worker_models['face_mesh'] = mp.solutions.face_mesh.FaceMesh(
+        static_image_mode=True,
+        max_num_faces=1,
+        refine_landmarks=True,
+        min_detection_confidence=0.5
+    )
+    _worker_models['inference_width'] = inference_width
+
+
+def _analyze_batch(items):
+    """
+    Analyze a batch of uploaded frames [(image_bytes, detect_emotions), ...] from any mix of sessions.
+    FaceMesh runs per frame, then every face crop goes through FER's classifier in one forward pass
+    """
+    import cv2
+    from agent.batching import preprocess_face, classify_faces
+    from agent.landmarks import face_box, landmarks_to_pixels
+    from agent.motion import scale_frame
+
+    fer = _worker_models['fer']
+    classifier = _worker_models['emotion_backend']
+    target_size = classifier.input_size
+
+    results = []
+    faces = []
+    face_owners = []
+    for image_bytes, detect_emotions in items:
+        frame = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            results.append({'error': 'Could not decode frame'})
+            continue
+
+        small, scale = scale_frame(frame, _worker_models['inference_width'])
+        mesh = _worker_models['face_mesh'].process(cv2.cvtColor(small, cv2.COLOR_BGR2RGB))
+
+        result = {'landmarks': None, 'emotions': None, 'shape': frame.shape[:2]}
+        results.append(result)
+        box = None
+        if mesh.multi_face_landmarks:
+            h, w = frame.shape[:2]
+            result['landmarks'] = landmarks_to_pixels(mesh.multi_face_landmarks[0].landmark, w, h)
+            box = face_box(result['landmarks'], frame.shape)
+
+        if not detect_emotions:
+            continue
+        # Same cascade as the local service: FaceMesh box goes into the batch, the detector's own
+        # face finder (MTCNN or Haar) only without one
+        if box is not None:
+            rect = tuple(int(v * scale) for v in box)
+            faces.append(preprocess_face(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), rect, target_size))
+            face_owners.append(result)
+        else:
+            found = fer.detect_emotions(small)
+            if found:
+                result['emotions'] = found[0]['emotions']
+
+    for result, emotions in zip(face_owners, classify_faces(classifier, faces)):
+        result['emotions'] = emotions
+
+    return results
+
+
+#=============================================================
+# API process side
+
+class SessionMonitor:
+    """Emotion monitoring state for one learner, fed by frames their browser uploads"""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.emotion_buffer = EmotionAggregator(capacity=300)
+        self.landmark_buffer = LandmarkStore(capacity=150)
+        self.is_monitoring = False
+        self.monitoring_duration = 0
+        self.monitoring_start = 0
+        self.last_seen = time.time()
+        self.in_flight = False
+        self.window_timer = None
+        self.on_window_end = None       # callback(session) when a monitoring window closes
+        self.frames_received = 0
+        self.frames_dropped = 0
+        self.lock = threading.Lock()
+        self.window_lock = threading.Lock()
+
+    def start_monitoring(self, duration: float) -> bool:
+        with self.lock:
+            self.emotion_buffer.start_window(duration)
+            self.monitoring_duration = duration
+            self.monitoring_start = time.time()
+            self.is_monitoring = True
+            # Close the window on time even if the browser stops sending frames
+            if self.window_timer is not None:
+                self.window_timer.cancel()
+            self._schedule_close(duration)
+        return True
+
+    def _schedule_close(self, delay):
+        self.window_timer = threading.Timer(delay, self._close_on_time)
+        self.window_timer.daemon = True
+        self.window_timer.start()
+
+    def _close_on_time(self):
+        # Timers can fire a little early, in which case check_window leaves the window open -
+        # wait out the rest (unless start_monitoring has replaced this timer in the meantime)
+        if self.check_window():
+            with self.lock:
+                if self.is_monitoring and self.window_timer is threading.current_thread():
+                    remaining = self.monitoring_start + self.monitoring_duration - time.time()
+                    self._schedule_close(max(remaining, 0.01))
+
+    def check_window(self, now=None):
+        """Close the monitoring window once its duration has passed"""
+        now = time.time() if now is None else now
+        with self.window_lock:
+            closed = self.is_monitoring and now - self.monitoring_start >= self.monitoring_duration
+            if closed:
+                self.is_monitoring = False
+        if closed and self.on_window_end is not None:
+            self.on_window_end(self)
+        return self.is_monitoring
+
+    def add_result(self, result):
+        """Store a worker result, returns True if it added an emotion sample"""
+        with self.lock:
+            if result.get('landmarks') is not None:
+                self.landmark_buffer.append(result['landmarks'])
+            if result.get('emotions') and self.check_window():
+                self.emotion_buffer.add(result['emotions'])
+                return True
+        return False
+
+    def get_dominant_emotion(self, seconds=None):
+        if seconds:
+            return self.emotion_buffer.last_seconds(seconds)
+        return self.emotion_buffer.latest_summary()
+
+
+class SessionRegistry:
+    """
+    Per-session monitors plus a pool of worker processes doing the actual inference. Frames from
+    all sessions are micro-batched (max_batch frames or max_wait_ms, whichever comes first) so
+    each worker call classifies many faces in one forward pass. max_batch=1 disables batching
+    """
+
+    def __init__(self, num_workers=None, inference_width=640, session_ttl=300, max_batch=None, max_wait_ms=None):
+        num_workers = num_workers or int(os.getenv('CV_WORKERS', max((os.cpu_count() or 2) // 2, 1)))
+        # spawn, not fork: forking a process that may already hold TensorFlow state is asking for trouble
+        self.pool = ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(inference_width,)
+        )
+        self.num_workers = num_workers
+        self.batcher = MicroBatcher(
+            lambda items: self.pool.submit(_analyze_batch, items),
+            max_batch=max_batch or int(os.getenv('FER_MAX_BATCH', 16)),
+            max_wait_ms=max_wait_ms if max_wait_ms is not None else float(os.getenv('FER_MAX_WAIT_MS', 5)),
+            name='fer-batcher'
+        )
+        self.session_ttl = session_ttl
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.last_expiry = time.time()
+        # Called as listener(session_id, summary) whenever a session gets a new emotion sample
+        self.emotion_listeners = []
+        # ...and window_end_listeners(session_id, summary) when its monitoring window closes
+        self.window_end_listeners = []
+
+    def get(self, session_id, create=True):
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None and create:
+                session = self.sessions[session_id] = SessionMonitor(session_id)
+                session.on_window_end = self._on_window_end
+            if session is not None:
+                session.last_seen = time.time()
+            return session
+
+    def submit_frame(self, session_id, image_bytes):
+        """
+        Queue a frame for inference. A session only ever has one frame in flight - anything that
+        arrives meanwhile is dropped so results stay fresh instead of queueing up behind the pool
+        """
+        if time.time() - self.last_expiry > 30:
+            self.expire_idle()
+
+        session = self.get(session_id)
+        with session.lock:
+            session.frames_received += 1
+            if session.in_flight:
+                session.frames_dropped += 1
+                return False
+            session.in_flight = True
+
+        future = self.batcher.submit((image_bytes, session.check_window()))
+        future.add_done_callback(lambda f: self._on_result(session, f))
+        return True
+
+    def _on_result(self, session, future):
+        session.in_flight = False
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.error(f"Frame analysis failed for session {session.session_id}: {e}")
+            return
+        if 'error' in result:
+            logger.warning(f"Session {session.session_id}: {result['error']}")
+            return
+        if session.add_result(result) and self.emotion_listeners:
+            summary = session.get_dominant_emotion()
+            for listener in self.emotion_listeners:
+                try:
+                    listener(session.session_id, summary)
+                except Exception as e:
+                    logger.error(f"Emotion listener failed: {e}")
+
+    def _on_window_end(self, session):
+        summary = session.get_dominant_emotion()
+        for listener in self.window_end_listeners:
+            try:
+                listener(session.session_id, summary)
+            except Exception as e:
+                logger.error(f"Window end listener failed: {e}")
+
+    def expire_idle(self):
+        """Forget sessions we haven't heard from in session_ttl seconds"""
+        self.last_expiry = time.time()
+        cutoff = self.last_expiry - self.session_ttl
+        with self.lock:
+            for session_id in [sid for sid, s in self.sessions.items() if s.last_seen < cutoff]:
+                del self.sessions[session_id]
+
+    def shutdown(self):
+        self.batcher.stop()
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,202 @@
+# shared_state.py
+import json
+import os
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import cv2
+import numpy as np
+
+from agent.landmarks import NUM_LANDMARKS
+from agent.snapshot import FrameSnapshot
+
+DEFAULT_NAME = 'persona_cv'
+SLOTS = 2
+SUMMARY_BYTES = 16384
+# Engine counts as gone if it hasn't written a heartbeat for this long
+STALE_AFTER = 3.0
+
+# Control block (int64): latest slot, publish count, engine pid, max height, max width
+CTRL_LATEST, CTRL_COUNT, CTRL_PID, CTRL_MAX_H, CTRL_MAX_W = range(5)
+CTRL_SIZE = 8
+# Per-slot metadata (int64): seqlock counter, frame height, frame width, has landmarks
+META_SEQ, META_H, META_W, META_HAS_LANDMARKS = range(4)
+META_SIZE = 4
+
+
+def parse_size(spec, default=(1280, 720)):
+    """'1280x720' -> (1280, 720)"""
+    if not spec:
+        return default
+    width, height = (int(v) for v in spec.lower().split('x'))
+    return width, height
+
+
+class SharedState:
+    """
+    Frames, landmarks and the latest emotion summary in one multiprocessing.shared_memory segment,
+    written by the CV engine process and read by any number of API processes.
+
+    Frames go into two slots that the writer alternates between, each guarded by its own
+    sequence counter (odd while a write is in progress). Readers get NumPy views straight into
+    the segment (no copy) plus the counter value they saw, and check is_current() afterwards to
+    know the slot wasn't rewritten while they were using it. The summary is JSON under the same
+    kind of counter.
+    """
+
+    def __init__(self, name=DEFAULT_NAME, create=False, max_size=(1280, 720)):
+        self.name = name
+        self.owner = create
+        if create:
+            max_w, max_h = max_size
+            size = self._layout(max_h, max_w)
+            try:
+                # A segment left behind by an engine that crashed
+                stale = shared_memory.SharedMemory(name=name)
+                stale.close()
+                stale.unlink()
+            except FileNotFoundError:
+                pass
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            self._map(max_h, max_w)
+            self.ctrl[:] = 0
+            self.ctrl[CTRL_PID] = os.getpid()
+            self.ctrl[CTRL_MAX_H] = max_h
+            self.ctrl[CTRL_MAX_W] = max_w
+            self.meta[:] = 0
+            self.summary_seq[0] = 0
+            self.summary_len[0] = 0
+            self.heartbeat[0] = time.time()
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            # Before 3.13 the attaching process' resource tracker would unlink the segment when
+            # this process exits, pulling it out from under the engine and the other workers
+            resource_tracker.unregister(self.shm._name, 'shared_memory')
+            ctrl = np.ndarray((CTRL_SIZE,), dtype=np.int64, buffer=self.shm.buf)
+            self._map(int(ctrl[CTRL_MAX_H]), int(ctrl[CTRL_MAX_W]))
+
+    @staticmethod
+    def _layout(max_h, max_w):
+        frame_bytes = max_h * max_w * 3
+        return (CTRL_SIZE * 8 + 8                                     # control block + heartbeat
+                + SLOTS * (META_SIZE * 8 + 8 + NUM_LANDMARKS * 2 * 4 + frame_bytes)
+                + 16 + SUMMARY_BYTES)
+
+    def _map(self, max_h, max_w):
+        buf = self.shm.buf
+        self.max_h, self.max_w = max_h, max_w
+        offset = 0
+
+        def take(shape, dtype):
+            nonlocal offset
+            array = np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset)
+            offset += array.nbytes
+            return array
+
+        self.ctrl = take((CTRL_SIZE,), np.int64)
+        self.heartbeat = take((1,), np.float64)
+        self.meta = take((SLOTS, META_SIZE), np.int64)
+        self.timestamps = take((SLOTS,), np.float64)
+        self.landmarks = take((SLOTS, NUM_LANDMARKS, 2), np.float32)
+        self.frames = take((SLOTS, max_h, max_w, 3), np.uint8)
+        self.summary_seq = take((1,), np.int64)
+        self.summary_len = take((1,), np.int64)
+        self.summary_buf = take((SUMMARY_BYTES,), np.uint8)
+
+    #=============================================================
+    # Writer (engine process)
+
+    def publish(self, frame, landmarks, timestamp=None):
+        """Copy one frame and its (n, 2+) pixel landmarks (or None) into the next slot"""
+        h, w = frame.shape[:2]
+        if h > self.max_h or w > self.max_w:
+            scale = min(self.max_h / h, self.max_w / w)
+            frame = cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+            landmarks = None if landmarks is None else landmarks[:, :2] * scale
+            h, w = frame.shape[:2]
+
+        slot = (int(self.ctrl[CTRL_LATEST]) + 1) % SLOTS
+        meta = self.meta[slot]
+        meta[META_SEQ] += 1                         # odd: write in progress
+        self.frames[slot, :h, :w] = frame
+        meta[META_H], meta[META_W] = h, w
+        if landmarks is not None:
+            self.landmarks[slot] = landmarks[:, :2]
+        meta[META_HAS_LANDMARKS] = landmarks is not None
+        self.timestamps[slot] = timestamp or time.time()
+        meta[META_SEQ] += 1                         # even: done
+        self.ctrl[CTRL_LATEST] = slot
+        self.ctrl[CTRL_COUNT] += 1
+        self.heartbeat[0] = time.time()
+
+    def publish_summary(self, data):
+        payload = json.dumps(data).encode()
+        if len(payload) > SUMMARY_BYTES:
+            raise ValueError(f"Summary too large for shared memory ({len(payload)} bytes)")
+        self.summary_seq[0] += 1
+        self.summary_buf[:len(payload)] = np.frombuffer(payload, dtype=np.uint8)
+        self.summary_len[0] = len(payload)
+        self.summary_seq[0] += 1
+        self.heartbeat[0] = time.time()
+
+    def beat(self):
+        self.heartbeat[0] = time.time()
+
+    #=============================================================
+    # Readers (API processes)
+
+    def read(self, retries=3):
+        """
+        Latest frame as a FrameSnapshot of zero-copy views (seq is the slot counter, see
+        is_current), or None if nothing was published yet
+        """
+        for _ in range(retries):
+            if self.ctrl[CTRL_COUNT] == 0:
+                return None
+            slot = int(self.ctrl[CTRL_LATEST])
+            meta = self.meta[slot]
+            seq = int(meta[META_SEQ])
+            if seq % 2:
+                continue
+            h, w = int(meta[META_H]), int(meta[META_W])
+            landmarks = self.landmarks[slot] if meta[META_HAS_LANDMARKS] else None
+            snapshot = FrameSnapshot((slot, seq), float(self.timestamps[slot]), self.frames[slot, :h, :w], landmarks)
+            if int(meta[META_SEQ]) == seq:
+                return snapshot
+        return None
+
+    def is_current(self, snapshot):
+        """True if the slot behind snapshot hasn't been rewritten since it was read"""
+        slot, seq = snapshot.seq
+        return int(self.meta[slot, META_SEQ]) == seq
+
+    def read_summary(self, retries=5):
+        for _ in range(retries):
+            seq = int(self.summary_seq[0])
+            if seq == 0:
+                return None
+            if seq % 2:
+                continue
+            payload = self.summary_buf[:int(self.summary_len[0])].tobytes()
+            if int(self.summary_seq[0]) == seq:
+                return seq, json.loads(payload)
+        return None
+
+    def alive(self):
+        return time.time() - float(self.heartbeat[0]) < STALE_AFTER
+
+    def close(self):
+        # Views into the buffer have to go before the mapping can be closed
+        for attr in ('ctrl', 'heartbeat', 'meta', 'timestamps', 'landmarks', 'frames',
+                     'summary_seq', 'summary_len', 'summary_buf'):
+            setattr(self, attr, None)
+        try:
+            self.shm.close()
+        except BufferError:
+            # A request thread still holds a view - the mapping goes away with it
+            pass
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
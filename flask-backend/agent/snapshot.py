@@ -0,0 +1,42 @@
+# snapshot.py
+import threading
+import time
+
+
+class FrameSnapshot:
+    """A frame and the landmarks FaceMesh found on that exact frame. Treat as read-only"""
+
+    __slots__ = ('seq', 'timestamp', 'frame', 'landmarks')
+
+    def __init__(self, seq, timestamp, frame, landmarks):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.frame = frame
+        self.landmarks = landmarks
+
+
+class SnapshotPublisher:
+    """
+    The video loop publishes a new snapshot after every FaceMesh run, HTTP handlers read the
+    latest one. Publishing swaps a reference under a lock, so readers never see a half-written
+    snapshot and never have to touch the camera or the MediaPipe graph themselves.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = None
+        self.version = 0
+
+    def publish(self, frame, landmarks, timestamp=None):
+        # The landmark view points into a ring that keeps moving, so keep our own copy (~4 KB)
+        landmarks = None if landmarks is None else landmarks.copy()
+        if landmarks is not None:
+            landmarks.flags.writeable = False
+        with self.lock:
+            self.version += 1
+            self.current = FrameSnapshot(self.version, timestamp or time.time(), frame, landmarks)
+            return self.version
+
+    def read(self):
+        with self.lock:
+            return self.current
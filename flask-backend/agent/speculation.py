@@ -0,0 +1,106 @@
+# speculation.py
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class _Speculation:
+    def __init__(self, prev_response, future):
+        self.prev_response = prev_response
+        self.future = future
+        self.created = time.time()
+        self.cancelled = False
+
+
+class FollowupSpeculator:
+    """
+    Generates the confusion follow-up for a session in the background before anyone asks for it,
+    so /api/followup can answer instantly once confusion is confirmed. One speculation per session,
+    dropped after ttl seconds or when a newer answer replaces it.
+    """
+
+    def __init__(self, generate, max_workers=4, ttl=120):
+        self.generate = generate        # (prev_response, session_id) -> follow-up text (or None on failure)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='followup-speculation')
+        self.ttl = ttl
+        self.entries = {}               # session_id -> _Speculation
+        self.answers = {}               # session_id -> last answer shown to the learner
+        self.lock = threading.Lock()
+        self.started = 0
+        self.used = 0
+        self.wasted = 0
+
+    def note_answer(self, session_id, answer):
+        """Remember the latest answer for a session; any speculation about an older one is dropped"""
+        with self.lock:
+            self.answers[session_id] = answer
+            entry = self.entries.get(session_id)
+            if entry is not None and entry.prev_response != answer:
+                self._cancel(session_id)
+
+    def prefetch(self, session_id, prev_response=None):
+        """Start generating the follow-up for prev_response (default: the session's latest answer)"""
+        with self.lock:
+            self._expire()
+            prev_response = prev_response or self.answers.get(session_id)
+            if not prev_response:
+                return False
+            entry = self.entries.get(session_id)
+            if entry is not None and entry.prev_response == prev_response:
+                return True     # already on it
+            if entry is not None:
+                self._cancel(session_id)
+
+            self.entries[session_id] = _Speculation(prev_response, self.executor.submit(self.generate, prev_response, session_id))
+            self.started += 1
+            logger.info(f"Speculating follow-up for session {session_id}")
+            return True
+
+    def take(self, session_id, prev_response=None, timeout=30.0):
+        """
+        The speculative follow-up for prev_response if there is one (waiting for it if it is still
+        in flight), otherwise None. A taken speculation is removed
+        """
+        with self.lock:
+            self._expire()
+            entry = self.entries.get(session_id)
+            if entry is None or (prev_response and entry.prev_response != prev_response):
+                return None
+            del self.entries[session_id]
+
+        try:
+            result = entry.future.result(timeout=timeout)
+        except Exception as e:
+            logger.warning(f"Speculative follow-up for session {session_id} failed: {e}")
+            return None
+        if result:
+            self.used += 1
+        return result
+
+    def cancel(self, session_id):
+        with self.lock:
+            self._cancel(session_id)
+
+    def _cancel(self, session_id):
+        entry = self.entries.pop(session_id, None)
+        if entry is not None:
+            # Only stops it if it hasn't started yet - a running call finishes and is ignored
+            entry.cancelled = True
+            entry.future.cancel()
+            self.wasted += 1
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        for session_id in [sid for sid, e in self.entries.items() if e.created < cutoff]:
+            self._cancel(session_id)
+
+    def stats(self):
+        return {
+            'in_flight': len(self.entries),
+            'started': self.started,
+            'used': self.used,
+            'wasted': self.wasted
+        }
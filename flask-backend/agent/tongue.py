@@ -0,0 +1,81 @@
+# tongue.py
+import threading
+
+import cv2
+import numpy as np
+
+# MediaPipe indices for inner mouth region
+INNER_MOUTH = [78, 308, 14, 13]
+
+# Pink/red hue range for the tongue in OpenCV HSV
+LOWER_PINK = np.array([145, 30, 30], dtype=np.uint8)
+UPPER_PINK = np.array([175, 255, 255], dtype=np.uint8)
+
+
+class TongueDetector:
+    """
+    Tongue visibility/position from the pink pixels inside the inner-mouth polygon. Only the
+    mouth's bounding box is ever touched, and the scratch images are reused between calls
+    (one set per thread, since the video loop and HTTP handlers both call this)
+    """
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def _scratch(self, h, w):
+        """Contiguous (h, w) mask, (h, w, 3) hsv and (h, w) pink buffers carved out of grow-only storage"""
+        local = self.local
+        size = h * w
+        if getattr(local, 'size', 0) < size:
+            local.size = max(size, 2 * getattr(local, 'size', 0))
+            local.mask = np.empty(local.size, dtype=np.uint8)
+            local.hsv = np.empty(local.size * 3, dtype=np.uint8)
+            local.pink = np.empty(local.size, dtype=np.uint8)
+        return (
+            local.mask[:size].reshape(h, w),
+            local.hsv[:size * 3].reshape(h, w, 3),
+            local.pink[:size].reshape(h, w)
+        )
+
+    def detect(self, frame, landmarks):
+        mouth_pts = landmarks[INNER_MOUTH, :2].astype(np.int32)
+
+        # Crop to the mouth's bounding box (clipped to the frame)
+        frame_h, frame_w = frame.shape[:2]
+        x, y, w, h = cv2.boundingRect(mouth_pts)
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w, frame_w), min(y + h, frame_h)
+        if x1 <= x0 or y1 <= y0:
+            return {'visible': False}
+        roi = frame[y0:y1, x0:x1]
+        mask, hsv, pink = self._scratch(y1 - y0, x1 - x0)
+
+        # Inner mouth polygon in ROI coordinates
+        mask.fill(0)
+        cv2.fillPoly(mask, [mouth_pts - (x0, y0)], 255)
+
+        # Look for pink/red colors (tongue), then keep only the ones inside the polygon
+        cv2.cvtColor(roi, cv2.COLOR_BGR2HSV, dst=hsv)
+        cv2.inRange(hsv, LOWER_PINK, UPPER_PINK, dst=pink)
+        cv2.bitwise_and(pink, mask, dst=pink)
+
+        # Calculate tongue position metrics
+        tongue_pixels = cv2.countNonZero(pink)
+        mouth_area = cv2.contourArea(mouth_pts)
+
+        if tongue_pixels > 0:
+            # Find tongue contour centroid (back in frame coordinates)
+            M = cv2.moments(pink, binaryImage=True)
+            if M["m00"] != 0:
+                cy = int(M["m01"] / M["m00"]) + y0
+
+                # Compare with mouth center
+                mouth_center = np.mean(mouth_pts, axis=0)
+
+                return {
+                    'visible': True,
+                    'position': 'front' if cy < mouth_center[1] else 'back',
+                    'relative_height': float((mouth_center[1] - cy) / mouth_area) if mouth_area > 0 else 0
+                }
+
+        return {'visible': False}
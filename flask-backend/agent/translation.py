@@ -1,12 +1,98 @@
-from anthropic import Anthropic
 from dotenv import load_dotenv
 
 import os
+import threading
+import time
+import logging
+
+from agent.response_cache import ResponseCache, text_content
+from agent.metrics import registry
+from agent.model_router import ModelRouter, MIN_CACHEABLE_TOKENS
+from agent.conversation import ConversationStore, estimate_prompt_tokens
+from agent.llm_calls import LLMCallManager, LLMBusyError
 
 # Load environment variables
 load_dotenv()
 
-anthropic = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
+logger = logging.getLogger(__name__)
+
+# The client (and the anthropic SDK import behind it) is only built on the first LLM call
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Anthropic client, created on first use. ANTHROPIC_STUB=1 swaps in a canned local one (benchmarks, offline dev)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            if os.getenv('ANTHROPIC_STUB') == '1':
+                from agent.llm_stub import StubAnthropic
+                _client = StubAnthropic()
+            else:
+                import httpx
+                from anthropic import Anthropic
+                # One keep-alive pool shared by every request thread, sized to the call limit below
+                pool = int(os.getenv('LLM_MAX_CONCURRENT', 8))
+                _client = Anthropic(
+                    api_key=os.getenv('ANTHROPIC_API_KEY'),
+                    http_client=httpx.Client(limits=httpx.Limits(max_connections=pool, max_keepalive_connections=pool)),
+                    max_retries=int(os.getenv('LLM_MAX_RETRIES', 2))
+                )
+        return _client
+
+def set_client(client):
+    """Use a specific client (e.g. a StubAnthropic with custom latency)"""
+    global _client
+    with _client_lock:
+        _client = client
+
+# Every outbound call goes through here: identical in-flight calls are merged, and concurrency,
+# token rate and per-request time are bounded (see agent/llm_calls.py)
+llm_calls = LLMCallManager(
+    get_client,
+    max_concurrent=int(os.getenv('LLM_MAX_CONCURRENT', 8)),
+    max_queue=int(os.getenv('LLM_MAX_QUEUE', 64)),
+    queue_timeout=float(os.getenv('LLM_QUEUE_TIMEOUT', 10)),
+    tokens_per_minute=int(os.getenv('LLM_TOKENS_PER_MINUTE', 0)),
+    timeout=float(os.getenv('LLM_TIMEOUT', 30))
+)
+registry.register_collector(llm_calls.collect_metrics)
+
+# Learners keep asking the same things, so translations are cached (in memory, plus on disk
+# if TRANSLATION_CACHE_PATH points at a SQLite file)
+translation_cache = ResponseCache(
+    max_entries=int(os.getenv('TRANSLATION_CACHE_SIZE', 512)),
+    ttl=float(os.getenv('TRANSLATION_CACHE_TTL', 24 * 3600)),
+    path=os.getenv('TRANSLATION_CACHE_PATH')
+)
+
+def collect_cache_metrics():
+    stats = translation_cache.stats()
+    return [
+        ('translation_cache_hits_total', 'counter', 'Translation cache hits', {}, stats['hits']),
+        ('translation_cache_misses_total', 'counter', 'Translation cache misses', {}, stats['misses']),
+        ('translation_cache_hit_ratio', 'gauge', 'Share of translation lookups served from the cache', {}, round(stats['hit_rate'], 4)),
+        ('translation_cache_entries', 'gauge', 'Entries in the in-memory translation cache', {}, stats['entries']),
+    ]
+
+registry.register_collector(collect_cache_metrics)
+
+# Haiku vs Sonnet per request, from the prompt and recent per-model latency (see agent/model_router.py)
+model_router = ModelRouter(
+    slo=float(os.getenv('LLM_SLO_SECONDS', 10)),
+    ttft_slo=float(os.getenv('LLM_TTFT_SLO_SECONDS', 2))
+)
+registry.register_collector(model_router.collect_metrics)
+
+# Each learner's conversation, so follow-ups have the original question and earlier turns
+# in context (see agent/conversation.py)
+conversations = ConversationStore(
+    max_tokens=int(os.getenv('CONVERSATION_MAX_TOKENS', 1500)),
+    ttl=float(os.getenv('CONVERSATION_TTL', 3600))
+)
+
+SYSTEM_PROMPT = "You are a helpful language teacher."
+FOLLOWUP_REQUEST = "I am confused, can you please explain your previous response to me in more detail so I can understand it better?"
 
 
 def create_translation_prompt(user_input):
@@ -48,54 +134,207 @@ def create_translation_prompt(user_input):
     """
     # Play around with the prompts after 
 
-def generate_translation_response(prompt, language="Mandarin", model_type="fast"):
-    # model = "claude-3-5-haiku-20241022" if model_type == "fast" else "claude-3-5-sonnet-20241022"
-    model = "claude-3-5-sonnet-20241022"
-    message = create_translation_prompt(prompt)
+def system_prompt(summary=None):
+    """The system prompt, plus the condensed earlier conversation if there is one"""
+    return f"{SYSTEM_PROMPT}\n\n{summary}" if summary else SYSTEM_PROMPT
+
+def with_cache_point(system, messages, model):
+    """
+    Copy of messages with a prompt-caching breakpoint on the last one, so the next follow-up reuses
+    the history - but only once the prefix is long enough for the model to cache at all. Below that
+    a breakpoint does nothing except make the request bigger
+    """
+    if not messages or estimate_prompt_tokens(system, messages) < MIN_CACHEABLE_TOKENS[model]:
+        return messages
+    last = messages[-1]
+    content = last["content"] if isinstance(last["content"], list) else [{"type": "text", "text": last["content"]}]
+    content = [dict(block) for block in content]
+    content[-1]["cache_control"] = {"type": "ephemeral"}
+    return messages[:-1] + [dict(last, content=content)]
+
+def translation_request(prompt, language="Mandarin", model_type=None, mode="blocking"):
+    """Keyword arguments for the messages API call behind a translation (model_type None = let the router pick)"""
+    model, reason = model_router.choose(prompt, "translation", mode, model_type)
+    logger.debug(f"Translation routed to {model} ({reason})")
+
+    # Potentially useful prompt:
+    # "content": f"Teach me how to say '{prompt}' in {language}. Include pronunciation guide."
+    return dict(
+        model=model,
+        max_tokens=1000,
+        temperature=0.7,
+        system=SYSTEM_PROMPT,
+        messages=[{
+            "role": "user",
+            # "content": create_translation_prompt(prompt)
+            "content": prompt
+        }]
+    )
+
+def translation_cache_key(prompt, language):
+    # Not keyed on the model: a cached answer is still good after the router switches models,
+    # and looking it up first means hits never get routed (or counted as routed) at all
+    return ResponseCache.make_key(prompt, language, SYSTEM_PROMPT)
+
+def generate_translation_response(prompt, language="Mandarin", model_type=None):
+    key = translation_cache_key(prompt, language)
+    cached = translation_cache.get(key)
+    if cached is not None:
+        return text_content(cached)
 
     try:
-        # Potentially useful prompt:
-        # "content": f"Teach me how to say '{prompt}' in {language}. Include pronunciation guide."
-        message = anthropic.messages.create(
-            model=model,        # currently aiming for speed by using Haiku over a different model
-            max_tokens=1000,
-            temperature=0.7,
-            system="You are a helpful language teacher.",
-            messages=[{
-                "role": "user",
-                # "content": message
-                "content": prompt
-            }]
-        )
+        request_kwargs = translation_request(prompt, language, model_type)
+        message = create_message(request_kwargs, "translation")
+        translation_cache.put(key, "".join(block.text for block in message.content if block.type == "text"))
         return message.content
     except Exception as e:
-        print(f"Error generating response: {e}")
+        logger.error(f"Error generating response: {e}")
         return None
     
 # TODO: create the follow-up generation for confusion emotions and build an endpoint for it if necessary (check
 # the existing ones to see if there is already functionality for it)
-def generate_followup_response(prev_response, language="French", model_type="slow"):
-    model = "claude-3-5-haiku-20241022" if model_type == "fast" else "claude-3-5-sonnet-20241022"
+def followup_request(prev_response, language="French", model_type=None, mode="blocking", session_id=None):
+    """
+    Keyword arguments for the messages API call behind a follow-up explanation. With a session_id
+    whose stored conversation ends in prev_response (or prev_response empty), the follow-up goes out
+    with that conversation; otherwise prev_response is all the context there is
+    """
+    context = conversations.context(session_id, prev_response) if session_id else None
+    summary, messages = context if context is not None else (None, [{
+        "role": "assistant",
+        "content": prev_response
+    }])
+    model, reason = model_router.choose(messages[-1]["content"], "followup", mode, model_type)
+    system = system_prompt(summary)
+    if context is not None:
+        messages = with_cache_point(system, messages, model)
+    return dict(
+        model=model,
+        max_tokens=1000,
+        temperature=0.7,
+        system=system,
+        messages=messages + [{
+            "role": "user",
+            "content": FOLLOWUP_REQUEST
+        }]
+    )
 
+def generate_followup_response(prev_response, language="French", model_type=None, session_id=None):
     try:
-        message = anthropic.messages.create(
-            model=model, 
-            max_tokens=1000,
-            temperature=0.7,
-            system="You are a helpful language teacher.",
-            messages=[{
-                "role": "assistant",
-                "content": prev_response
-            }, {
-                "role": "user",
-                "content": "I am confused, can you please explain your previous response to me in more detail so I can understand it better?"
-            }]
-        )
+        message = create_message(followup_request(prev_response, language, model_type, session_id=session_id), "followup")
         return message.content
     except Exception as e:
-        print(f"Error generating response: {e}")
+        logger.error(f"Error generating response: {e}")
         return None
 
+def record_usage(label, model, usage):
+    """Input tokens by kind (uncached, read from the prompt cache, written to it) and output tokens"""
+    for kind, attr in (('input', 'input_tokens'), ('cache_read', 'cache_read_input_tokens'),
+                       ('cache_write', 'cache_creation_input_tokens'), ('output', 'output_tokens')):
+        count = getattr(usage, attr, None) or 0
+        if count:
+            registry.counter('llm_tokens_total', 'Tokens per LLM call by kind', call=label, model=model, kind=kind).inc(count)
+
+def create_message(request_kwargs, label):
+    """
+    Blocking messages.create through the call manager, timed into llm_request_seconds. Only the
+    caller that actually hit the API reports latency (minus queueing) to the router and counts tokens
+    """
+    model = request_kwargs['model']
+    start = time.perf_counter()
+    try:
+        with registry.histogram('llm_request_seconds', 'Total time per LLM call', call=label, model=model, mode='blocking').time():
+            message, info = llm_calls.create(request_kwargs)
+    except LLMBusyError:
+        # Turned away before reaching the API - says nothing about the model
+        raise
+    except Exception:
+        model_router.record(model, time.perf_counter() - start, 'blocking', ok=False)
+        registry.counter('llm_errors_total', 'LLM calls that raised', call=label, model=model).inc()
+        raise
+    if info['leader']:
+        record_usage(label, model, message.usage)
+        model_router.record(model, time.perf_counter() - start - info['waited'], 'blocking')
+    return message
+
+#=============================================================
+# Streaming variants - the answer comes back as ("delta", text) events as tokens arrive,
+# plus a ("paragraph", text) event whenever a paragraph is complete so TTS can start on
+# the English preamble while the rest is still generating. Ends with ("done", full_text)
+
+def stream_events(request_kwargs, label="response"):
+    start = time.perf_counter()
+    pending = ""
+    parts = []
+    first = True
+    model = request_kwargs['model']
+
+    stream = None
+    try:
+        stream = llm_calls.stream(request_kwargs)
+        for text in stream.text_stream:
+            if first:
+                ttft = time.perf_counter() - start
+                registry.histogram('llm_time_to_first_token_seconds', 'Time until the first streamed token', call=label, model=model).observe(ttft)
+                if stream.leader:
+                    model_router.record(model, ttft - stream.waited, 'stream')
+                logger.info(f"{label} time to first token: {ttft * 1000:.0f} ms")
+                first = False
+            parts.append(text)
+            yield "delta", text
+
+            pending += text
+            while "\n\n" in pending:
+                paragraph, pending = pending.split("\n\n", 1)
+                if paragraph.strip():
+                    yield "paragraph", paragraph.strip()
+        if stream.leader:
+            record_usage(label, model, stream.usage)
+    except LLMBusyError:
+        raise
+    except Exception:
+        if first and (stream is None or stream.leader):
+            # Failed before the first token - counts against the model like a very slow start
+            model_router.record(model, time.perf_counter() - start, 'stream', ok=False)
+        registry.counter('llm_errors_total', 'LLM calls that raised', call=label, model=model).inc()
+        raise
+
+    if pending.strip():
+        yield "paragraph", pending.strip()
+    elapsed = time.perf_counter() - start
+    registry.histogram('llm_request_seconds', 'Total time per LLM call', call=label, model=model, mode='stream').observe(elapsed)
+    logger.info(f"{label} completed in {elapsed * 1000:.0f} ms")
+    yield "done", "".join(parts)
+
+def replay_events(text):
+    """Same event sequence as stream_events for an answer we already have"""
+    yield "delta", text
+    for paragraph in text.split("\n\n"):
+        if paragraph.strip():
+            yield "paragraph", paragraph.strip()
+    yield "done", text
+
+def replay_cached(text):
+    """replay_events for a translation_cache hit, led by a 'cached' event (for the caller, not the client)"""
+    yield "cached", text
+    yield from replay_events(text)
+
+def stream_translation_response(prompt, language="Mandarin", model_type=None):
+    key = translation_cache_key(prompt, language)
+    cached = translation_cache.get(key)
+    if cached is not None:
+        return replay_cached(cached)
+    request_kwargs = translation_request(prompt, language, model_type, mode="stream")
+    return _cache_on_done(stream_events(request_kwargs, "translation"), key)
+
+def _cache_on_done(events, key):
+    for event, text in events:
+        if event == "done":
+            translation_cache.put(key, text)
+        yield event, text
+
+def stream_followup_response(prev_response, language="French", model_type=None, session_id=None):
+    return stream_events(followup_request(prev_response, language, model_type, "stream", session_id), "followup")
 
 
 # response1 = generate_translation_response("For my upcoming trip to Paris, can you teach me a few greetings that will help me connect with locals?")
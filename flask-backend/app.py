@@ -1,35 +1,181 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-from agent.emotion_monitor import EmotionMonitorService, LanguagePronunciationGuide
-from agent.translation import *
+from agent.translation import (
+    get_client, generate_translation_response, generate_followup_response,
+    stream_translation_response, stream_followup_response, replay_events, translation_cache, model_router,
+    conversations, FOLLOWUP_REQUEST
+)
+from agent.emotion_summary import needs_followup, confusion_trending
+from agent.speculation import FollowupSpeculator
+from agent.events import EventBroker, ConfusionNotifier
+from agent.metrics import registry as metrics_registry
 
 
 import threading
+import functools
+import multiprocessing
 import logging
 import time
+import os
+import base64
+import json
+import queue
 
-logging.basicConfig(level=logging.DEBUG)
+# LOG_LEVEL=DEBUG brings back the per-request/response dumps
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper())
 logger = logging.getLogger()
-logger.level = logging.DEBUG
 
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)
 
-# Initialize emotion monitor service
-emotion_service = EmotionMonitorService()
+# APP_MODE=translation only serves the translation/follow-up endpoints and never imports cv2,
+# fer or tensorflow (fast-starting LLM-only workers). The default 'full' also serves the CV
+# endpoints, but the monitor service and its models are still only built on first use.
+# APP_MODE=api serves everything but reads CV results from a separate engine process
+# (python -m agent.cv_engine) through shared memory - see wsgi.py
+APP_MODE = os.getenv('APP_MODE', 'full').lower()
+CV_ENABLED = APP_MODE != 'translation'
+
+# Follow-ups for confused learners can be generated ahead of time. FOLLOWUP_SPECULATION is
+# 'off' (default), 'trending' (start once emotions head towards the confusion thresholds) or
+# 'always' (start as soon as a translation is returned). Every speculative follow-up nobody asks
+# for is a paid LLM call thrown away - 'always' roughly doubles spend (see development-notes.md)
+FOLLOWUP_SPECULATION = os.getenv('FOLLOWUP_SPECULATION', 'off')
+
+def _speculative_followup(prev_response, session_id):
+    response = generate_followup_response(prev_response, session_id=session_id)
+    return response[0].text if response else None
+
+followup_speculator = FollowupSpeculator(_speculative_followup)
+
+def collect_speculation_metrics():
+    stats = followup_speculator.stats()
+    return [
+        ('followup_speculation_total', 'counter', 'Speculative follow-ups by outcome', {'outcome': outcome}, stats[outcome])
+        for outcome in ('started', 'used', 'wasted')
+    ]
+
+metrics_registry.register_collector(collect_speculation_metrics)
+
+def collect_conversation_metrics():
+    stats = conversations.stats()
+    return [
+        ('conversation_sessions', 'gauge', 'Learners with a stored conversation', {}, stats['sessions']),
+        ('conversation_tokens', 'gauge', 'Estimated tokens held verbatim across stored conversations', {}, stats['tokens']),
+        ('conversation_compacted_turns_total', 'counter', 'Turns folded into a conversation summary', {}, stats['compacted_turns']),
+    ]
+
+metrics_registry.register_collector(collect_conversation_metrics)
+
+def on_emotion_sample(session_id, summary):
+    """Kick off the follow-up as soon as the emotion window starts trending towards confusion"""
+    if FOLLOWUP_SPECULATION != 'off' and confusion_trending(summary):
+        followup_speculator.prefetch(session_id)
+
+# Push channel for confusion / window-end events (see /api/monitor/events)
+event_broker = EventBroker()
+confusion_notifier = ConfusionNotifier(event_broker)
+
+# Camera + FER + FaceMesh monitor, created on the first CV request (or by __main__ / warm-up)
+emotion_service = None
+emotion_service_lock = threading.Lock()
+
+def get_emotion_service():
+    global emotion_service
+    with emotion_service_lock:
+        if emotion_service is None:
+            start = time.perf_counter()
+            if APP_MODE == 'api':
+                from agent.cv_engine import RemoteEmotionService
+                emotion_service = RemoteEmotionService()
+            else:
+                from agent.emotion_monitor import EmotionMonitorService
+                emotion_service = EmotionMonitorService()
+            emotion_service.emotion_listeners.extend([on_emotion_sample, confusion_notifier.on_sample])
+            emotion_service.window_end_listeners.append(confusion_notifier.on_window_end)
+            logger.info(f"Emotion monitor started in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return emotion_service
+
+def requires_cv(route):
+    """CV endpoints answer 503 in translation-only mode instead of loading the models"""
+    @functools.wraps(route)
+    def wrapper(*args, **kwargs):
+        if not CV_ENABLED:
+            return jsonify({
+                'status': 'error',
+                'message': 'Computer vision is disabled on this server (APP_MODE=translation)'
+            }), 503
+        return route(*args, **kwargs)
+    return wrapper
+
+def warm_up():
+    """Build the LLM client and (unless translation-only) load the CV models and run a dummy inference"""
+    try:
+        get_client()
+        if CV_ENABLED:
+            get_emotion_service().warm_up()
+    except Exception as e:
+        logger.error(f"Warm-up failed: {e}")
+
+def start_warm_up():
+    """
+    WARMUP=1 pays the model loading cost in the background right after startup instead of on the
+    first request. Called from the entry points (__main__ below, wsgi.py), never on import: the
+    session pool's spawned workers re-import this module and must not build a monitor of their own
+    """
+    if os.getenv('WARMUP') == '1' and multiprocessing.parent_process() is None:
+        threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
+# Conversation memory and speculation only apply to requests with an explicit session_id. Without
+# one the endpoints stay stateless (prev is all the context a follow-up gets), so learners who
+# don't send one never share a history
+def remember_answer(session_id, prompt, answer, cached=False):
+    if not session_id:
+        return
+    # A translation_cache hit repeats an answer that was already recorded when it was generated,
+    # adding it again would only duplicate the turn in the history
+    if not cached:
+        conversations.add_turn(session_id, prompt, answer)
+    followup_speculator.note_answer(session_id, answer)
+    if FOLLOWUP_SPECULATION == 'always':
+        followup_speculator.prefetch(session_id, answer)
+
+def remember_followup(session_id, prev, answer):
+    """Add a follow-up to the stored conversation, if it was about that conversation's last answer"""
+    if not session_id:
+        return
+    last = conversations.last_answer(session_id)
+    if last is not None and (not prev or last.strip() == prev.strip()):
+        conversations.add_turn(session_id, FOLLOWUP_REQUEST, answer)
+
+# Browser-fed monitors, one per learner. Created on first use so the worker pool
+# only spins up when somebody actually uploads frames
+session_registry = None
+session_registry_lock = threading.Lock()
+
+def get_session_registry():
+    global session_registry
+    with session_registry_lock:
+        if session_registry is None:
+            from agent.sessions import SessionRegistry
+            session_registry = SessionRegistry()
+            session_registry.emotion_listeners.extend([on_emotion_sample, confusion_notifier.on_sample])
+            session_registry.window_end_listeners.append(confusion_notifier.on_window_end)
+        return session_registry
 
 @app.after_request
 def log_response(response):
-    print(f"Response Status: {response.status}")
-    print(f"Response Headers: {dict(response.headers)}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Response Status: {response.status}")
+        logger.debug(f"Response Headers: {dict(response.headers)}")
     return response
 
 @app.route('/test', methods=['GET', 'POST', 'OPTIONS'])
 def test():
-    print("Request received!")
-    print("Method:", request.method)
-    print("Headers:", dict(request.headers))
+    logger.debug("Request received!")
+    logger.debug(f"Method: {request.method}")
+    logger.debug(f"Headers: {dict(request.headers)}")
     return jsonify({"message": "Test successful!"})
 
 # ================================================
@@ -45,10 +191,14 @@ def generate_llm_translation():
         data = request.get_json()
         prompt = data.get('prompt', "Hello")    # simple default value
         language = data.get('language', "French")
+        session_id = data.get('session_id')
+        model_type = data.get('model_type')     # 'fast' / 'slow', otherwise routed per prompt
 
         # Generate the response to the user's prompt
-        response = generate_translation_response(prompt, language)[0].text
+        content = generate_translation_response(prompt, language, model_type)[0]
+        response = content.text
         # print(response)
+        remember_answer(session_id, prompt, response, getattr(content, 'cached', False))
 
         return jsonify({
             'status': 'success',
@@ -60,16 +210,36 @@ def generate_llm_translation():
             'message': 'Failed to generate translation.'
         }), 500
     
+@app.route('/api/translation/cache', methods=['GET'])
+def get_translation_cache_stats():
+    """Hit/miss counters for the translation cache"""
+    return jsonify({
+        'status': 'success',
+        'data': translation_cache.stats()
+    }), 200
+
+@app.route('/api/translation/routing', methods=['GET'])
+def get_model_routing_stats():
+    """Per-model latency vs SLO and how requests were routed"""
+    return jsonify({
+        'status': 'success',
+        'data': model_router.stats()
+    }), 200
+
 @app.route('/api/followup', methods=['POST'])
 def generate_followup():
     try:
-        print(request)
+        logger.debug(request)
         data = request.get_json()
-        # inpt = data.get('prev_input', "")
+        # prev is optional when a session_id's conversation is stored here (see remember_followup)
         prev = data.get('prev', "")
+        session_id = data.get('session_id')
 
-        # Generate a followup
-        response = generate_followup_response(prev)[0].text
+        # Use the speculative follow-up if one was started for this answer, otherwise generate it now
+        response = followup_speculator.take(session_id, prev) if session_id else None
+        if response is None:
+            response = generate_followup_response(prev, session_id=session_id)[0].text
+        remember_followup(session_id, prev, response)
 
         return jsonify({
             'status': 'success',
@@ -81,18 +251,83 @@ def generate_followup():
             'message': 'Failed to generate translation.'
         }), 500
 
+def sse_response(events, label):
+    """
+    Wrap (event, text) pairs from the streaming generators as Server-Sent Events:
+    'delta' for every token chunk, 'paragraph' for every finished paragraph, then 'done'
+    """
+    start = time.perf_counter()
+
+    def generate():
+        first = True
+        try:
+            for event, text in events:
+                if first:
+                    logger.info(f"{label} time to first byte: {(time.perf_counter() - start) * 1000:.0f} ms")
+                    first = False
+                yield f"event: {event}\ndata: {json.dumps({'text': text})}\n\n"
+        except Exception as e:
+            logger.error(f"{label} stream failed: {e}")
+            yield f"event: error\ndata: {json.dumps({'message': 'Failed to generate translation.'})}\n\n"
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/translation/stream', methods=['POST'])
+def stream_llm_translation():
+    """Streaming version of /api/translation (Server-Sent Events)"""
+    data = request.get_json(silent=True) or {}
+    prompt = data.get('prompt', "Hello")
+    language = data.get('language', "French")
+    session_id = data.get('session_id')
+    model_type = data.get('model_type')
+
+    def events():
+        cached = False
+        for event, text in stream_translation_response(prompt, language, model_type):
+            if event == "cached":
+                cached = True
+                continue
+            if event == "done":
+                remember_answer(session_id, prompt, text, cached)
+            yield event, text
+
+    return sse_response(events(), "translation")
+
+@app.route('/api/followup/stream', methods=['POST'])
+def stream_followup():
+    """Streaming version of /api/followup (Server-Sent Events)"""
+    data = request.get_json(silent=True) or {}
+    prev = data.get('prev', "")
+    session_id = data.get('session_id')
+
+    speculated = followup_speculator.take(session_id, prev) if session_id else None
+    if speculated is not None:
+        events = replay_events(speculated)
+    else:
+        events = stream_followup_response(prev, session_id=session_id)
+
+    def remembered():
+        for event, text in events:
+            if event == "done":
+                remember_followup(session_id, prev, text)
+            yield event, text
+
+    return sse_response(remembered(), "followup")
+
 #=============================================================
 
 #=============================================================
 # CV Monitoring Endpoints
 @app.route('/api/monitor/start', methods=['POST'])
+@requires_cv
 def start_monitoring():
     """Start monitoring emotions"""
     try:
         data = request.get_json()
         duration = float(data.get('duration', 5.0))
         
-        if emotion_service.start_monitoring(duration):
+        if get_emotion_service().start_monitoring(duration):
             return jsonify({
                 'status': 'success',
                 'message': f'Started monitoring for {duration} seconds'
@@ -109,32 +344,19 @@ def start_monitoring():
         }), 500
     
 @app.route('/api/monitor/result', methods=['GET'])
+@requires_cv
 def get_result():
-    """Get the emotional response result"""
+    """Get the emotional response result (?seconds=N for just the last N seconds)"""
     try:
-        emotion_data = emotion_service.get_dominant_emotion()
+        emotion_data = get_emotion_service().get_dominant_emotion(request.args.get('seconds', type=float))
         
-        # TODO: Can potentially make confusion indicators more sensitive by just treating
-        # it as if confusion exists when we see neutral, surprise, and anger all in one buffer or something
         if emotion_data:
-            # Determine if follow-up is needed
-            confusion_indicators = {
-                'neutral': 0.7,
-                'surprise': 0.6,
-                'fear': 0.5,
-                'sad': 0.5
-            }
-            
-            needs_followup = (
-                emotion_data['emotion'] in confusion_indicators and 
-                emotion_data['score'] > confusion_indicators[emotion_data['emotion']]
-            )
-            
+            # Determine if follow-up is needed (see agent/emotion_summary.py for the thresholds)
             return jsonify({
                 'status': 'success',
                 'data': {
                     'emotion': emotion_data,
-                    'needs_followup': needs_followup
+                    'needs_followup': needs_followup(emotion_data)
                 }
             }), 200
         else:
@@ -148,33 +370,91 @@ def get_result():
             'message': str(e)
         }), 500
     
+@app.route('/api/monitor/events', methods=['GET'])
+@requires_cv
+def monitor_events():
+    """
+    Server-Sent Events for one session (?session_id=..., default 'default'). Pushes 'confusion'
+    as soon as the follow-up rule fires and 'window_end' when a monitoring window closes,
+    so the frontend doesn't have to poll /api/monitor/result
+    """
+    session_id = request.args.get('session_id', 'default')
+    # 'default' is the local (or engine) monitor, whose events come from the service's listeners
+    # (in api mode, its shared-memory watcher) - make sure it exists even if this worker hasn't
+    # served any other CV route yet. Browser-fed sessions (/api/sessions/...) don't need it, and
+    # a server without a camera still streams whatever events do arrive
+    if session_id == 'default':
+        try:
+            get_emotion_service()
+        except Exception as e:
+            logger.warning(f"No local emotion monitor for /api/monitor/events: {e}")
+    subscription = event_broker.subscribe(session_id)
+
+    def generate():
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    event, data = subscription.get(timeout=15)
+                except queue.Empty:
+                    # Keep-alive so proxies don't close an idle connection
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            event_broker.unsubscribe(session_id, subscription)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/monitor/preview.mjpg', methods=['GET'])
+@requires_cv
+def monitor_preview():
+    """Live overlay preview as an MJPEG stream (only when started with PREVIEW_MODE=mjpeg)"""
+    service = get_emotion_service()
+    if service.preview_mode != 'mjpeg':
+        return jsonify({
+            'status': 'error',
+            'message': f'Preview is not served in {service.preview_mode} mode (set PREVIEW_MODE=mjpeg)'
+        }), 404
+    return Response(service.preview.frames(),
+                    mimetype='multipart/x-mixed-replace; boundary=frame',
+                    headers={'Cache-Control': 'no-cache'})
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Stage latencies (p50/p95/p99), frame rates, dropped frames and cache hit rates for Prometheus"""
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/monitor/stats', methods=['GET'])
+@requires_cv
+def get_monitor_stats():
+    """How often each CV stage ran, was skipped or reused a previous result"""
+    return jsonify({
+        'status': 'success',
+        'data': get_emotion_service().pipeline_stats()
+    }), 200
+
 @app.route('/api/monitor/pronunciation', methods=['POST'])
+@requires_cv
 def check_pronunciation():
     """Check pronunciation for a specific phoneme in a specific language"""
-    # Too many requests causes seg faults???? be careful
+    # Reads the snapshot published by the video loop, so concurrent requests never touch the camera
     try:
         data = request.get_json()
         phoneme = data.get('phoneme', '')
         language = data.get('language', 'french')  # default to French
 
         logger.info("Parsed Pronunciation request")
-        
-        # Initialize pronunciation guide if needed
-        if not hasattr(emotion_service, 'pronunciation_guide'):
-            emotion_service.pronunciation_guide = LanguagePronunciationGuide(language)
-        elif emotion_service.pronunciation_guide.language != language:
-            emotion_service.pronunciation_guide = LanguagePronunciationGuide(language)
-        
-        logger.info("Created pronunciation guide")
 
-        # Get pronunciation analysis
-        analysis = emotion_service.analyze_pronunciation(phoneme)
-        feedback = analysis['feedback']
+        # Get pronunciation analysis (targets for every language are compiled at startup,
+        # so the language is just a lookup - nothing shared gets swapped out per request)
+        analysis = get_emotion_service().analyze_pronunciation(phoneme, language)
         
         if analysis:
             return jsonify({
                 'status': 'success',
-                'message': feedback
+                'message': analysis['feedback']
             }), 200
         else:
             return jsonify({
@@ -188,19 +468,189 @@ def check_pronunciation():
             'message': str(e)
         }), 500
 
+@app.route('/api/monitor/pronunciation/batch', methods=['POST'])
+@requires_cv
+def check_pronunciation_batch():
+    """Score a whole word/phrase: {"phonemes": ["b", "on"], "language": "french"}"""
+    try:
+        data = request.get_json()
+        phonemes = data.get('phonemes', [])
+        language = data.get('language', 'french')
+
+        if not isinstance(phonemes, list) or not phonemes:
+            return jsonify({
+                'status': 'error',
+                'message': 'phonemes must be a non-empty list'
+            }), 400
+
+        analysis = get_emotion_service().analyze_pronunciation_batch(phonemes, language)
+        if analysis is None:
+            return jsonify({
+                'status': 'error',
+                'message': 'No pronunciation data available'
+            }), 404
+        if analysis['phonemes'] is None:
+            return jsonify({
+                'status': 'error',
+                'message': f'Language not supported: {language}'
+            }), 400
+
+        return jsonify({
+            'status': 'success',
+            'data': analysis
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/monitor/utterance/start', methods=['POST'])
+@requires_cv
+def start_utterance():
+    """Mark the start of an utterance for trajectory analysis"""
+    try:
+        started = get_emotion_service().start_utterance()
+        return jsonify({
+            'status': 'success',
+            'started_at': started
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/monitor/utterance/end', methods=['POST'])
+@requires_cv
+def end_utterance():
+    """
+    Mark the end of the utterance and analyze every frame in between.
+    Optional body: {"phonemes": ["b", "on"], "language": "french", "trajectory": true}
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        analysis = get_emotion_service().end_utterance(
+            phonemes=data.get('phonemes'),
+            language=data.get('language'),
+            include_trajectory=data.get('trajectory', True)
+        )
+        if analysis is None:
+            return jsonify({
+                'status': 'error',
+                'message': 'No utterance in progress or no landmarks captured'
+            }), 404
+
+        return jsonify({
+            'status': 'success',
+            'data': analysis
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+#=========================================================================
+
+#=========================================================================
+# Per-session Monitoring Endpoints (frames uploaded by the frontend)
+@app.route('/api/sessions/<session_id>/frame', methods=['POST'])
+@requires_cv
+def upload_frame(session_id):
+    """
+    Accept one JPEG frame for a session, either as a raw image/jpeg body or as
+    JSON {"frame": "<base64 jpeg>"}. Frames arriving while the previous one is
+    still being analyzed are dropped.
+    """
+    try:
+        if request.mimetype == 'application/json':
+            image_bytes = base64.b64decode(request.get_json().get('frame', ''))
+        else:
+            image_bytes = request.get_data()
+
+        if not image_bytes:
+            return jsonify({
+                'status': 'error',
+                'message': 'No frame provided'
+            }), 400
+
+        accepted = get_session_registry().submit_frame(session_id, image_bytes)
+        return jsonify({
+            'status': 'success',
+            'accepted': accepted
+        }), 202
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/sessions/<session_id>/monitor/start', methods=['POST'])
+@requires_cv
+def start_session_monitoring(session_id):
+    """Start monitoring emotions for one session"""
+    try:
+        data = request.get_json(silent=True) or {}
+        duration = float(data.get('duration', 5.0))
+        get_session_registry().get(session_id).start_monitoring(duration)
+        return jsonify({
+            'status': 'success',
+            'message': f'Started monitoring for {duration} seconds'
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/sessions/<session_id>/monitor/result', methods=['GET'])
+@requires_cv
+def get_session_result(session_id):
+    """Get the emotional response result for one session"""
+    try:
+        session = get_session_registry().get(session_id, create=False)
+        seconds = request.args.get('seconds', type=float)
+        emotion_data = session.get_dominant_emotion(seconds) if session else None
+
+        if emotion_data:
+            return jsonify({
+                'status': 'success',
+                'data': {
+                    'emotion': emotion_data,
+                    'needs_followup': needs_followup(emotion_data)
+                }
+            }), 200
+        else:
+            return jsonify({
+                'status': 'error',
+                'message': 'No emotion data available'
+            }), 404
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
 #=========================================================================
 
 # Run the app
 if __name__ == '__main__':
-    # Start Flask in a daemon thread
-    flask_thread = threading.Thread(
-        target=lambda: app.run(host='0.0.0.0', port=8000, debug=False)
-    )
-    flask_thread.daemon = True
-    flask_thread.start()
-    
-    # Run OpenCV in main thread
-    try:
-        emotion_service.run_video_display()
-    finally:
-        emotion_service.stop()
\ No newline at end of file
+    start_warm_up()
+    if not CV_ENABLED or APP_MODE == 'api':
+        # Nothing to run besides Flask (prefer wsgi.py under gunicorn in api mode)
+        app.run(host='0.0.0.0', port=8000, debug=False, threaded=True)
+    else:
+        # Start Flask in a daemon thread
+        flask_thread = threading.Thread(
+            target=lambda: app.run(host='0.0.0.0', port=8000, debug=False)
+        )
+        flask_thread.daemon = True
+        flask_thread.start()
+
+        # Run OpenCV in main thread
+        service = get_emotion_service()
+        try:
+            service.run_video_display()
+        finally:
+            service.stop()
\ No newline at end of file
@@ -0,0 +1,142 @@
+# api_load.py
+"""
+Load-test the Flask endpoints against the local Anthropic stub (no API key or network needed).
+
+    python -m benchmarks.api_load --clients 8 --seconds 10 --output api.json
+    python -m benchmarks.api_load --endpoints translation --llm-latency 0.8
+
+Runs the real app on a threaded local server with FRAME_SOURCE=synthetic and PREVIEW_MODE=headless.
+Each client sends requests back to back (closed loop). Translation prompts are unique per request
+unless --repeat-prompts is given, so by default the cache doesn't hide the LLM call.
+The pronunciation endpoint reads a snapshot with made-up landmarks, so it measures the handler and
+the scoring, not FaceMesh.
+"""
+import argparse
+import itertools
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+from benchmarks.report import latency_summary, save_results
+
+ENDPOINTS = {
+    'translation': '/api/translation',
+    'followup': '/api/followup',
+    'pronunciation': '/api/monitor/pronunciation',
+}
+
+
+def payloads(endpoint, repeat_prompts):
+    counter = itertools.count()
+    phonemes = itertools.cycle(['u', 'ou', 'eu', 'an', 'on', 'in', 'r', 'l'])
+    while True:
+        n = next(counter)
+        if endpoint == 'translation':
+            prompt = "How do I say 'good morning'?" if repeat_prompts else f"How do I say 'good morning' number {n}?"
+            yield {'prompt': prompt, 'language': 'French', 'session_id': f'bench-{n % 16}'}
+        elif endpoint == 'followup':
+            yield {'prev': f"Bonjour means hello ({n}).", 'session_id': f'bench-{n % 16}'}
+        else:
+            yield {'phoneme': next(phonemes), 'language': 'french'}
+
+
+def load_test(base_url, endpoint, clients, seconds, repeat_prompts):
+    url = base_url + ENDPOINTS[endpoint]
+    source = payloads(endpoint, repeat_prompts)
+    source_lock = threading.Lock()
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        local, local_statuses = [], {}
+        while time.perf_counter() < deadline:
+            with source_lock:
+                body = json.dumps(next(source)).encode()
+            req = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(req, timeout=60) as response:
+                    response.read()
+                    status = response.status
+            except urllib.error.HTTPError as e:
+                status = e.code
+            local.append((time.perf_counter() - start) * 1000)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+        with lock:
+            latencies.extend(local)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': len(latencies),
+        'throughput_per_s': round(len(latencies) / elapsed, 1),
+        'status_codes': {str(k): v for k, v in sorted(statuses.items())},
+        'latency': latency_summary(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--endpoints', nargs='+', choices=list(ENDPOINTS), default=list(ENDPOINTS))
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--llm-latency', type=float, default=0.05, help='Stub messages.create delay in seconds')
+    parser.add_argument('--repeat-prompts', action='store_true', help='Send the same translation prompt (cache hits)')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    # Set up before the app (and the service singleton) gets imported
+    os.environ['ANTHROPIC_STUB'] = '1'
+    os.environ.setdefault('FRAME_SOURCE', 'synthetic')
+    os.environ.setdefault('PREVIEW_MODE', 'headless')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    # Memory-only cache so a run never reads (or pollutes) a real on-disk translation cache
+    os.environ['TRANSLATION_CACHE_PATH'] = ''
+
+    from werkzeug.serving import make_server
+    import agent.translation as translation
+    from agent.llm_stub import StubAnthropic
+    from benchmarks.cv_pipeline import fake_landmarks
+    import app as app_module
+
+    translation.set_client(StubAnthropic(latency=args.llm_latency))
+
+    service = app_module.get_emotion_service()
+    frame = np.full((720, 1280, 3), 120, dtype=np.uint8)
+    service.snapshots.publish(frame, fake_landmarks(frame.shape, np.random.default_rng(0)))
+
+    server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    results = {}
+    try:
+        for endpoint in args.endpoints:
+            results[endpoint] = load_test(base_url, endpoint, args.clients, args.seconds, args.repeat_prompts)
+        results['llm_calls'] = len(translation.get_client().calls)
+        results['translation_cache'] = translation.translation_cache.stats()
+    finally:
+        server.shutdown()
+        service.stop()
+
+    save_results('api_load', vars(args), results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# cold_start.py
+"""
+How long app.py takes to become useful, measured in fresh interpreters.
+
+    python -m benchmarks.cold_start --runs 3 --output cold.json
+    python -m benchmarks.cold_start --modes translation
+
+For every mode this starts a new Python process and records the time to import app.py, the time
+to answer the first /api/translation request (Anthropic stub), and, in full mode, the time to
+answer the first CV request (/api/monitor/stats, synthetic frames) and to warm the models up.
+It also reports which heavy modules got imported along the way.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.report import latency_summary, save_results
+
+HEAVY_MODULES = ('cv2', 'fer', 'tensorflow', 'mediapipe', 'anthropic')
+
+PROBE = r'''
+import json, sys, time
+start = time.perf_counter()
+import app
+result = {'import_s': time.perf_counter() - start}
+client = app.app.test_client()
+
+t = time.perf_counter()
+response = client.post('/api/translation', json={'prompt': 'Hello', 'language': 'French'})
+result['first_translation_s'] = time.perf_counter() - t
+result['translation_status'] = response.status_code
+
+if app.CV_ENABLED:
+    t = time.perf_counter()
+    response = client.get('/api/monitor/stats')
+    result['first_cv_request_s'] = time.perf_counter() - t
+    result['cv_status'] = response.status_code
+    result['warm_up_s'] = app.get_emotion_service().warm_up()
+    app.get_emotion_service().stop()
+
+result['total_s'] = time.perf_counter() - start
+result['modules'] = {name: name in sys.modules for name in %r}
+print('RESULT ' + json.dumps(result))
+''' % (HEAVY_MODULES,)
+
+
+def probe(mode):
+    env = dict(os.environ, APP_MODE=mode, ANTHROPIC_STUB='1', FRAME_SOURCE='synthetic',
+               PREVIEW_MODE='headless', LOG_LEVEL='WARNING', TRANSLATION_CACHE_PATH='')
+    env.pop('WARMUP', None)
+    out = subprocess.run([sys.executable, '-c', PROBE], env=env, capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    for line in out.stdout.splitlines():
+        if line.startswith('RESULT '):
+            return json.loads(line[len('RESULT '):])
+    raise RuntimeError(f"{mode} probe failed:\n{out.stderr[-2000:]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='+', choices=['translation', 'full'], default=['translation', 'full'])
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = {}
+    for mode in args.modes:
+        runs = [probe(mode) for _ in range(args.runs)]
+        timings = {
+            key[:-2]: latency_summary([run[key] * 1000 for run in runs])
+            for key in runs[0] if key.endswith('_s')
+        }
+        results[mode] = {
+            'timings': timings,
+            'status': {k: runs[-1][k] for k in runs[-1] if k.endswith('_status')},
+            'modules_loaded': runs[-1]['modules'],
+        }
+
+    save_results('cold_start', vars(args), results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# compare.py
+"""
+Diff two benchmark result files and flag regressions.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10
+
+Walks both reports and compares every latency (*_ms, lower is better) and rate
+(*_fps, *_per_s, higher is better) they have in common. Exits with status 1 if any of them got
+worse by more than --threshold percent, so it can gate CI.
+"""
+import argparse
+import json
+import sys
+
+LOWER_IS_BETTER = ('_ms',)
+HIGHER_IS_BETTER = ('_fps', '_per_s')
+
+
+def flatten(value, prefix=''):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from flatten(item, f'{prefix}.{key}' if prefix else key)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, float(value)
+
+
+def compare(baseline, candidate, threshold):
+    base = dict(flatten(baseline['results']))
+    new = dict(flatten(candidate['results']))
+    rows = []
+    for key in sorted(base.keys() & new.keys()):
+        if key.endswith(LOWER_IS_BETTER):
+            sign = 1
+        elif key.endswith(HIGHER_IS_BETTER):
+            sign = -1
+        else:
+            continue
+        if base[key] == 0:
+            continue
+        change = (new[key] - base[key]) / base[key] * 100
+        rows.append((key, base[key], new[key], change, sign * change > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=10.0, help='Percent change that counts as a regression')
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    if baseline.get('benchmark') != candidate.get('benchmark'):
+        sys.exit(f"Can't compare {baseline.get('benchmark')} with {candidate.get('benchmark')}")
+
+    rows = compare(baseline, candidate, args.threshold)
+    print(f"{baseline.get('git_revision')} -> {candidate.get('git_revision')}")
+    for key, old, new, change, regressed in rows:
+        print(f"{'REGRESSION ' if regressed else '           '}{key:60s} {old:12.3f} {new:12.3f} {change:+7.1f}%")
+    regressions = sum(1 for row in rows if row[4])
+    print(f"{regressions} regression(s) over {args.threshold}%")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+# cv_pipeline.py
+"""
+Replay frames through the EmotionMonitorService stages one after another and time each of them.
+
+    python -m benchmarks.cv_pipeline --source video:face.mp4 --frames 300 --output cv.json
+    python -m benchmarks.cv_pipeline --source synthetic:1280x720 --fake-landmarks
+
+Stages: capture (source read, frames are not paced), facemesh (process_landmarks), fer (detect_emotions),
+emotion_summary (get_dominant_emotion), mouth_shape (analyze_mouth_shape) and tongue
+(detect_tongue_position). Synthetic frames have no real face, so --fake-landmarks makes up a
+landmark set for the mouth/tongue stages. The scheduler and motion gate are bypassed on purpose:
+every stage runs on every frame so the numbers measure the stages, not the rates.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from agent.capture import SyntheticSource, make_frame_source
+from agent.landmarks import NUM_LANDMARKS
+from agent.motion import scale_frame
+from benchmarks.report import latency_summary, save_results
+
+STAGES = ('capture', 'facemesh', 'fer', 'emotion_summary', 'mouth_shape', 'tongue')
+
+
+def fake_landmarks(shape, rng):
+    """Landmarks scattered over a face-sized box in the middle of the frame"""
+    h, w = shape[:2]
+    size = h * 0.4
+    points = np.empty((NUM_LANDMARKS, 2), dtype=np.float32)
+    points[:, 0] = rng.uniform(w / 2 - size / 2, w / 2 + size / 2, NUM_LANDMARKS)
+    points[:, 1] = rng.uniform(h / 2 - size / 2, h / 2 + size / 2, NUM_LANDMARKS)
+    return points
+
+
+def run(service, source, frames, warmup, inference_width, use_fake_landmarks):
+    rng = np.random.default_rng(0)
+    timings = {stage: [] for stage in STAGES}
+    frame_times = []
+    faces = 0
+
+    def timed(stage, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        if measuring:
+            timings[stage].append((time.perf_counter() - start) * 1000)
+        return result
+
+    service.emotion_buffer.start_window(3600)
+    for i in range(warmup + frames):
+        measuring = i >= warmup
+        loop_start = time.perf_counter()
+
+        frame = timed('capture', source.read)
+        if frame is None:
+            if source.exhausted:
+                break
+            continue
+        small, scale = scale_frame(frame, inference_width)
+
+        landmarks = timed('facemesh', service.process_landmarks, small, frame.shape)
+        if landmarks is not None:
+            faces += 1 if measuring else 0
+        elif use_fake_landmarks:
+            landmarks = fake_landmarks(frame.shape, rng)
+
+        emotions = timed('fer', service.detect_emotions, small, scale)
+        if emotions:
+            service.emotion_buffer.add(emotions[0]['emotions'])
+        timed('emotion_summary', service.get_dominant_emotion)
+
+        if landmarks is not None:
+            timed('mouth_shape', service.analyze_mouth_shape, landmarks)
+            timed('tongue', service.detect_tongue_position, frame, landmarks)
+
+        if measuring:
+            frame_times.append(time.perf_counter() - loop_start)
+
+    total = sum(frame_times)
+    return {
+        'frames': len(frame_times),
+        'frames_with_face': faces,
+        'end_to_end_fps': round(len(frame_times) / total, 2) if total else None,
+        'frame_ms': latency_summary([t * 1000 for t in frame_times]),
+        'stages': {stage: latency_summary(samples) for stage, samples in timings.items()},
+        'fer_face_source': {'cascade': service.cascade_calls, 'mtcnn': service.mtcnn_calls},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', default='synthetic', help='Frame source spec (see agent/capture.py)')
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--inference-width', type=int, default=640)
+    parser.add_argument('--no-cascade', action='store_true', help='Always use MTCNN for the FER face box')
+    parser.add_argument('--fake-landmarks', action='store_true')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    from agent.emotion_monitor import EmotionMonitorService
+    # The service's own capture thread isn't used here - give it a throwaway source and stop it
+    service = EmotionMonitorService(source=SyntheticSource(64, 48), cascade=not args.no_cascade,
+                                    inference_width=args.inference_width, motion_gate=False, preview='headless')
+    service.capture.stop()
+
+    source = make_frame_source(args.source)
+    source.open()
+    try:
+        results = run(service, source, args.frames, args.warmup, args.inference_width, args.fake_landmarks)
+    finally:
+        source.close()
+        service.stop()
+
+    save_results('cv_pipeline', vars(args), results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# fer_batching.py
+"""
+Compare batched vs unbatched FER classification under concurrent sessions.
+
+    python -m benchmarks.fer_batching --sessions 16 --seconds 10
+
+Every simulated session submits a face crop, waits for its result, then submits the next one
+(closed loop, like a browser uploading frames back to back). Reports throughput and per-request
+latency percentiles for each max_batch setting.
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from agent.batching import MicroBatcher, classify_faces
+from agent.emotion_backends import keras_reference, load_backend
+from benchmarks.report import latency_summary, save_results
+
+
+def run(model, target_size, sessions, seconds, max_batch, max_wait_ms):
+    batcher = MicroBatcher(lambda faces: classify_faces(model, faces), max_batch=max_batch, max_wait_ms=max_wait_ms)
+    rng = np.random.default_rng(0)
+    face = rng.uniform(-1, 1, size=(*target_size, 1)).astype(np.float32)
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def session_loop():
+        local = []
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            batcher.submit(face).result()
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=session_loop) for _ in range(sessions)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    batcher.stop()
+
+    return {
+        'max_batch': max_batch,
+        'max_wait_ms': max_wait_ms,
+        'sessions': sessions,
+        'requests': len(latencies),
+        'throughput_per_s': round(len(latencies) / elapsed, 1),
+        'mean_batch_size': round(batcher.mean_batch_size, 2),
+        'latency': latency_summary(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--max-batch', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    parser.add_argument('--backend', default='keras', help="'keras', 'tflite:<path>' or 'onnx:<path>'")
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    model = keras_reference() if args.backend == 'keras' else load_backend(args.backend)
+    target_size = model.input_size
+    # Warm up so graph tracing doesn't land in the first measurement
+    classify_faces(model, [np.zeros((*target_size, 1), dtype=np.float32)])
+
+    # Keyed by setting so compare.py can diff runs
+    results = {
+        f'max_batch_{b}': run(model, target_size, args.sessions, args.seconds, b, args.max_wait_ms)
+        for b in args.max_batch
+    }
+    save_results('fer_batching', vars(args), results, args.output)
+
+
+if __name__ == '__main__':
+    main()
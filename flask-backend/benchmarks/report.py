@@ -0,0 +1,49 @@
+# report.py
+"""Shared helpers for the benchmark scripts: latency summaries and JSON results that compare.py can diff"""
+import json
+import platform
+import subprocess
+import time
+
+import numpy as np
+
+
+def percentile(values, q):
+    return round(float(np.percentile(values, q)), 3) if len(values) else None
+
+
+def latency_summary(samples_ms):
+    """count / mean / p50 / p95 / p99 / max of a list of latencies in ms"""
+    return {
+        'count': len(samples_ms),
+        'mean_ms': round(float(np.mean(samples_ms)), 3) if len(samples_ms) else None,
+        'p50_ms': percentile(samples_ms, 50),
+        'p95_ms': percentile(samples_ms, 95),
+        'p99_ms': percentile(samples_ms, 99),
+        'max_ms': round(float(np.max(samples_ms)), 3) if len(samples_ms) else None,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def save_results(name, config, results, output=None):
+    """Print the results and, given a path, write them as JSON with enough context to compare runs later"""
+    report = {
+        'benchmark': name,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'config': config,
+        'results': results,
+    }
+    print(json.dumps(report, indent=2))
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return report
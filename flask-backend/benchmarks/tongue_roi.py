@@ -0,0 +1,90 @@
+# tongue_roi.py
+"""
+Per-call cost of tongue detection: the original full-frame implementation vs the ROI-cropped one.
+
+    python -m benchmarks.tongue_roi --iterations 500
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from agent.tongue import TongueDetector, INNER_MOUTH, LOWER_PINK, UPPER_PINK
+from benchmarks.report import save_results
+
+
+def full_frame_detect(frame, landmarks):
+    """The original detect_tongue_position, kept here as the baseline"""
+    h, w = frame.shape[:2]
+    mask = np.zeros((h, w), dtype=np.uint8)
+    mouth_pts = landmarks[INNER_MOUTH, :2].astype(np.int32)
+    cv2.fillPoly(mask, [mouth_pts], 255)
+    mouth_region = cv2.bitwise_and(frame, frame, mask=mask)
+    hsv = cv2.cvtColor(mouth_region, cv2.COLOR_BGR2HSV)
+    tongue_mask = cv2.inRange(hsv, LOWER_PINK, UPPER_PINK)
+    tongue_pixels = cv2.countNonZero(tongue_mask)
+    mouth_area = cv2.contourArea(mouth_pts)
+    if tongue_pixels > 0:
+        M = cv2.moments(tongue_mask)
+        if M["m00"] != 0:
+            cy = int(M["m01"] / M["m00"])
+            mouth_center = np.mean(mouth_pts, axis=0)
+            return {
+                'visible': True,
+                'position': 'front' if cy < mouth_center[1] else 'back',
+                'relative_height': float((mouth_center[1] - cy) / mouth_area) if mouth_area > 0 else 0
+            }
+    return {'visible': False}
+
+
+def synthetic_mouth(width, height, seed=0):
+    """A noisy frame with a pink blob inside a mouth polygon sized like a face ~1/3 of the frame"""
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8)
+    landmarks = np.zeros((478, 2), dtype=np.float32)
+    cx, cy = width // 2, int(height * 0.6)
+    mouth_w, mouth_h = width // 10, height // 20
+    landmarks[78] = (cx - mouth_w // 2, cy)
+    landmarks[308] = (cx + mouth_w // 2, cy)
+    landmarks[13] = (cx, cy - mouth_h // 2)
+    landmarks[14] = (cx, cy + mouth_h // 2)
+    # BGR for a hue inside the pink range
+    cv2.ellipse(frame, (cx, cy + mouth_h // 6), (mouth_w // 5, mouth_h // 5), 0, 0, 360, (180, 60, 200), -1)
+    return frame, landmarks
+
+
+def time_per_call(fn, frame, landmarks, iterations):
+    fn(frame, landmarks)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(frame, landmarks)
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    detector = TongueDetector()
+    # Keyed by resolution so compare.py can diff runs
+    results = {}
+    for name, (w, h) in {'720p': (1280, 720), '1080p': (1920, 1080)}.items():
+        frame, landmarks = synthetic_mouth(w, h)
+        baseline, cropped = full_frame_detect(frame, landmarks), detector.detect(frame, landmarks)
+        assert baseline == cropped, (baseline, cropped)
+        full_ms = time_per_call(full_frame_detect, frame, landmarks, args.iterations)
+        roi_ms = time_per_call(detector.detect, frame, landmarks, args.iterations)
+        results[name] = {
+            'full_frame_ms': round(full_ms, 4),
+            'roi_ms': round(roi_ms, 4),
+            'speedup': round(full_ms / roi_ms, 1)
+        }
+
+    save_results('tongue_roi', vars(args), results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+import os
+import sys
+
+# Offline, LLM-only app: the canned StubAnthropic client, no CV models, no on-disk cache
+os.environ.setdefault('ANTHROPIC_STUB', '1')
+os.environ.setdefault('APP_MODE', 'translation')
+os.environ['TRANSLATION_CACHE_PATH'] = ''
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture
+def stub():
+    """A fresh StubAnthropic (no artificial latency) with empty caches and conversations"""
+    from agent import translation
+    from agent.llm_stub import StubAnthropic
+
+    client = StubAnthropic(latency=0, first_token_latency=0, chunk_delay=0)
+    translation.set_client(client)
+    translation.translation_cache.clear()
+    translation.conversations.sessions.clear()
+    yield client
+    translation.set_client(None)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from agent.articulation import ArticulationAnalyzer
+from agent.landmarks import LOWER_LIP, MOUTH_LEFT, MOUTH_RIGHT, UPPER_LIP
+from agent.pronunciation import PronunciationRegistry
+
+
+def mouth(openness, width=50.0):
+    """One frame of landmarks whose mouth has the given height / width"""
+    frame = np.zeros((478, 2), dtype=np.float32)
+    frame[MOUTH_LEFT, 0], frame[MOUTH_RIGHT, 0] = 100.0, 100.0 + width
+    frame[UPPER_LIP, 1] = 100.0
+    frame[LOWER_LIP, 1] = 100.0 + openness * width
+    # 308 is in both lip lists, so its height is always 0 - mirror that in the expected mean
+    return frame
+
+
+def expected_openness(openness):
+    shared = len(set(UPPER_LIP) & set(LOWER_LIP))
+    return openness * (len(UPPER_LIP) - shared) / len(UPPER_LIP)
+
+
+def test_compute_uses_real_frame_spacing():
+    window = np.stack([mouth(0.1), mouth(0.3), mouth(0.5)])
+    timestamps = np.array([0.0, 0.1, 0.5])
+    openness, width, ratio, velocity = ArticulationAnalyzer().compute(window, timestamps)
+    np.testing.assert_allclose(openness, [expected_openness(v) for v in (0.1, 0.3, 0.5)], rtol=1e-5)
+    np.testing.assert_allclose(width, 50.0)
+    step = expected_openness(0.2)
+    np.testing.assert_allclose(velocity, [0.0, step / 0.1, step / 0.4], rtol=1e-4)
+
+
+def test_closed_mouth_is_finite():
+    window = np.stack([mouth(0.0, width=0.0)] * 3)
+    openness, width, ratio, velocity = ArticulationAnalyzer().compute(window, np.arange(3) / 30)
+    assert np.isfinite(openness).all() and np.isfinite(ratio).all() and np.isfinite(velocity).all()
+
+
+def test_analyze_peak_and_alignment():
+    values = [0.1] * 10 + [0.6] * 10 + [0.2] * 10
+    window = np.stack([mouth(v) for v in values])
+    timestamps = np.arange(len(values)) / 30
+    french = PronunciationRegistry().get('french')
+
+    result = ArticulationAnalyzer().analyze(window, timestamps, french, ['u', 'an', 'ou'])
+    assert result['frames'] == 30
+    assert result['peak']['time'] == pytest.approx(10 / 30)
+    assert len(result['trajectory']['t']) == 30
+
+    segments = result['alignment']
+    assert [s['phoneme'] for s in segments] == ['u', 'an', 'ou']
+    assert segments[1]['openness'] == pytest.approx(expected_openness(0.6), rel=1e-3)
+    assert segments[0]['end'] == pytest.approx(segments[1]['start'])
+
+
+def test_buffers_grow_with_window():
+    analyzer = ArticulationAnalyzer(capacity=4)
+    window = np.stack([mouth(0.2)] * 10)
+    openness = analyzer.compute(window, np.arange(10) / 30)[0]
+    assert len(openness) == 10 and analyzer.local.capacity >= 10
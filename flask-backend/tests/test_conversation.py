@@ -0,0 +1,65 @@
+from agent import translation
+from agent.conversation import ConversationStore
+from agent.model_router import SLOW_MODEL
+
+
+def long_answer(i):
+    return f"Answer {i}. " + "Voici une explication assez longue de la phrase, avec des exemples. " * 60
+
+
+def test_translation_request_has_no_guide_or_cache_point():
+    request_kwargs = translation.translation_request("How do I say hello in French?", "French")
+    assert request_kwargs['system'] == translation.SYSTEM_PROMPT
+    assert request_kwargs['messages'] == [{"role": "user", "content": "How do I say hello in French?"}]
+
+
+def test_short_followup_has_no_cache_point(stub):
+    translation.conversations.add_turn('short', "How do I say hello?", "Bonjour!")
+    request_kwargs = translation.followup_request("Bonjour!", model_type='slow', session_id='short')
+    assert all(isinstance(m["content"], str) for m in request_kwargs['messages'])
+
+    usage = stub.messages.create(**request_kwargs).usage
+    assert usage.cache_read_input_tokens == 0
+    assert usage.cache_creation_input_tokens == 0
+
+
+def test_long_followup_reads_history_from_prompt_cache(stub):
+    for i in range(3):
+        translation.conversations.add_turn('long', f"Question {i}?", long_answer(i))
+    last = translation.conversations.last_answer('long')
+
+    first = translation.followup_request(last, model_type='slow', session_id='long')
+    assert first['model'] == SLOW_MODEL
+    assert stub.messages.create(**first).usage.cache_creation_input_tokens > 0
+
+    second = translation.followup_request(last, model_type='slow', session_id='long')
+    usage = stub.messages.create(**second).usage
+    assert usage.cache_read_input_tokens > 0
+    assert usage.input_tokens < usage.cache_read_input_tokens
+
+
+def test_compaction_keeps_recent_turns_verbatim():
+    store = ConversationStore(max_tokens=200, keep_recent=2)
+    for i in range(4):
+        store.add_turn('s', f"Question {i}?", long_answer(i))
+    summary, messages = store.context('s')
+    assert summary.startswith("Earlier in this conversation")
+    assert [m["content"] for m in messages if m["role"] == "user"] == ["Question 2?", "Question 3?"]
+    assert store.stats()['compacted_turns'] == 2
+
+
+def test_cached_translation_is_not_added_twice(stub):
+    import app
+
+    client = app.app.test_client()
+    body = {'prompt': "How do I say thank you?", 'language': "French", 'session_id': 'cached'}
+    for _ in range(2):
+        assert client.post('/api/translation', json=body).status_code == 200
+    assert len(translation.conversations.sessions['cached'].turns) == 1
+    assert len(stub.calls) == 1
+
+    response = client.post('/api/translation/stream', json=body)
+    assert b"event: cached" not in response.data
+    assert b"event: done" in response.data
+    assert len(translation.conversations.sessions['cached'].turns) == 1
+
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from agent.emotion_aggregator import EmotionAggregator
+from agent.emotion_summary import EMOTION_LABELS
+
+
+def vector(label, score):
+    """score on label, the rest spread evenly over the other emotions"""
+    probs = np.full(len(EMOTION_LABELS), (1.0 - score) / (len(EMOTION_LABELS) - 1))
+    probs[EMOTION_LABELS.index(label)] = score
+    return probs
+
+
+def test_window_sums():
+    aggregator = EmotionAggregator()
+    aggregator.start_window(2.0, now=100.0)
+    for i in range(3):
+        aggregator.add(vector('happy', 0.9), timestamp=100.0 + i * 0.1)
+    aggregator.add(vector('neutral', 0.6), timestamp=100.3)
+
+    summary = aggregator.latest_summary()
+    assert summary['emotion'] == 'happy'
+    assert summary['samples'] == 4
+    assert summary['score'] == pytest.approx(0.9 * 3 / 4)
+    assert summary['confidence'] == pytest.approx(0.75)
+    assert summary['counts'] == {'happy': pytest.approx(2.7), 'neutral': pytest.approx(0.6)}
+    assert summary['samples_per_second'] == pytest.approx(2.0)
+
+
+def test_start_window_resets():
+    aggregator = EmotionAggregator()
+    aggregator.start_window(1.0, now=0.0)
+    aggregator.add(vector('happy', 0.9), timestamp=0.5)
+    aggregator.start_window(1.0, now=1.0)
+    assert aggregator.latest_summary() is None
+    aggregator.add({'sad': 0.8, 'neutral': 0.2}, timestamp=1.5)
+    assert aggregator.latest_summary()['emotion'] == 'sad'
+    assert aggregator.latest_summary()['samples'] == 1
+
+
+def test_last_seconds_matches_rescan():
+    aggregator = EmotionAggregator(capacity=50)
+    rng = np.random.default_rng(0)
+    samples = rng.dirichlet(np.ones(len(EMOTION_LABELS)), size=120)
+    for i, probs in enumerate(samples):
+        aggregator.add(probs, timestamp=float(i))
+
+    # 10 s back from t=119 covers samples 110..119, all still in the (wrapped) ring
+    summary = aggregator.last_seconds(9.5, now=119.0)
+    recent = samples[110:]
+    assert summary['samples'] == 10
+    expected = {label: round(float(p), 4) for label, p in zip(EMOTION_LABELS, recent.mean(axis=0))}
+    assert summary['probabilities'] == pytest.approx(expected, abs=1e-4)
+    assert summary['confidence'] == pytest.approx(
+        (recent.argmax(axis=1) == EMOTION_LABELS.index(summary['emotion'])).mean())
+
+
+def test_last_seconds_empty():
+    aggregator = EmotionAggregator()
+    assert aggregator.last_seconds(5.0, now=10.0) is None
+    aggregator.add(vector('happy', 0.9), timestamp=1.0)
+    assert aggregator.last_seconds(5.0, now=10.0) is None
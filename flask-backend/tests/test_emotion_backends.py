@@ -0,0 +1,125 @@
+import os
+
+import numpy as np
+import pytest
+
+from agent.emotion_backends import TFLiteBackend, load_faces, validate
+
+FACES = os.path.join(os.path.dirname(__file__), 'fixtures', 'faces')
+INPUT_SIZE = (48, 48)
+
+
+def reference_probs(batch):
+    """A known 'model': softmax over a per-face brightness/contrast feature, float32 in, (n, 7) out"""
+    mean = batch.reshape(len(batch), -1).mean(axis=1)
+    std = batch.reshape(len(batch), -1).std(axis=1)
+    logits = 8.0 * np.outer(mean, np.linspace(-1, 1, 7)) + 4.0 * np.outer(std, np.cos(np.arange(7)))
+    exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return (exp / exp.sum(axis=1, keepdims=True)).astype(np.float32)
+
+
+class Int8Interpreter:
+    """Stands in for tflite's Interpreter running reference_probs as a fully int8 model"""
+
+    def __init__(self, input_quantization=(1 / 127.0, 0), output_quantization=(1 / 256.0, -128)):
+        self.input = {'index': 0, 'shape': np.array([1, *INPUT_SIZE, 1]), 'dtype': np.int8, 'quantization': input_quantization}
+        self.output = {'index': 1, 'shape': np.array([1, 7]), 'dtype': np.int8, 'quantization': output_quantization}
+        self.tensors = {}
+        self.received = []
+
+    def allocate_tensors(self):
+        pass
+
+    def get_input_details(self):
+        return [self.input]
+
+    def get_output_details(self):
+        return [self.output]
+
+    def resize_tensor_input(self, index, shape):
+        self.input['shape'] = np.array(shape)
+
+    def set_tensor(self, index, value):
+        assert value.dtype == np.int8 and list(value.shape) == list(self.input['shape'])
+        self.received.append(value)
+        self.tensors[index] = value
+
+    def invoke(self):
+        scale, zero_point = self.input['quantization']
+        probs = reference_probs((self.tensors[0].astype(np.float32) - zero_point) * scale)
+        scale, zero_point = self.output['quantization']
+        self.tensors[1] = np.clip(np.round(probs / scale + zero_point), -128, 127).astype(np.int8)
+
+    def get_tensor(self, index):
+        return self.tensors[index]
+
+
+class FloatReference:
+    name = 'reference'
+    input_size = INPUT_SIZE
+
+    def predict(self, batch):
+        return reference_probs(batch)
+
+
+@pytest.fixture
+def faces():
+    return load_faces(FACES, INPUT_SIZE)
+
+
+def test_fixture_faces(faces):
+    assert faces.shape == (12, *INPUT_SIZE, 1)
+    assert faces.dtype == np.float32
+    assert -1.0 <= faces.min() and faces.max() <= 1.0
+
+
+def test_tflite_int8_scaling(faces):
+    interpreter = Int8Interpreter()
+    backend = TFLiteBackend(interpreter=interpreter)
+    assert backend.input_size == INPUT_SIZE
+
+    output = backend.predict(faces)
+    assert output.dtype == np.float32
+    # Input rounding (1/127) plus output rounding (1/256) is all the error there should be
+    np.testing.assert_allclose(output, reference_probs(faces), atol=0.02)
+    assert (output.argmax(axis=1) == reference_probs(faces).argmax(axis=1)).all()
+    # The batch of 12 resized the input tensor, and the quantized values used the full int8 range
+    assert interpreter.received[-1].shape[0] == len(faces)
+    assert np.abs(interpreter.received[-1]).max() >= 100
+
+
+def test_tflite_int8_validates_against_reference(faces):
+    report = validate(TFLiteBackend(interpreter=Int8Interpreter()), FloatReference(), faces, batch_size=4, repeats=1)
+    assert report['passed'], report
+
+
+def test_tflite_wrong_scale_fails_validation(faces):
+    # An int8 model whose output scale we read wrong must not pass
+    backend = TFLiteBackend(interpreter=Int8Interpreter())
+    backend.output = dict(backend.output, quantization=(1 / 64.0, -128))
+    report = validate(backend, FloatReference(), faces, repeats=1)
+    assert not report['passed']
+
+
+@pytest.mark.parametrize('fmt', ['tflite', 'onnx'])
+def test_int8_export_matches_keras(faces, tmp_path, fmt):
+    """The real export path on a small known Keras model (needs TensorFlow, plus tf2onnx/onnxruntime for ONNX)"""
+    tf = pytest.importorskip('tensorflow')
+    if fmt == 'onnx':
+        pytest.importorskip('tf2onnx')
+        pytest.importorskip('onnxruntime')
+    from agent.emotion_backends import KerasBackend, export_onnx, export_tflite, load_backend
+
+    tf.random.set_seed(0)
+    model = tf.keras.Sequential([
+        tf.keras.Input((*INPUT_SIZE, 1)),
+        tf.keras.layers.Conv2D(8, 3, activation='relu'),
+        tf.keras.layers.GlobalAveragePooling2D(),
+        tf.keras.layers.Dense(7, kernel_initializer=tf.keras.initializers.RandomNormal(stddev=3.0)),
+        tf.keras.layers.Softmax(),
+    ])
+    path = str(tmp_path / f'model.{fmt}')
+    (export_tflite if fmt == 'tflite' else export_onnx)(model, path, int8=True, calibration_faces=faces)
+
+    report = validate(load_backend(f'{fmt}:{path}'), KerasBackend(model), faces)
+    assert report['passed'], report
@@ -0,0 +1,63 @@
+import time
+
+import numpy as np
+import pytest
+
+from agent.emotion_monitor import EmotionMonitorService
+from agent.landmarks import NUM_LANDMARKS
+
+FPS = 30
+
+
+@pytest.fixture
+def service():
+    EmotionMonitorService._instance = None
+    service = EmotionMonitorService(source='synthetic:320x240', preview='headless')
+    service.stop()          # frames are fed by hand below, not by the capture thread
+    points = np.random.default_rng(0).uniform(50, 250, size=(NUM_LANDMARKS, 3)).astype(np.float32)
+    service.model_runs = {'facemesh': 0, 'fer': 0}
+
+    def process_landmarks(frame, full_shape=None):
+        service.model_runs['facemesh'] += 1
+        return points
+
+    def detect_emotions(frame, scale=1.0):
+        service.model_runs['fer'] += 1
+        return [{'box': [50, 50, 200, 200], 'emotions': {'happy': 0.9, 'neutral': 0.1}}]
+
+    service.process_landmarks = process_landmarks
+    service.detect_emotions = detect_emotions
+    yield service
+    EmotionMonitorService._instance = None
+
+
+def feed(service, seconds, start):
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    for i in range(int(seconds * FPS)):
+        now = start + i / FPS
+        service.process_frame(frame, now, now)
+
+
+def test_static_face_samples_at_fer_rate(service):
+    start = time.time()
+    service.start_monitoring(60.0)
+    service.monitoring_start = start
+    feed(service, 3.0, start)
+
+    # 5 Hz FER over 3 s of a face that never moves: one sample per interval, not per frame
+    samples = service.get_dominant_emotion()['samples']
+    assert 14 <= samples <= 16
+    # ...and the model itself only ran when the gate's max_staleness (1 s) ran out
+    assert service.model_runs['fer'] <= 4
+    stats = service.pipeline_stats()
+    assert stats['stages']['fer']['runs'] + stats['stages']['fer']['reused'] == samples
+
+
+def test_static_frame_reuse_counted_at_facemesh_rate(service):
+    start = time.time()
+    feed(service, 3.0, start)
+
+    # Idle FaceMesh is 5 Hz: ~15 decisions in 3 s, most of them reuses of the static frame
+    gate = service.motion_gate.stats()['facemesh']
+    assert 14 <= gate['ran'] + gate['reused'] <= 16
+    assert service.model_runs['facemesh'] == gate['ran'] <= 4
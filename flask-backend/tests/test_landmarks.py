@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from agent.landmarks import FaceTrack, LandmarkStore, face_box, landmarks_to_pixels
+
+
+def points(value, n=478):
+    return np.full((n, 2), value, dtype=np.float32)
+
+
+def test_window_wraps_around():
+    store = LandmarkStore(capacity=4)
+    for i in range(10):
+        store.append(points(i), timestamp=float(i))
+    assert len(store) == 4
+    window = store.window()
+    assert window.shape == (4, 478, 2)
+    np.testing.assert_array_equal(window[:, 0, 0], [6, 7, 8, 9])
+    np.testing.assert_array_equal(store.window_timestamps(2), [8.0, 9.0])
+    assert store.latest()[0, 0] == 9
+    # A view, not a copy
+    assert np.shares_memory(window, store.data)
+
+
+def test_since_returns_copies():
+    store = LandmarkStore(capacity=4)
+    for i in range(6):
+        store.append(points(i), timestamp=float(i))
+    frames, ts = store.since(3.0, 4.0)
+    np.testing.assert_array_equal(ts, [3.0, 4.0])
+    np.testing.assert_array_equal(frames[:, 0, 0], [3, 4])
+    # Later writes don't change what the caller got
+    for i in range(6, 10):
+        store.append(points(i), timestamp=float(i))
+    np.testing.assert_array_equal(frames[:, 0, 0], [3, 4])
+    assert store.since(100.0)[0].shape[0] == 0
+
+
+def test_landmarks_to_pixels():
+    landmarks = [SimpleNamespace(x=0.5, y=0.25, z=0.1)] * 478
+    pixels = landmarks_to_pixels(landmarks, 640, 480, dims=3)
+    np.testing.assert_allclose(pixels[0], [320, 120, 64])
+
+
+def test_face_box_clipped_to_frame():
+    face = np.array([[10, 20], [110, 220]], dtype=np.float32)
+    assert face_box(face, (480, 640), margin=0.0) == (10, 20, 100, 200)
+    assert face_box(face, (150, 640), margin=0.5) == (0, 0, 160, 149)
+
+
+def test_face_track_ages_out():
+    track = FaceTrack(max_age=2)
+    face = np.array([[10, 20], [110, 220]], dtype=np.float32)
+    box = track.update(face, (480, 640))
+    assert box is not None
+    assert track.update(None, (480, 640)) == box
+    assert track.update(None, (480, 640)) == box
+    assert track.update(None, (480, 640)) is None and track.lost
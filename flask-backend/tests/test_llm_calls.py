@@ -0,0 +1,121 @@
+import threading
+import time
+
+import pytest
+
+from agent.llm_calls import LLMBusyError, LLMCallManager, TokenBucket, _Gate
+from agent.llm_stub import StubAnthropic
+
+
+def request(text="How do I say hello?"):
+    return dict(model="claude-3-5-haiku-20241022", max_tokens=100, messages=[{"role": "user", "content": text}])
+
+
+def run_together(target, count):
+    results = [None] * count
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, target())) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_identical_calls_are_coalesced():
+    client = StubAnthropic(latency=0.2)
+    manager = LLMCallManager(lambda: client)
+
+    results = run_together(lambda: manager.create(request()), 10)
+    assert len(client.calls) == 1
+    assert sum(info['leader'] for _, info in results) == 1
+    assert {message.content[0].text for message, _ in results} == {client.response_text}
+    assert manager.stats()['coalesced'] == 9
+
+
+def test_different_calls_are_not_coalesced():
+    client = StubAnthropic(latency=0.05)
+    manager = LLMCallManager(lambda: client)
+
+    run_together(lambda: manager.create(request(threading.current_thread().name)), 4)
+    assert len(client.calls) == 4
+
+
+def test_stream_is_shared():
+    client = StubAnthropic(first_token_latency=0.1, chunk_delay=0.001)
+    manager = LLMCallManager(lambda: client)
+
+    texts = run_together(lambda: "".join(manager.stream(request()).text_stream), 5)
+    assert texts == [client.response_text] * 5
+    assert len(client.calls) == 1
+
+
+def test_concurrency_limit():
+    active = []
+    peak = []
+
+    client = StubAnthropic(latency=0.05)
+    create = client.messages.create
+
+    def counted(**kwargs):
+        active.append(1)
+        peak.append(len(active))
+        try:
+            return create(**kwargs)
+        finally:
+            active.pop()
+
+    client.messages.create = counted
+    manager = LLMCallManager(lambda: client, max_concurrent=2)
+
+    run_together(lambda: manager.create(request(threading.current_thread().name)), 6)
+    assert len(client.calls) == 6
+    assert max(peak) <= 2
+
+
+def test_full_queue_is_rejected():
+    client = StubAnthropic(latency=0.3)
+    manager = LLMCallManager(lambda: client, max_concurrent=1, max_queue=0)
+
+    leader = threading.Thread(target=manager.create, args=(request("first"),))
+    leader.start()
+    time.sleep(0.05)
+    with pytest.raises(LLMBusyError):
+        manager.create(request("second"))
+    leader.join()
+    assert manager.stats()['rejected'] == 1
+
+
+def test_gate_is_fifo():
+    gate = _Gate(1, 10)
+    assert gate.acquire(time.monotonic() + 1)
+    order = []
+
+    def wait(i):
+        assert gate.acquire(time.monotonic() + 5)
+        order.append(i)
+        gate.release()
+
+    threads = []
+    for i in range(4):
+        threads.append(threading.Thread(target=wait, args=(i,)))
+        threads[-1].start()
+        time.sleep(0.02)        # queue up in a known order
+    gate.release()
+    for thread in threads:
+        thread.join()
+    assert order == [0, 1, 2, 3]
+
+
+def test_gate_times_out():
+    gate = _Gate(1, 10)
+    assert gate.acquire(time.monotonic() + 1)
+    assert not gate.acquire(time.monotonic() + 0.05)
+    assert not gate.waiting
+
+
+def test_token_bucket():
+    bucket = TokenBucket(600)       # 10 tokens per second
+    assert bucket.acquire(600, time.monotonic() + 0.1)
+    assert not bucket.acquire(100, time.monotonic() + 0.05)
+    bucket.refund(100)
+    assert bucket.acquire(100, time.monotonic() + 0.05)
@@ -0,0 +1,38 @@
+import pytest
+
+
+@pytest.fixture
+def cv_app(monkeypatch):
+    import app
+
+    calls = []
+
+    def no_camera():
+        calls.append(1)
+        raise RuntimeError("Could not open webcam 0")
+
+    monkeypatch.setattr(app, 'CV_ENABLED', True)
+    monkeypatch.setattr(app, 'get_emotion_service', no_camera)
+    return app, calls
+
+
+def first_chunk(response):
+    chunk = next(iter(response.response))
+    response.close()
+    return chunk
+
+
+def test_events_stream_without_camera(cv_app):
+    app, calls = cv_app
+    response = app.app.test_client().get('/api/monitor/events', buffered=False)
+    assert response.status_code == 200
+    assert first_chunk(response) == b": connected\n\n"
+    assert calls
+
+
+def test_browser_session_does_not_start_local_monitor(cv_app):
+    app, calls = cv_app
+    response = app.app.test_client().get('/api/monitor/events?session_id=learner-1', buffered=False)
+    assert response.status_code == 200
+    assert first_chunk(response) == b": connected\n\n"
+    assert not calls
@@ -0,0 +1,48 @@
+import numpy as np
+
+from agent.motion import MotionGate, scale_frame
+
+
+def frame(value):
+    return np.full((240, 320, 3), value, dtype=np.uint8)
+
+
+def test_scale_frame():
+    small, scale = scale_frame(np.zeros((720, 1280, 3), dtype=np.uint8), 640)
+    assert small.shape == (360, 640, 3) and scale == 0.5
+    same, scale = scale_frame(frame(0), 640)
+    assert same.shape == (240, 320, 3) and scale == 1.0
+
+
+def test_frame_threshold():
+    gate = MotionGate(frame_threshold=3.0)
+    assert gate.check_frame(frame(100), now=0.0)        # nothing to compare with yet
+    assert not gate.check_frame(frame(102), now=0.1)    # mean change 2 <= 3
+    assert gate.check_frame(frame(110), now=0.2)        # mean change 10 against the last run
+    assert not gate.check_frame(frame(110), now=0.3)
+    assert gate.stats()['facemesh']['ran'] == 2 and gate.stats()['facemesh']['reused'] == 2
+
+
+def test_max_staleness():
+    gate = MotionGate(max_staleness=1.0)
+    assert gate.check_frame(frame(100), now=0.0)
+    assert not gate.check_frame(frame(100), now=0.9)
+    assert gate.check_frame(frame(100), now=1.0)
+
+
+def test_landmark_threshold_relative_to_face_width():
+    gate = MotionGate(landmark_threshold=0.015)
+    points = np.random.default_rng(0).uniform(0, 200, size=(478, 2)).astype(np.float32)
+    face_width = float(np.ptp(points[:, 0]))
+    assert gate.check_landmarks(points, now=0.0)
+    assert not gate.check_landmarks(points + 0.01 * face_width, now=0.1)    # moved ~1.4% of the face
+    assert gate.check_landmarks(points + 0.02 * face_width, now=0.2)
+    # No face: always classify again
+    assert gate.check_landmarks(None, now=0.3)
+
+
+def test_reset():
+    gate = MotionGate()
+    gate.check_frame(frame(100), now=0.0)
+    gate.reset()
+    assert gate.check_frame(frame(100), now=0.1)
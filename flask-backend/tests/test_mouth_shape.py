@@ -0,0 +1,29 @@
+import json
+
+import numpy as np
+
+from agent.emotion_monitor import LanguagePronunciationGuide, PronunciationAnalysis
+from agent.landmarks import NUM_LANDMARKS
+
+
+def test_zero_width_mouth_is_valid_json():
+    landmarks = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+    landmarks[13, 1] = 10.0         # lips apart, but both corners on the same spot
+    result = PronunciationAnalysis().analyze_mouth_shape(landmarks)
+    assert np.isfinite(result['metrics']['openness'])
+    assert result['metrics']['roundness'] is True
+    assert result['metrics']['spread'] is None
+    # What /api/monitor/pronunciation(/batch) would send - no Infinity/NaN allowed
+    json.dumps(result, allow_nan=False)
+    scores = LanguagePronunciationGuide('french').score_phonemes(['a', 'ou'], result['metrics'], {'visible': False})
+    json.dumps(scores, allow_nan=False)
+
+
+def test_closed_mouth():
+    landmarks = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+    landmarks[308, 0] = 50.0
+    result = PronunciationAnalysis().analyze_mouth_shape(landmarks)
+    assert result['metrics']['openness'] == 0.0
+    assert result['metrics']['roundness'] is False
+    assert result['feedback'] == "Try opening your mouth more"
+    json.dumps(result, allow_nan=False)
@@ -0,0 +1,55 @@
+import itertools
+
+from agent.pronunciation import PronunciationRegistry
+
+# The French config and get_feedback logic from before the targets moved to agent/data
+BASELINE = {
+    'rounded_vowels': {
+        'u': {'openness': 0.15, 'roundness': True},
+        'ou': {'openness': 0.2, 'roundness': True},
+        'eu': {'openness': 0.25, 'roundness': True},
+    },
+    'nasal_vowels': {
+        'an': {'openness': 0.4},
+        'on': {'openness': 0.3},
+        'in': {'openness': 0.25},
+    },
+}
+
+
+def baseline_feedback(phoneme, mouth_metrics, tongue_data):
+    feedback = []
+    if phoneme in BASELINE['rounded_vowels']:
+        expected = BASELINE['rounded_vowels'][phoneme]
+        if abs(mouth_metrics['openness'] - expected['openness']) > 0.1:
+            if mouth_metrics['openness'] > expected['openness']:
+                feedback.append("Fermez un peu plus les lèvres (Close your lips a bit more)")
+            else:
+                feedback.append("Ouvrez un peu plus les lèvres (Open your lips a bit more)")
+        if expected['roundness'] and not mouth_metrics['roundness']:
+            feedback.append("Arrondissez plus les lèvres (Round your lips more)")
+    elif phoneme in BASELINE['nasal_vowels']:
+        expected = BASELINE['nasal_vowels'][phoneme]
+        if abs(mouth_metrics['openness'] - expected['openness']) > 0.1:
+            feedback.append("Ajustez l'ouverture pour le son nasal (Adjust opening for nasal sound)")
+    elif phoneme == 'r' and tongue_data['visible']:
+        if tongue_data['position'] != 'back':
+            feedback.append("Placez la langue plus en arrière pour le 'R' français (Place tongue further back for French 'R')")
+    return feedback if feedback else ["Très bien! (Very good!)"]
+
+
+def test_only_french_is_configured():
+    assert PronunciationRegistry().supported() == ['french']
+
+
+def test_french_feedback_matches_baseline():
+    french = PronunciationRegistry().get('french')
+    phonemes = ['u', 'ou', 'eu', 'an', 'on', 'in', 'r', 'l']
+    # Openness values avoid landing exactly on target +- 0.1, where float32 targets could round differently
+    openness = [0.0, 0.07, 0.18, 0.22, 0.33, 0.47, 0.6, 1.5]
+    tongues = [{'visible': False}, {'visible': True, 'position': 'front'}, {'visible': True, 'position': 'back'}]
+    spreads = [None, True, False]
+
+    for phoneme, value, roundness, spread, tongue in itertools.product(phonemes, openness, [True, False], spreads, tongues):
+        metrics = {'openness': value, 'roundness': roundness, 'spread': spread}
+        assert french.feedback(phoneme, metrics, tongue) == baseline_feedback(phoneme, metrics, tongue), (phoneme, metrics, tongue)
@@ -0,0 +1,39 @@
+import time
+
+from agent.response_cache import ResponseCache
+
+
+def test_normalized_key():
+    assert ResponseCache.make_key("How do I say  Hello?", "French", "sys") == ResponseCache.make_key("how do i say hello?", "french", "sys")
+    assert ResponseCache.make_key("hello", "French", "sys") != ResponseCache.make_key("hello", "Spanish", "sys")
+
+
+def test_ttl():
+    cache = ResponseCache(ttl=0.05)
+    cache.put('k', "answer")
+    assert cache.get('k') == "answer"
+    time.sleep(0.06)
+    assert cache.get('k') is None
+    assert cache.stats()['entries'] == 0
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (1, 1)
+
+
+def test_lru():
+    cache = ResponseCache(max_entries=2)
+    cache.put('a', "1")
+    cache.put('b', "2")
+    assert cache.get('a') == "1"      # 'b' is now the least recently used
+    cache.put('c', "3")
+    assert cache.get('b') is None
+    assert cache.get('a') == "1"
+    assert cache.get('c') == "3"
+
+
+def test_disk(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    ResponseCache(path=path).put('k', "answer")
+
+    cache = ResponseCache(path=path)
+    assert cache.stats()['entries'] == 0
+    assert cache.get('k') == "answer"
+    assert cache.stats()['entries'] == 1
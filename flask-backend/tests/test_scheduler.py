@@ -0,0 +1,61 @@
+from agent.scheduler import InferenceScheduler, StageBudget
+
+
+def runs_per_second(scheduler, stage, start=1000.0, fps=30, seconds=2.0, reuse=False):
+    """Feed frames on a fake clock and count how often the stage was due"""
+    due = 0
+    for i in range(int(fps * seconds)):
+        now = start + i / fps
+        if scheduler.due(stage, now):
+            due += 1
+            if reuse:
+                scheduler.reuse(stage, now)
+            else:
+                scheduler.record(stage, 1.0, now)
+    return due / seconds
+
+
+def test_idle_and_active_rates():
+    scheduler = InferenceScheduler()
+    assert runs_per_second(scheduler, 'fer') == 0       # FER doesn't run outside a window
+    assert 4.5 <= runs_per_second(scheduler, 'facemesh') <= 5.5
+    scheduler.set_active(True)
+    assert 4.5 <= runs_per_second(scheduler, 'fer', start=2000.0) <= 5.5
+    assert 14.5 <= runs_per_second(scheduler, 'facemesh', start=2000.0) <= 15.5
+
+
+def test_reuse_counts_towards_the_rate():
+    scheduler = InferenceScheduler()
+    scheduler.set_active(True)
+    assert 4.5 <= runs_per_second(scheduler, 'fer', reuse=True) <= 5.5
+    stats = scheduler.stats()['fer']
+    assert stats['runs'] == 0 and stats['reused'] == 10
+
+
+def test_unrecorded_stage_stays_due():
+    # What the motion gate used to do: never record, so the stage was due on every frame
+    scheduler = InferenceScheduler()
+    scheduler.set_active(True)
+    assert all(scheduler.due('fer', 1000.0 + i / 30) for i in range(30))
+
+
+def test_request_forces_one_run():
+    scheduler = InferenceScheduler()
+    assert not scheduler.due('tongue', 1000.0)
+    scheduler.request('tongue')
+    assert scheduler.due('tongue', 1000.0)
+    assert not scheduler.due('tongue', 1000.0)
+
+
+def test_sheds_load_over_budget_and_recovers():
+    scheduler = InferenceScheduler({'fer': StageBudget(idle_hz=0, active_hz=10, budget_ms=50)})
+    scheduler.set_active(True)
+    for _ in range(10):
+        scheduler.record('fer', 200.0)
+    slowed = scheduler.target_hz('fer')
+    assert slowed < 10 * InferenceScheduler.SHED_FACTOR ** 5
+    assert slowed >= 10 * InferenceScheduler.MIN_LOAD_FACTOR
+
+    for _ in range(200):
+        scheduler.record('fer', 5.0)
+    assert scheduler.target_hz('fer') == 10
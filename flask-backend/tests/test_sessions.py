@@ -0,0 +1,29 @@
+import threading
+import time
+
+from agent.sessions import SessionMonitor
+
+
+def test_window_closes_without_frames():
+    monitor = SessionMonitor('s')
+    closed = threading.Event()
+    monitor.on_window_end = lambda session: closed.set()
+
+    monitor.start_monitoring(0.1)
+    assert closed.wait(1.0)
+    assert not monitor.is_monitoring
+
+
+def test_early_timer_is_rescheduled():
+    monitor = SessionMonitor('s')
+    closed = threading.Event()
+    monitor.on_window_end = lambda session: closed.set()
+
+    monitor.start_monitoring(0.3)
+    # Replace the timer with one that fires well before the window is over
+    monitor.window_timer.cancel()
+    monitor._schedule_close(0.05)
+    time.sleep(0.1)
+    assert monitor.is_monitoring and not closed.is_set()
+    assert closed.wait(1.0)
+    assert not monitor.is_monitoring
@@ -0,0 +1,74 @@
+import os
+from multiprocessing import resource_tracker
+
+import numpy as np
+import pytest
+
+from agent.landmarks import NUM_LANDMARKS
+from agent.shared_state import META_SEQ, SharedState
+
+
+@pytest.fixture
+def shared():
+    writer = SharedState(f'persona_test_{os.getpid()}', create=True, max_size=(64, 48))
+    reader = SharedState(writer.name)
+    # Attaching unregisters the segment from the resource tracker, which in one process is the
+    # writer's registration - put it back so the writer's unlink has something to unregister
+    resource_tracker.register(writer.shm._name, 'shared_memory')
+    yield writer, reader
+    reader.close()
+    writer.close()
+
+
+def frame(value):
+    return np.full((48, 64, 3), value, dtype=np.uint8)
+
+
+def test_read_latest(shared):
+    writer, reader = shared
+    assert reader.read() is None
+
+    landmarks = np.random.default_rng(0).random((NUM_LANDMARKS, 3)).astype(np.float32)
+    writer.publish(frame(1), landmarks, timestamp=5.0)
+    snapshot = reader.read()
+    assert snapshot.timestamp == 5.0
+    assert (snapshot.frame == 1).all()
+    np.testing.assert_array_equal(snapshot.landmarks, landmarks[:, :2])
+    assert reader.is_current(snapshot)
+
+
+def test_rewritten_slot_is_not_current(shared):
+    writer, reader = shared
+    writer.publish(frame(1), None)
+    snapshot = reader.read()
+    assert snapshot.landmarks is None
+
+    writer.publish(frame(2), None)
+    assert reader.is_current(snapshot)          # the other slot was written
+    writer.publish(frame(3), None)
+    assert not reader.is_current(snapshot)
+    assert (reader.read().frame == 3).all()
+
+
+def test_write_in_progress_is_skipped(shared):
+    writer, reader = shared
+    writer.publish(frame(1), None)
+    slot = reader.read().seq[0]
+    writer.meta[slot, META_SEQ] += 1            # odd: as if the writer were halfway through
+    assert reader.read() is None
+    writer.meta[slot, META_SEQ] += 1
+    assert reader.read() is not None
+
+
+def test_summary(shared):
+    writer, reader = shared
+    assert reader.read_summary() is None
+    writer.publish_summary({'emotion': 'happy', 'score': 0.9})
+    seq, data = reader.read_summary()
+    assert data == {'emotion': 'happy', 'score': 0.9}
+
+    writer.summary_seq[0] += 1
+    assert reader.read_summary() is None
+    writer.summary_seq[0] += 1
+    writer.publish_summary({'emotion': 'sad', 'score': 0.7})
+    assert reader.read_summary()[0] > seq
@@ -0,0 +1,34 @@
+import numpy as np
+
+from agent.tongue import TongueDetector
+from benchmarks.tongue_roi import full_frame_detect, synthetic_mouth
+
+
+def test_roi_matches_full_frame():
+    detector = TongueDetector()
+    for seed, (w, h) in enumerate([(640, 480), (1280, 720)]):
+        frame, landmarks = synthetic_mouth(w, h, seed)
+        result = detector.detect(frame, landmarks)
+        assert result['visible']
+        assert result == full_frame_detect(frame, landmarks)
+
+
+def test_no_tongue():
+    frame, landmarks = synthetic_mouth(640, 480)
+    frame[:] = (40, 160, 40)        # green everywhere
+    assert TongueDetector().detect(frame, landmarks) == {'visible': False}
+
+
+def test_mouth_outside_frame():
+    frame, landmarks = synthetic_mouth(640, 480)
+    assert TongueDetector().detect(frame, landmarks + 5000) == {'visible': False}
+
+
+def test_scratch_buffers_grow():
+    detector = TongueDetector()
+    small, small_landmarks = synthetic_mouth(320, 240)
+    large, large_landmarks = synthetic_mouth(1920, 1080)
+    detector.detect(small, small_landmarks)
+    size = detector.local.size
+    assert detector.detect(large, large_landmarks) == full_frame_detect(large, large_landmarks)
+    assert detector.local.size > size
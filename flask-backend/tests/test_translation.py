@@ -0,0 +1,76 @@
+from agent import translation
+
+
+def test_cache_hit_skips_routing(stub):
+    translation.generate_translation_response("How do I say goodbye?", "French", model_type='fast')
+    routed = sum(route['count'] for route in translation.model_router.stats()['routes'])
+
+    # A different tier would be a different model, but the answer is cached either way
+    content = translation.generate_translation_response("How do I say goodbye?", "French", model_type='slow')
+    assert content[0].cached
+    assert len(stub.calls) == 1
+    assert sum(route['count'] for route in translation.model_router.stats()['routes']) == routed
+
+
+def sse_events(data):
+    """[(event, text)] from a text/event-stream body"""
+    import json
+    events = []
+    for block in data.decode().strip().split("\n\n"):
+        event, payload = block.split("\n", 1)
+        events.append((event[len("event: "):], json.loads(payload[len("data: "):])['text']))
+    return events
+
+
+def test_translation_endpoint(stub):
+    import app
+
+    response = app.app.test_client().post('/api/translation', json={'prompt': "How do I say hello?", 'session_id': 't'})
+    assert response.status_code == 200
+    assert response.get_json() == {'status': 'success', 'message': stub.response_text}
+    assert stub.calls[0]['messages'][-1]['content'] == "How do I say hello?"
+    assert translation.conversations.last_answer('t') == stub.response_text
+
+
+def test_translation_stream_endpoint(stub):
+    import app
+
+    response = app.app.test_client().post('/api/translation/stream', json={'prompt': "How do I say hello?"})
+    assert response.mimetype == 'text/event-stream'
+    events = sse_events(response.data)
+    assert "".join(text for event, text in events if event == "delta") == stub.response_text
+    assert [text for event, text in events if event == "paragraph"] == stub.response_text.split("\n\n")
+    assert events[-1] == ("done", stub.response_text)
+    assert len(stub.calls) == 1
+
+
+def test_followup_uses_stored_conversation(stub):
+    import app
+
+    client = app.app.test_client()
+    client.post('/api/translation', json={'prompt': "How do I say hello?", 'session_id': 'f'})
+    response = client.post('/api/followup', json={'session_id': 'f'})
+    assert response.status_code == 200
+
+    messages = stub.calls[-1]['messages']
+    assert [m['role'] for m in messages] == ['user', 'assistant', 'user']
+    assert messages[0]['content'] == "How do I say hello?"
+    assert messages[-1]['content'] == translation.FOLLOWUP_REQUEST
+
+
+def test_requests_without_session_are_stateless(stub):
+    import app
+
+    client = app.app.test_client()
+    client.post('/api/translation', json={'prompt': "How do I say hello?"})
+    client.post('/api/translation', json={'prompt': "How do I say goodbye?"})
+    assert not translation.conversations.sessions
+
+    response = client.post('/api/followup', json={'prev': "Au revoir!"})
+    assert response.status_code == 200
+    # Only prev goes out, nothing from the other translations
+    assert stub.calls[-1]['messages'] == [
+        {"role": "assistant", "content": "Au revoir!"},
+        {"role": "user", "content": translation.FOLLOWUP_REQUEST},
+    ]
+    assert not translation.conversations.sessions
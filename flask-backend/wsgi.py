@@ -0,0 +1,18 @@
+# wsgi.py
+"""
+WSGI entry point: the API in several worker processes, the CV loop in its own process.
+
+    python -m agent.cv_engine                             # start the engine first
+    gunicorn -w 4 -k gthread --threads 8 -b 0.0.0.0:8000 wsgi:app
+
+The workers read frames, landmarks and emotion summaries from the engine's shared memory, so
+inference never competes with request handling for the GIL and a crash in native CV code only
+takes down the engine. Set APP_MODE=translation instead for LLM-only workers.
+"""
+import os
+
+os.environ.setdefault('APP_MODE', 'api')
+
+from app import app, start_warm_up  # noqa: E402
+
+start_warm_up()